@@ -0,0 +1,167 @@
+from typing import Dict, List
+import random
+
+# Fundamental C++ types used for fields, arguments and return types
+fundamental_types = ['char', 'unsigned char', 'short', 'unsigned short', 'int', 'unsigned int', 'long',
+                     'unsigned long', 'long long', 'unsigned long long', 'float', 'double', 'bool']
+
+
+class HeaderSpec:
+    def __init__(self, functions: int = 200, classes: int = 50, fields_per_class: int = 8, enums: int = 10,
+                 enum_size: int = 16, pointer_depth: int = 2, typedefs: int = 20, typedef_depth: int = 3,
+                 circular_share: float = 0.2, seed: int = 0):
+        """
+        Initializes the parameters of a synthetic C++ header.
+
+        Args:
+            functions: The number of free functions.
+            classes: The number of classes.
+            fields_per_class: The number of fields of every class.
+            enums: The number of enumerations.
+            enum_size: The number of values of every enumeration.
+            pointer_depth: The maximum number of pointers of a field, argument or return type.
+            typedefs: The number of typedef chains.
+            typedef_depth: The number of typedefs in every chain, each one aliasing the previous one.
+            circular_share: The share of classes that refer to themselves or to a class declared after them, as
+             Node does in examples/example3.h.
+            seed: The seed of the pseudo-random choices, so that the same spec always gives the same header.
+        """
+        self.functions = functions
+        self.classes = classes
+        self.fields_per_class = fields_per_class
+        self.enums = enums
+        self.enum_size = enum_size
+        self.pointer_depth = pointer_depth
+        self.typedefs = typedefs
+        self.typedef_depth = typedef_depth
+        self.circular_share = circular_share
+        self.seed = seed
+
+    def to_dict(self) -> Dict[str, object]:
+        """
+        Get the parameters as a dictionary, e.g. to record them along with benchmark results.
+
+        Returns:
+            Dict[str, object]: The parameters by name.
+        """
+        return dict(vars(self))
+
+    @classmethod
+    def from_dict(cls, values: Dict[str, object]) -> "HeaderSpec":
+        """
+        Create a spec from a dictionary of parameters, as returned by to_dict.
+
+        Args:
+            values (Dict[str, object]): The parameters by name. Missing parameters keep their default.
+
+        Returns:
+            HeaderSpec: The spec.
+        """
+        return cls(**values)
+
+
+# Named specs of increasing size
+presets = {
+    'small': HeaderSpec(functions=100, classes=20, fields_per_class=6, enums=5, typedefs=10),
+    'medium': HeaderSpec(functions=1000, classes=200, fields_per_class=8, enums=40, typedefs=100),
+    'large': HeaderSpec(functions=10000, classes=2000, fields_per_class=10, enums=200, typedefs=1000),
+}
+
+
+def generate_header(spec: HeaderSpec) -> str:
+    """
+    Generate the source of a synthetic C++ header.
+
+    The header declares enumerations, typedef chains, classes and free functions whose fields, arguments and return
+    types are drawn from the fundamental types and from the types declared before them. All classes are declared
+    up front, so that circular classes can point to classes defined after them.
+
+    Args:
+        spec (HeaderSpec): The parameters of the header.
+
+    Returns:
+        str: The header source.
+    """
+    rng = random.Random(spec.seed)
+    guard = 'BENCHMARK_%d_H' % spec.seed
+    lines = [f'#ifndef {guard}', f'#define {guard}', '']
+
+    # Forward declarations of all classes
+    class_names = [f'Class{i}' for i in range(spec.classes)]
+    lines.extend(f'class {name};' for name in class_names)
+    if class_names:
+        lines.append('')
+
+    enum_names = []
+    for i in range(spec.enums):
+        name = f'Enum{i}'
+        values = ', '.join(f'{name}_Value{j} = {j}' for j in range(spec.enum_size))
+        lines.append(f'enum {name} {{ {values} }};')
+        enum_names.append(name)
+    if enum_names:
+        lines.append('')
+
+    typedef_names = []
+    for i in range(spec.typedefs):
+        aliased = rng.choice(fundamental_types)
+        for j in range(spec.typedef_depth):
+            name = f'Type{i}_{j}'
+            lines.append(f'typedef {aliased} {name};')
+            aliased = name
+        if spec.typedef_depth:
+            typedef_names.append(aliased)
+    if typedef_names:
+        lines.append('')
+
+    def random_type(defined_classes: List[str]) -> str:
+        choice = rng.random()
+        if choice < 0.15 and typedef_names:
+            base = rng.choice(typedef_names)
+        elif choice < 0.25 and enum_names:
+            base = rng.choice(enum_names)
+        elif choice < 0.4 and defined_classes:
+            # Classes are only used through pointers, so that they do not need to be complete
+            return rng.choice(defined_classes) + '*' * rng.randint(1, max(spec.pointer_depth, 1))
+        else:
+            base = rng.choice(fundamental_types)
+        return base + '*' * rng.randint(0, spec.pointer_depth)
+
+    defined_classes = []
+    for i, name in enumerate(class_names):
+        lines.append(f'class {name} {{')
+        lines.append('public:')
+        circular = rng.random() < spec.circular_share
+        if circular:
+            lines.append(f'    {name}(int data);')
+        for j in range(spec.fields_per_class):
+            if circular and j == 0:
+                # Refer to the class itself or to a class defined later
+                target = rng.choice(class_names[i:])
+                lines.append(f'    {target}* field{j};')
+            elif j % 5 == 4:
+                lines.append(f'    {rng.choice(fundamental_types)} field{j}[{rng.randint(2, 16)}];')
+            else:
+                lines.append(f'    {random_type(defined_classes)} field{j};')
+        lines.append('};')
+        lines.append('')
+        defined_classes.append(name)
+
+    for i in range(spec.functions):
+        arguments = ', '.join(f'{random_type(defined_classes)} argument{j}' for j in range(rng.randint(0, 4)))
+        return_type = 'void' if rng.random() < 0.3 else random_type(defined_classes)
+        lines.append(f'{return_type} function{i}({arguments});')
+
+    lines.extend(['', f'#endif // {guard}', ''])
+    return '\n'.join(lines)
+
+
+def write_header(spec: HeaderSpec, path: str):
+    """
+    Generate a synthetic C++ header and write it to a file.
+
+    Args:
+        spec (HeaderSpec): The parameters of the header.
+        path (str): The path of the header file.
+    """
+    with open(path, 'w') as f:
+        f.write(generate_header(spec))
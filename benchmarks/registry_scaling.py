@@ -0,0 +1,119 @@
+import sys
+import time
+import random
+import argparse
+from typing import Dict, List
+from src.builders.builder_registry import BuilderRegistry
+
+# Numbers of declarations the registry is measured with, up to the size of large framework headers
+default_sizes = [1000, 5000, 10000, 25000, 50000]
+
+
+class RegistryEntry:
+    __slots__ = ('name',)
+
+    def __init__(self, name: str):
+        """
+        Initializes a registry value standing in for a builder, since the registry only looks at the identity of its
+        values.
+
+        Args:
+            name: The declaration name.
+        """
+        self.name = name
+
+
+def run_once(size: int, lookups: int = 4, seed: int = 0) -> float:
+    """
+    Fill a registry with declarations the way populate_builders does, and time it.
+
+    Every registered builder looks up its own position (as CtypesBuilder.typedef_index does) and the positions of a
+    few builders registered before it (as the references of its fields and arguments do). Every tenth declaration
+    replaces the builder of an earlier name, as a typedef of a structure of the same name does. The registry is then
+    reordered, as the sharded generation does, and every position is looked up again.
+
+    Args:
+        size (int): The number of declarations.
+        lookups (int): The number of earlier builders every builder looks up. Defaults to 4.
+        seed (int): The seed of the pseudo-random choices. Defaults to 0.
+
+    Returns:
+        float: The time in seconds.
+    """
+    randomizer = random.Random(seed)
+    names = ['decl%d' % i for i in range(size)]
+    builders = BuilderRegistry(ctype_objects=False)
+    start = time.perf_counter()
+    for i, name in enumerate(names):
+        if i % 10 == 9:
+            name = names[randomizer.randrange(i)]
+        entry = builders[name] = RegistryEntry(name)
+        builders.index_of(entry)
+        for _ in range(lookups):
+            referenced = names[randomizer.randrange(i + 1)]
+            if builders.index(referenced) >= 0:
+                builders.index_of(builders[referenced])
+    for name in sorted(builders, key=lambda name: randomizer.random()):
+        builders.move_to_end(name)
+    for position in range(len(builders)):
+        builders.index_of(builders.at(position))
+    return time.perf_counter() - start
+
+
+def measure_scaling(sizes: List[int], repeat: int = 3, lookups: int = 4) -> Dict[int, float]:
+    """
+    Measure the time per declaration of filling a registry, for several numbers of declarations.
+
+    Args:
+        sizes (List[int]): The numbers of declarations.
+        repeat (int): The number of timed runs of every size, the best one being kept. Defaults to 3.
+        lookups (int): The number of earlier builders every builder looks up. Defaults to 4.
+
+    Returns:
+        Dict[int, float]: The best time per declaration in seconds, by number of declarations.
+    """
+    return {size: min(run_once(size, lookups=lookups, seed=i) for i in range(max(repeat, 1))) / size
+            for size in sizes}
+
+
+def main(sizes: List[int] = None, repeat: int = 3, lookups: int = 4, tolerance: float = 3.0) -> bool:
+    """
+    Check that filling a registry scales linearly with the number of declarations, and report the times.
+
+    Args:
+        sizes (List[int], optional): The numbers of declarations. Defaults to 1000 up to 50000.
+        repeat (int, optional): The number of timed runs of every size. Defaults to 3.
+        lookups (int, optional): The number of earlier builders every builder looks up. Defaults to 4.
+        tolerance (float, optional): The largest accepted ratio between the time per declaration of the largest and
+         of the smallest size. A registry scanning its values would exceed it by orders of magnitude. Defaults to 3.
+
+    Returns:
+        bool: True if the registry scales linearly.
+    """
+    sizes = sorted(sizes or default_sizes)
+    per_declaration = measure_scaling(sizes, repeat=repeat, lookups=lookups)
+    smallest = per_declaration[sizes[0]]
+    for size in sizes:
+        print('%8d declarations  %8.3fs  %6.2f us per declaration  x%.2f' %
+              (size, per_declaration[size] * size, per_declaration[size] * 1e6, per_declaration[size] / smallest))
+    ratio = per_declaration[sizes[-1]] / smallest
+    linear = ratio <= tolerance
+    print('%s: the time per declaration grows x%.2f from %d to %d declarations (tolerance x%.2f)' %
+          ('Linear' if linear else 'Not linear', ratio, sizes[0], sizes[-1], tolerance))
+    return linear
+
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(description="Check that the builder registry scales linearly with the number "
+                                                    "of declarations.", add_help=True)
+    argparser.add_argument("--sizes", type=int, nargs="+", help="Numbers of declarations (default: 1000 to 50000)")
+    argparser.add_argument("-r", "--repeat", type=int, default=3, help="Number of timed runs per size (default: 3)")
+    argparser.add_argument("--lookups", type=int, default=4,
+                           help="Number of earlier builders every builder looks up (default: 4)")
+    argparser.add_argument("--tolerance", type=float, default=3.0,
+                           help="Largest accepted growth of the time per declaration (default: 3)")
+
+    args = argparser.parse_args()
+
+    # Call the main function with arguments from the command line, failing the run if the check fails
+    sys.exit(0 if main(args.sizes, args.repeat, args.lookups, args.tolerance) else 1)
@@ -0,0 +1,287 @@
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+from typing import Dict, Optional
+from pygccxml import utils, parser
+from benchmarks.header_generator import HeaderSpec, presets, write_header
+from src.builders.builder_registry import BuilderRegistry
+from src.builders.ordering import get_references, is_forward_declarable, get_definition_order
+from src.main import populate_builders
+from src.tools.string_tools import get_words
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Phases of a generation run, in execution order
+phases = ['parse', 'populate', 'to_string']
+
+results_format_version = 1
+
+
+def emit(builders: BuilderRegistry) -> str:
+    """
+    Generate the code of populated builders in definition order, as the command line does.
+
+    Args:
+        builders (BuilderRegistry): The populated builders.
+
+    Returns:
+        str: The generated code.
+    """
+    names = list(builders)
+    references = {name: get_references(builders[name]) for name in names}
+    forward_declarable = {name for name in names if is_forward_declarable(builders[name])}
+    stream = io.StringIO()
+    stream.write('import ctypes\n')
+    for name, definition in get_definition_order(names, references, forward_declarable):
+        stream.write('\n')
+        stream.write(builders[name].to_string(definition=definition))
+        stream.write('\n')
+    return stream.getvalue()
+
+
+def run_once(header_path: str, xml_generator_config, trace_memory: bool = False) -> Dict[str, Dict[str, float]]:
+    """
+    Run all phases of a generation once.
+
+    Args:
+        header_path (str): The path of the header to generate code for.
+        xml_generator_config: The configuration of the XML generator.
+        trace_memory (bool): Whether to record the peak memory allocated during every phase. Tracing memory slows
+         down the phases, so their times are not representative in that case.
+
+    Returns:
+        Dict[str, Dict[str, float]]: The time in seconds ('seconds') and, if traced, the peak allocated memory in
+         bytes ('peak_memory') of every phase, along with counts describing the run ('counts').
+    """
+    measurements = {}
+
+    def measure(phase: str, function, *args):
+        if trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        result = function(*args)
+        measurements[phase] = {'seconds': time.perf_counter() - start}
+        if trace_memory:
+            measurements[phase]['peak_memory'] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        return result
+
+    decls = measure('parse', parser.parse, [header_path], xml_generator_config)
+    header_words = get_words(header_path)
+    builders = measure('populate', populate_builders, decls, header_words)
+    code = measure('to_string', emit, builders)
+    measurements['counts'] = {'declarations': len(decls[0].declarations), 'builders': len(builders),
+                              'output_bytes': len(code)}
+    return measurements
+
+
+def get_commit() -> Optional[str]:
+    """
+    Get the commit of the working tree the benchmarks run on.
+
+    Returns:
+        Optional[str]: The commit hash, suffixed with '-dirty' if there are uncommitted changes, or None if it cannot
+         be determined.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=root, capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=root,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + '-dirty' if dirty else commit
+
+
+def run_benchmark(spec: HeaderSpec, repeat: int = 3, trace_memory: bool = True, generator_path: str = None,
+                  generator_name: str = None, header_path: str = None) -> Dict[str, object]:
+    """
+    Benchmark the generation of code for a synthetic header.
+
+    Every phase is timed over several runs and the best and mean times are reported. The peak memory of every phase
+    is recorded in an additional traced run.
+
+    Args:
+        spec (HeaderSpec): The parameters of the synthetic header.
+        repeat (int): The number of timed runs.
+        trace_memory (bool): Whether to record the peak memory of every phase.
+        generator_path (str): Path to the XML generator executable. Defaults to the one found by pygccxml.
+        generator_name (str): Name of the XML generator. Defaults to the one found by pygccxml.
+        header_path (str): Where to write the synthetic header. Defaults to a temporary file that is removed
+         afterwards.
+
+    Returns:
+        Dict[str, object]: The results, ready to be saved as JSON.
+    """
+    generator_path_utils, generator_name_utils = utils.find_xml_generator()
+    xml_generator_config = parser.xml_generator_configuration_t(
+        xml_generator_path=generator_path if generator_path is not None else generator_path_utils,
+        xml_generator=generator_name if generator_name is not None else generator_name_utils)
+
+    temporary_dir = None
+    if header_path is None:
+        temporary_dir = tempfile.TemporaryDirectory()
+        header_path = os.path.join(temporary_dir.name, 'benchmark.h')
+    try:
+        write_header(spec, header_path)
+        runs = [run_once(header_path, xml_generator_config) for _ in range(max(repeat, 1))]
+        traced = run_once(header_path, xml_generator_config, trace_memory=True) if trace_memory else None
+    finally:
+        if temporary_dir is not None:
+            temporary_dir.cleanup()
+
+    results = {}
+    for phase in phases:
+        seconds = [run[phase]['seconds'] for run in runs]
+        results[phase] = {'best': min(seconds), 'mean': sum(seconds) / len(seconds), 'runs': seconds}
+        if traced is not None:
+            results[phase]['peak_memory'] = traced[phase]['peak_memory']
+    return {
+        'version': results_format_version,
+        'commit': get_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'spec': spec.to_dict(),
+        'counts': runs[0]['counts'],
+        'phases': results,
+        'max_rss': get_max_rss(),
+    }
+
+
+def get_max_rss() -> Optional[int]:
+    """
+    Get the peak resident set size of the process.
+
+    Returns:
+        Optional[int]: The peak resident set size in bytes, or None where it is not available, e.g. on Windows.
+    """
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+
+
+def format_results(results: Dict[str, object], baseline: Optional[Dict[str, object]] = None) -> str:
+    """
+    Format benchmark results as a human-readable table, optionally compared to baseline results.
+
+    Args:
+        results (Dict[str, object]): The results, as returned by run_benchmark.
+        baseline (Optional[Dict[str, object]]): Earlier results of the same spec to compare with.
+
+    Returns:
+        str: The table.
+    """
+    lines = ['Commit %s, %d declarations, %d builders, %d bytes of code' %
+             (results['commit'], results['counts']['declarations'], results['counts']['builders'],
+              results['counts']['output_bytes'])]
+    if baseline is not None:
+        lines.append('Baseline commit %s' % baseline['commit'])
+        if baseline['spec'] != results['spec']:
+            lines.append('Warning: the baseline was measured on a different header spec')
+    for phase in phases:
+        current = results['phases'][phase]
+        line = '%-10s best %8.3fs  mean %8.3fs' % (phase, current['best'], current['mean'])
+        if 'peak_memory' in current:
+            line += '  peak %8.1f MB' % (current['peak_memory'] / 1e6)
+        if baseline is not None and phase in baseline['phases']:
+            previous = baseline['phases'][phase]
+            line += '  time %+6.1f%%' % get_change(previous['best'], current['best'])
+            if 'peak_memory' in current and 'peak_memory' in previous:
+                line += '  memory %+6.1f%%' % get_change(previous['peak_memory'], current['peak_memory'])
+        lines.append(line)
+    if results['max_rss'] is not None:
+        lines.append('Max RSS %.1f MB' % (results['max_rss'] / 1e6))
+    return '\n'.join(lines)
+
+
+def get_change(previous: float, current: float) -> float:
+    """
+    Get the relative change between two measurements.
+
+    Args:
+        previous (float): The earlier measurement.
+        current (float): The new measurement.
+
+    Returns:
+        float: The change in percent of the earlier measurement.
+    """
+    return 100.0 * (current - previous) / previous if previous else 0.0
+
+
+def main(preset: str = 'small', output: str = None, compare: str = None, repeat: int = 3, no_memory: bool = False,
+         keep_header: str = None, overrides: Dict[str, object] = None):
+    """
+    Run the generator benchmark on a synthetic header and report the results.
+
+    Args:
+        preset (str, optional): The name of the header spec to start from. Defaults to 'small'.
+        output (str, optional): Path of the JSON file to save the results to. Defaults to None.
+        compare (str, optional): Path of a JSON results file of an earlier run to compare with. Defaults to None.
+        repeat (int, optional): The number of timed runs. Defaults to 3.
+        no_memory (bool, optional): Skip the traced run that records the peak memory of every phase. Defaults to
+         False.
+        keep_header (str, optional): Path to write the synthetic header to, instead of a temporary file.
+         Defaults to None.
+        overrides (Dict[str, object], optional): Header spec parameters overriding the preset. Defaults to None.
+
+    Raises:
+        Exception: Raised when the preset is unknown.
+    """
+    if preset not in presets:
+        raise Exception('Unknown preset %s, expected one of %s' % (preset, ', '.join(presets)))
+    values = presets[preset].to_dict()
+    values.update({key: value for key, value in (overrides or {}).items() if value is not None})
+    spec = HeaderSpec.from_dict(values)
+
+    results = run_benchmark(spec, repeat=repeat, trace_memory=not no_memory, header_path=keep_header)
+    baseline = None
+    if compare is not None:
+        with open(compare) as f:
+            baseline = json.load(f)
+    print(format_results(results, baseline))
+    if output is not None:
+        with open(output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(description="Benchmark the code generation on a synthetic C++ header.",
+                                        add_help=True)
+    argparser.add_argument("--preset", default='small', choices=list(presets),
+                           help="Header spec to start from (default: small)")
+    argparser.add_argument("-o", "--output", help="JSON file to save the results to")
+    argparser.add_argument("--compare", help="JSON results file of an earlier run to compare with")
+    argparser.add_argument("-r", "--repeat", type=int, default=3, help="Number of timed runs (default: 3)")
+    argparser.add_argument("--no-memory", action="store_true", help="Do not record the peak memory of every phase")
+    argparser.add_argument("--keep-header", help="Write the synthetic header to this path")
+    group = argparser.add_argument_group('header spec', 'Override the parameters of the preset')
+    group.add_argument("--functions", type=int, help="Number of free functions")
+    group.add_argument("--classes", type=int, help="Number of classes")
+    group.add_argument("--fields-per-class", type=int, help="Number of fields of every class")
+    group.add_argument("--enums", type=int, help="Number of enumerations")
+    group.add_argument("--enum-size", type=int, help="Number of values of every enumeration")
+    group.add_argument("--pointer-depth", type=int, help="Maximum number of pointers of a type")
+    group.add_argument("--typedefs", type=int, help="Number of typedef chains")
+    group.add_argument("--typedef-depth", type=int, help="Number of typedefs in every chain")
+    group.add_argument("--circular-share", type=float,
+                       help="Share of classes referring to themselves or to a class defined after them")
+    group.add_argument("--seed", type=int, help="Seed of the pseudo-random choices")
+
+    args = argparser.parse_args()
+
+    # Call the main function with arguments from the command line
+    main(args.preset, args.output, args.compare, args.repeat, args.no_memory, args.keep_header,
+         {name: getattr(args, name) for name in HeaderSpec().to_dict()})
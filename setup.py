@@ -2,8 +2,8 @@ from setuptools import setup
 
 setup(
     name='py-cpp-bindings',
-    version='2023.1',
-    packages=['src', 'src.tools', 'src.builders'],
+    version='2023.1',  # Keep in sync with generator_version in src/builders/snapshot.py
+    packages=['src', 'src.tools', 'src.builders', 'src.parsers'],
     url='https://github.com/bornalgo/py-cpp-bindings',
     license='https://github.com/bornalgo/py-cpp-bindings/blob/main/LICENSE',
     author='Borna Ghannadi',
@@ -0,0 +1,250 @@
+from typing import Optional, List, Dict, Tuple
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import json
+import os
+import tempfile
+import time
+from pygccxml import parser
+from src.builders.ctypes_builder import Commented
+from src.builders.profiler import Profiler
+from src.generation_context import GenerationContext
+from src.main import comment_styles, get_xml_generator_config
+from src.parsers.parallel_parser import create_xml_files, create_prelude_xml_file
+from src.parsers.prelude import Prelude
+from src.parsers.xml_filter import get_file_names, prune_xml_file
+from src.tools.file_tools import atomic_open
+from src.tools.log_tools import logger
+from src.tools.parse_cache import ParseCache, default_max_size
+from src.tools.string_tools import join_iterable
+
+try:
+    import tomllib
+except ImportError:
+    tomllib = None
+
+# Fields of a batch manifest target, the path fields being resolved against the directory of the manifest
+target_fields = ('filenames', 'output', 'source_files', 'allow_dirs', 'symbols', 'symbols_file', 'comments')
+target_path_fields = ('filenames', 'output', 'source_files', 'allow_dirs', 'symbols_file')
+
+
+def read_batch_manifest(manifest_path: str,
+                        commented: Commented = Commented.Mixed) -> Tuple[List[str], List[Dict[str, object]]]:
+    """
+    Read a batch manifest, a JSON or TOML file listing several generation targets.
+
+    The manifest holds the list of 'targets', each setting its 'filenames' and 'output' and, optionally, its
+    'source_files', 'allow_dirs', 'symbols', 'symbols_file' and 'comments' style. The same fields at the top level
+    are the defaults of every target. The top level may also set the 'include_paths' of the shared parse. Relative
+    paths are resolved against the directory of the manifest.
+
+    Args:
+        manifest_path (str): The path of the manifest, read as TOML if it ends with .toml and as JSON otherwise.
+        commented (Commented): The type of comments of the targets not setting their comment style.
+
+    Raises:
+        Exception: Raised when the manifest is invalid.
+
+    Returns:
+        Tuple[List[str], List[Dict[str, object]]]: The include paths and the targets, holding the keyword arguments
+         of GenerationContext.write along with their 'output'.
+    """
+    if manifest_path.endswith('.toml'):
+        if tomllib is None:
+            raise Exception('Reading TOML batch manifests requires Python 3.11 or later')
+        with open(manifest_path, 'rb') as f:
+            manifest = tomllib.load(f)
+    else:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    if not isinstance(manifest, dict) or not isinstance(manifest.get('targets'), list) or not manifest['targets']:
+        raise Exception('The batch manifest %s does not list any targets' % manifest_path)
+
+    directory = os.path.dirname(os.path.abspath(manifest_path))
+
+    def resolve(fields: Dict[str, object]) -> Dict[str, object]:
+        unknown = sorted(name for name in fields if name not in target_fields)
+        if unknown:
+            n = len(unknown)
+            raise Exception('Unknown batch manifest field%s (%s)' % ('s' if n > 1 else '', join_iterable(unknown)))
+        resolved = {}
+        for name, value in fields.items():
+            if name in target_path_fields and value is not None:
+                value = [os.path.join(directory, item) for item in value] if isinstance(value, list) else \
+                    os.path.join(directory, value)
+            resolved[name] = value
+        return resolved
+
+    defaults = resolve({name: value for name, value in manifest.items() if name not in ('targets', 'include_paths')})
+    include_paths = [os.path.join(directory, include_path) for include_path in manifest.get('include_paths') or []]
+    targets = []
+    outputs = set()
+    for fields in manifest['targets']:
+        if not isinstance(fields, dict):
+            raise Exception('A batch manifest target must be an object, got %s' % type(fields).__name__)
+        target = dict(defaults, **resolve(fields))
+        if not target.get('filenames') or not target.get('output'):
+            raise Exception('A batch manifest target needs filenames and an output')
+        if target['output'] in outputs:
+            raise Exception('Several batch manifest targets write %s' % target['output'])
+        outputs.add(target['output'])
+        comments = target.pop('comments', None)
+        if comments is not None and comments not in comment_styles:
+            raise Exception('Unknown comment style %s, expected one of %s' %
+                            (comments, join_iterable(comment_styles)))
+        target['commented'] = commented if comments is None else comment_styles[comments]
+        targets.append(target)
+    return include_paths, targets
+
+
+class BatchContext(GenerationContext):
+    def __init__(self, xml_files: Dict[str, str], prelude_xml_file: Optional[str] = None, **kwargs):
+        """
+        Initializes a generation context reading the declarations of the headers from the XML generator output shared
+        by the targets of a batch, rather than running the XML generator again.
+
+        Args:
+            xml_files: The XML file of every header by absolute path.
+            prelude_xml_file: The XML file of the prelude, if the XML files of the headers have been pruned of its
+             declarations.
+            **kwargs: The keyword arguments of GenerationContext.
+        """
+        super().__init__(**kwargs)
+        self.xml_files = xml_files
+        self.prelude_xml_file = prelude_xml_file
+
+    def parse_key(self, filepaths: List[str]) -> str:
+        # The XML files do not change while the batch runs
+        return '\0'.join(filepaths)
+
+    def read(self, filepaths: List[str]) -> list:
+        # Joining the XML files of the headers yields the same declaration tree as parsing the headers together
+        xml_files = [self.xml_files[filepath] for filepath in filepaths]
+        if self.prelude_xml_file is not None:
+            xml_files.insert(0, self.prelude_xml_file)
+        return parser.parse([parser.create_gccxml_fc(xml_file) for xml_file in xml_files], self.xml_generator_config)
+
+
+def generate_targets(targets: List[Dict[str, object]], xml_files: Dict[str, str], prelude_xml_file: Optional[str],
+                     options: Dict[str, object]) -> List[Dict[str, object]]:
+    """
+    Generate batch targets one after the other, sharing a context, i.e. the declarations of the targets with the same
+    headers, the identifiers of the source files and the type resolutions.
+
+    Args:
+        targets (List[Dict[str, object]]): The targets, as returned by read_batch_manifest.
+        xml_files (Dict[str, str]): The XML file of every header by absolute path.
+        prelude_xml_file (Optional[str]): The XML file of the prelude, see BatchContext.
+        options (Dict[str, object]): The keyword arguments of GenerationContext.
+
+    Returns:
+        List[Dict[str, object]]: The report of every target, see run_batch.
+    """
+    context = BatchContext(xml_files, prelude_xml_file, **options)
+    reports = []
+    for target in targets:
+        target = dict(target)
+        output = target.pop('output')
+        profiler = Profiler(trace_memory=False)
+        start = time.perf_counter()
+        try:
+            with atomic_open(output) as f:
+                context.write(f, profiler=profiler, **target)
+        except Exception as e:
+            logger.exception('Generation of %s failed' % output)
+            reports.append({'output': output, 'ok': False, 'error': str(e) or type(e).__name__})
+            continue
+        reports.append({'output': output, 'ok': True, 'seconds': time.perf_counter() - start,
+                        'profile': profiler.report()})
+    return reports
+
+
+def run_batch(manifest_path: str, generator_path: str = None, generator_name: str = None,
+              include_paths: List[str] = None, cache_dir: str = None, no_cache: bool = False,
+              cache_size: int = default_max_size, jobs: int = 1, skip_comments: bool = False,
+              ctype_objects: bool = False, commented: Commented = Commented.Mixed, prelude: List[str] = None,
+              profiler: Optional[Profiler] = None) -> List[Dict[str, object]]:
+    """
+    Generate all targets of a batch manifest from one shared parse.
+
+    The XML generator runs once per distinct header of the targets. Every target then reads the output of its own
+    headers, so its code is identical to the one main writes for the same arguments, without compiling the headers,
+    and what they include, again.
+
+    Args:
+        manifest_path (str): The path of the batch manifest, see read_batch_manifest.
+        generator_path (str, optional): Path to the XML generator executable. Defaults to None.
+        generator_name (str, optional): Name of the XML generator. Defaults to None.
+        include_paths (List[str], optional): Additional include paths, searched after the ones of the manifest.
+         Defaults to None.
+        cache_dir (str, optional): Directory of the parse cache. Defaults to ~/.cache/py-cpp-bindings.
+        no_cache (bool, optional): Disable the parse cache. Defaults to False.
+        cache_size (int, optional): Maximum size of the parse cache in bytes. Defaults to 512 MiB.
+        jobs (int, optional): Number of XML generator processes, and then of target generation processes, to run in
+         parallel. A value below 1 uses all CPUs. Defaults to 1.
+        skip_comments (bool, optional): Disregard identifiers in comments and string literals of the source files.
+         Defaults to False.
+        ctype_objects (bool, optional): Also build the live ctypes objects of the types. Defaults to False.
+        commented (Commented, optional): The type of comments of the targets not setting their comment style.
+         Defaults to Commented.Mixed.
+        prelude (List[str], optional): Includes common to the headers, parsed once rather than read again for every
+         header, see src.parsers.prelude.Prelude. Defaults to None.
+        profiler (Profiler, optional): A hook collecting the time and memory of the shared parse. Defaults to None.
+
+    Raises:
+        Exception: Raised when the manifest is invalid or none of the headers of the targets exist.
+
+    Returns:
+        List[Dict[str, object]]: The report of every target, in manifest order, holding its 'output' and 'ok' set to
+         True along with its generation time ('seconds') and its profiler report ('profile'), or 'ok' set to False
+         along with the error message ('error').
+    """
+    if profiler is None:
+        profiler = Profiler(enabled=False)
+    if jobs is None or jobs < 1:
+        jobs = os.cpu_count() or 1
+
+    manifest_include_paths, targets = read_batch_manifest(manifest_path, commented=commented)
+    include_paths = manifest_include_paths + (include_paths or [])
+    xml_generator_config = get_xml_generator_config(generator_path, generator_name, include_paths)
+    options = {'generator_path': xml_generator_config.xml_generator_path,
+               'generator_name': xml_generator_config.xml_generator, 'include_paths': include_paths,
+               'skip_comments': skip_comments, 'ctype_objects': ctype_objects}
+
+    # Every header is compiled once, however many targets include it. Missing headers are reported by the targets
+    filepaths = list(OrderedDict.fromkeys(os.path.abspath(filename) for target in targets
+                                          for filename in target['filenames'] if os.path.exists(filename)))
+    if not filepaths:
+        raise Exception('None of the headers of the batch manifest %s exist' % manifest_path)
+
+    try:
+        with tempfile.TemporaryDirectory(prefix='py-cpp-bindings-') as temp_dir:
+            with profiler.phase('parse'):
+                xml_files = OrderedDict((filepath, os.path.join(temp_dir, '%d.xml' % i))
+                                        for i, filepath in enumerate(filepaths))
+                cache = None if no_cache else ParseCache(cache_dir, max_size=cache_size)
+                create_xml_files(filepaths, list(xml_files.values()), xml_generator_config, jobs=jobs, cache=cache)
+                prelude_xml_file = None
+                if prelude:
+                    prelude_xml_file = create_prelude_xml_file(Prelude(prelude), os.path.join(temp_dir, 'prelude.xml'),
+                                                               xml_generator_config, cache=cache)
+                    file_names = get_file_names(prelude_xml_file)
+                    for xml_file in xml_files.values():
+                        prune_xml_file(xml_file, file_names)
+
+            with profiler.phase('targets'):
+                workers = min(jobs, len(targets))
+                if workers == 1:
+                    reports = generate_targets(targets, xml_files, prelude_xml_file, options)
+                else:
+                    # Population and emission are bound by the interpreter, so the targets are spread over processes
+                    reports = [None] * len(targets)
+                    with ProcessPoolExecutor(max_workers=workers) as executor:
+                        futures = [executor.submit(generate_targets, targets[i::workers], xml_files, prelude_xml_file,
+                                                   options)
+                                   for i in range(workers)]
+                        for i, future in enumerate(futures):
+                            reports[i::workers] = future.result()
+    finally:
+        profiler.stop()
+    return reports
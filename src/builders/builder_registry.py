@@ -0,0 +1,161 @@
+from collections import OrderedDict
+from typing import Optional, Dict
+from src.builders.type_cache import TypeCache
+
+
+class BuilderRegistry(OrderedDict):
+    def __init__(self, *args, type_cache: Optional[TypeCache] = None, ctype_objects: bool = True, **kwargs):
+        """
+        Initializes an ordered registry of builders by name.
+
+        The registry behaves like an OrderedDict and additionally tracks the insertion position of every name and
+        every builder, so that position lookups take constant time instead of scanning the values. Replacing the
+        builder of an existing name keeps the name's position, as in an OrderedDict.
+
+        Args:
+            *args: Positional arguments forwarded to OrderedDict.
+            type_cache: The type resolution cache of the builders. Defaults to a new cache.
+            ctype_objects: Whether the builders also build the live ctypes objects of their types. The generated code
+             only depends on the ctypes strings, so the objects can be skipped, leaving ctype_object None, when only
+             code is generated. Defaults to True.
+            **kwargs: Keyword arguments forwarded to OrderedDict.
+        """
+        self.type_cache = type_cache if type_cache is not None else TypeCache()
+        self.ctype_objects = ctype_objects
+        self._name_positions: Dict[str, int] = {}
+        self._builder_positions: Dict[int, int] = {}
+        self._builder_counts: Dict[int, int] = {}
+        self._values = []
+        self._stale = False
+        super().__init__(*args, **kwargs)
+
+    def __setitem__(self, key, value):
+        if self._stale:
+            # The position tables are rebuilt on the next lookup anyway
+            super().__setitem__(key, value)
+            return
+        position = self._name_positions.get(key)
+        if position is None:
+            position = len(self._values)
+            self._name_positions[key] = position
+            self._values.append(value)
+            self._add_builder(value, position)
+        elif self._values[position] is not value:
+            # Replacing the builder of a name, e.g. by a typedef of a structure of the same name, is common, so the
+            # tables are updated in place rather than rebuilt
+            replaced = self._values[position]
+            self._values[position] = value
+            self._builder_counts[id(replaced)] -= 1
+            if not self._builder_counts[id(replaced)]:
+                del self._builder_counts[id(replaced)]
+                del self._builder_positions[id(replaced)]
+            elif self._builder_positions[id(replaced)] == position:
+                # The replaced builder is still registered under a later name, whose position is not tracked
+                self._stale = True
+            self._add_builder(value, position)
+        super().__setitem__(key, value)
+
+    def _add_builder(self, builder, position: int):
+        """
+        Record that a builder is registered at a position.
+
+        Args:
+            builder (CtypesBuilder): The builder.
+            position (int): The position of the name it is registered under.
+        """
+        self._builder_counts[id(builder)] = self._builder_counts.get(id(builder), 0) + 1
+        if self._builder_positions.get(id(builder), position) >= position:
+            self._builder_positions[id(builder)] = position
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._stale = True
+
+    def pop(self, key, *args):
+        result = super().pop(key, *args)
+        self._stale = True
+        return result
+
+    def popitem(self, last: bool = True):
+        result = super().popitem(last=last)
+        self._stale = True
+        return result
+
+    def clear(self):
+        super().clear()
+        self._stale = True
+
+    def move_to_end(self, key, last: bool = True):
+        super().move_to_end(key, last=last)
+        self._stale = True
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def __reduce__(self):
+        # The position tables are keyed by object identity and have to be rebuilt rather than copied. The items are
+        # added after the registry is created, since the builders refer back to it
+        return self.__class__, (), {'ctype_objects': self.ctype_objects}, None, iter(self.items())
+
+    def _reindex(self):
+        """
+        Rebuild the position tables after a removal or reordering.
+        """
+        self._name_positions = {}
+        self._builder_positions = {}
+        self._builder_counts = {}
+        self._values = []
+        for position, (key, value) in enumerate(self.items()):
+            self._name_positions[key] = position
+            self._add_builder(value, position)
+            self._values.append(value)
+        self._stale = False
+
+    def index(self, name: str) -> int:
+        """
+        Get the position of a name in the registry.
+
+        Args:
+            name (str): The builder name.
+
+        Returns:
+            int: The position of the name, or -1 if it is not registered.
+        """
+        if self._stale:
+            self._reindex()
+        return self._name_positions.get(name, -1)
+
+    def index_of(self, builder) -> int:
+        """
+        Get the position of the first name a builder is registered under.
+
+        Args:
+            builder (CtypesBuilder): The builder.
+
+        Returns:
+            int: The position of the builder, or -1 if it is not registered.
+        """
+        if self._stale:
+            self._reindex()
+        position = self._builder_positions.get(id(builder), -1)
+        if position >= 0 and self._values[position] is not builder:
+            return -1
+        return position
+
+    def at(self, position: int) -> Optional["CtypesBuilder"]:
+        """
+        Get the builder at a position of the registry.
+
+        Args:
+            position (int): The position.
+
+        Returns:
+            Optional[CtypesBuilder]: The builder, or None if the position is out of range.
+        """
+        if self._stale:
+            self._reindex()
+        if 0 <= position < len(self._values):
+            return self._values[position]
+        return None
@@ -0,0 +1,158 @@
+from typing import Optional, TextIO, Union
+from src.tools.string_tools import extract_leading_whitespace
+
+
+class CodeWriter:
+    def __init__(self, stream: Union[TextIO, "CodeWriter"]):
+        """
+        Initializes a writer that forwards generated code to a text stream or to another writer.
+
+        Writers are chained to apply line transformations while the code is produced, instead of building the whole
+        text and re-scanning it afterwards.
+
+        Args:
+            stream: The text stream or writer receiving the code.
+        """
+        self.stream = stream
+
+    def write(self, text: str):
+        """
+        Write a chunk of code.
+
+        Args:
+            text (str): The code chunk.
+        """
+        self.stream.write(text)
+
+    def close(self):
+        """
+        Flush any pending output. The underlying stream is not closed.
+        """
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+
+
+class PrefixedWriter(CodeWriter):
+    def __init__(self, stream: Union[TextIO, CodeWriter], prefix: str):
+        """
+        Initializes a writer that prefixes the lines it receives, as add_prefix_to_lines does for a whole string.
+
+        The first line receives the prefix, unless it is a comment: then it only receives the prefix's leading
+        whitespace and the prefix moves to the second line. All other lines are aligned under the prefix.
+
+        Args:
+            stream: The text stream or writer receiving the prefixed code.
+            prefix: The prefix.
+        """
+        super().__init__(stream)
+        self.prefix = prefix
+        self.whitespace = extract_leading_whitespace(prefix)
+        self.continuation = self.whitespace + ' ' * (len(prefix) - len(self.whitespace))
+        self.line = 0
+        self.skip_first = False
+        self.resolved = False
+        self.pending = ''
+
+    def write(self, text: str):
+        if not text:
+            return
+        if not self.resolved:
+            # The prefix of the first line depends on its first non-whitespace character
+            index = 0
+            length = len(text)
+            while index < length and text[index] != '\n' and text[index].isspace():
+                index += 1
+            if index == length:
+                self.pending += text
+                return
+            self.resolved = True
+            if text[index] == '#':
+                self.skip_first = True
+                self.stream.write(self.whitespace + self.pending)
+            else:
+                self.stream.write(self.prefix + self.pending)
+            self.pending = ''
+        if self.line == 0 and self.skip_first:
+            index = text.find('\n')
+            if index < 0:
+                self.stream.write(text)
+                return
+            self.stream.write(text[:index + 1] + self.prefix)
+            self.line = 1
+            text = text[index + 1:]
+        count = text.count('\n')
+        if count:
+            self.stream.write(text.replace('\n', '\n' + self.continuation))
+            self.line += count
+        else:
+            self.stream.write(text)
+
+    def close(self):
+        if not self.resolved:
+            self.resolved = True
+            self.stream.write(self.prefix + self.pending)
+            self.pending = ''
+
+
+class IndentedWriter(CodeWriter):
+    def __init__(self, stream: Union[TextIO, CodeWriter], num: int):
+        """
+        Initializes a writer that indents the non-empty lines it receives, as indent does for a whole string.
+
+        Args:
+            stream: The text stream or writer receiving the indented code.
+            num: The number of spaces to indent each non-empty line by. If negative, as many leading characters are
+             removed instead.
+        """
+        super().__init__(stream)
+        self.num = num
+        self.indentation = ' ' * num if num > 0 else ''
+        self.at_line_start = True
+        self.to_remove = -num if num < 0 else 0
+
+    def write(self, text: str):
+        if self.num == 0:
+            self.stream.write(text)
+            return
+        start = 0
+        length = len(text)
+        while start < length:
+            end = text.find('\n', start)
+            if end < 0:
+                end = length
+            if self.at_line_start and end > start:
+                self.at_line_start = False
+                self.stream.write(self.indentation)
+            if self.to_remove and end > start:
+                removed = min(self.to_remove, end - start)
+                self.to_remove -= removed
+                start += removed
+            self.stream.write(text[start:end])
+            if end < length:
+                self.stream.write('\n')
+                self.at_line_start = True
+                self.to_remove = -self.num if self.num < 0 else 0
+            start = end + 1
+
+
+def write_indented(stream: Union[TextIO, CodeWriter], text: Optional[str], num: int):
+    """
+    Write a text to a stream with its non-empty lines indented, as indent does.
+
+    Args:
+        stream: The text stream or writer to write to.
+        text: The text. None is written as 'None', as when formatting the result of indent.
+        num: The number of spaces to indent each non-empty line by. If negative, as many leading characters are
+         removed instead.
+    """
+    if text is None:
+        stream.write('None')
+        return
+    with IndentedWriter(stream, num) as writer:
+        writer.write(text)
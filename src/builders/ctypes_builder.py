@@ -1,7 +1,11 @@
 import ctypes
+import io
 from pygccxml import declarations
-from typing import Union, Optional, List, Tuple, Dict, Set
+from typing import Union, Optional, List, Dict, Tuple, Set, TextIO
+from src.builders.builder_registry import BuilderRegistry
+from src.builders.code_writer import CodeWriter, PrefixedWriter, IndentedWriter, write_indented
 from src.tools.string_tools import *
+from src.tools.type_parser import TypeNode, parse_type
 
 from enum import Enum
 
@@ -54,6 +58,7 @@ cpp_to_ctypes_mapper = {
     'char': 'c_char',
     'wchar_t': 'c_wchar',
     'unsigned char': 'c_ubyte',
+    'signed char': 'c_byte',
     'short': 'c_short',
     'unsigned short': 'c_ushort',
     'int': 'c_int',
@@ -105,12 +110,38 @@ cpp_to_ctypes_mapper = {
     'uintmax_t': 'c_uint64'
 }
 
+# Mapping of C++ type nodes to ctypes types, covering every spelling of the mapped types
+cpp_to_ctypes_node_mapper = {parse_type(cpp_type).unqualified(): ctypes_type
+                             for cpp_type, ctypes_type in cpp_to_ctypes_mapper.items()}
+
+void_type = TypeNode('void')
+
+
+def get_ctypes_type(type_node: TypeNode) -> str:
+    """
+    Get the ctypes type a C++ type is mapped to.
+
+    Args:
+        type_node (TypeNode): The C++ type node.
+
+    Returns:
+        str: The name of the ctypes type, or an empty string if the type is not mapped.
+    """
+    return cpp_to_ctypes_node_mapper.get(type_node.unqualified(), '')
+
 
 class CtypesBuilder:
+    # Builders are created for every argument, field and return type, so they do not carry a per-instance dict
+    __slots__ = ('parent', 'decl', 'decl_string', 'title', 'ctype_base_string', 'ctype_string', 'ctype_object',
+                 'is_reference', 'pointer_count', 'array_pointer_count', 'explicit', 'name', 'default_value',
+                 'is_type', 'is_function', 'is_structure', 'is_enumeration', 'is_constructor', 'arguments',
+                 'argument_types', 'return_type', 'enumerations', 'declarations', 'builders', 'futures',
+                 'dependency', 'dependents', 'declared')
+
     def __init__(self, decl: declarations_type, decl_string: str = None,
                  title: str = None, name: str = None, default_value: str = None,
                  is_reference: bool = False, is_type: bool = False,
-                 is_function: bool = False, is_structure: bool = False, builders: Optional[dict] = None,
+                 is_function: bool = False, is_structure: bool = False, builders: Optional[BuilderRegistry] = None,
                  futures: Optional[set] = None, explicit: bool = False, parent: Optional["CtypesBuilder"] = None):
         """
         Initializes a CtypesBuilder instance.
@@ -125,7 +156,7 @@ class CtypesBuilder:
             is_type: Indicates if the declaration represents a type.
             is_function: Indicates if the declaration is a function.
             is_structure: Indicates if the declaration is a structure.
-            builders: A dictionary of builders.
+            builders: A registry of builders.
             futures: A set of future declarations.
             explicit: Indicates if the declaration is explicit.
             parent: The parent CtypesBuilder instance.
@@ -153,20 +184,21 @@ class CtypesBuilder:
         self.is_function = is_function
         self.is_structure = is_structure
         self.is_enumeration = False
-        self.is_constructor = False
+        self.is_constructor = isinstance(decl, declarations.constructor_t)
         self.arguments = None
         self.argument_types = None
         self.return_type = None
         self.enumerations = None
         self.declarations = None
         if builders is None:
-            builders = {}
+            builders = BuilderRegistry()
         self.builders = builders
         if futures is None:
             futures = set()
         self.futures = futures
         self.dependency: Optional[CtypesBuilder] = None
-        self.dependents: List[CtypesBuilder] = []
+        # Only the builders other builders depend on get their dependents, in insertion order (the values are unused)
+        self.dependents: Optional[Dict[CtypesBuilder, None]] = None
         self.declared = False
 
     def collect(self, inner_type: 'CtypesBuilder'):
@@ -196,13 +228,16 @@ class CtypesBuilder:
         Notes:
             If the outer type is a POINTER and a matching typedef exists, the type is updated accordingly.
         """
+        ctype_objects = getattr(self.builders, 'ctype_objects', True)
         if not explicit and outer_ctype_string == 'ctypes.POINTER' and \
                 f'{remove_prefix(self.ctype_string, "ctypes.")}_p' in cpp_to_ctypes_mapper:
             self.ctype_string = f'{self.ctype_string}_p'
-            self.ctype_object = getattr(ctypes_module, f'{remove_prefix(self.ctype_string, "ctypes.")}_p')
+            if ctype_objects:
+                self.ctype_object = getattr(ctypes_module, f'{remove_prefix(self.ctype_string, "ctypes.")}_p')
         else:
             self.ctype_string = f'{outer_ctype_string}({self.ctype_string})'
-            self.ctype_object = outer_ctype_object(self.ctype_object)
+            if ctype_objects:
+                self.ctype_object = outer_ctype_object(self.ctype_object)
         if outer_ctype_string == 'ctypes.POINTER':
             self.pointer_count += 1
 
@@ -217,7 +252,7 @@ class CtypesBuilder:
 
     @classmethod
     def populate(cls, decl: declarations_type, title: str = None, decl_origin: declarations_type = None,
-                 builders: Optional[dict] = None, futures: Optional[set] = None, explicit: bool = False,
+                 builders: Optional[BuilderRegistry] = None, futures: Optional[set] = None, explicit: bool = False,
                  parent: Optional["CtypesBuilder"] = None):
         """
         Populate a CtypesBuilder instance based on a given declaration or type.
@@ -226,7 +261,7 @@ class CtypesBuilder:
             decl: The declaration or type to populate from.
             title: The title of the builder.
             decl_origin: The declaration origin.
-            builders: A dictionary of builders.
+            builders: A registry of builders.
             futures: A set of future declarations.
             explicit: Indicates whether the declaration is explicit.
             parent: The parent CtypesBuilder instance.
@@ -235,7 +270,7 @@ class CtypesBuilder:
             CtypesBuilder: A populated CtypesBuilder instance.
         """
         if builders is None:
-            builders = {}
+            builders = BuilderRegistry()
         if futures is None:
             futures = set()
 
@@ -250,19 +285,21 @@ class CtypesBuilder:
 
         # Handle other declarations or types
         if decl_origin is not None and hasattr(decl_origin, 'decl_string'):
-            decl_string = clean_type(decl_origin.decl_string)
+            decl_string = normalize_type(decl_origin.decl_string, builders)
         elif decl is not None and hasattr(decl, 'decl_string'):
-            decl_string = clean_type(decl.decl_string)
+            decl_string = normalize_type(decl.decl_string, builders)
         else:
             decl_string = None
 
         self = cls(decl, decl_string=decl_string, title=title, builders=builders, futures=futures,
                    explicit=explicit, parent=parent)
+        ctype_objects = getattr(builders, 'ctype_objects', True)
 
         if isinstance(decl, (declarations.free_function_type_t, declarations.member_function_type_t)):
             # Handle free function types
             self.ctype_string = 'ctypes.CFUNCTYPE'
-            self.ctype_object = ctypes.CFUNCTYPE
+            if ctype_objects:
+                self.ctype_object = ctypes.CFUNCTYPE
             self.is_function = True
             self.return_type = CtypesBuilder.populate(decl.return_type, decl_origin=decl,
                                                       builders=builders, futures=futures, explicit=self.explicit,
@@ -277,7 +314,8 @@ class CtypesBuilder:
             if isinstance(decl, declarations.enumeration_t):
                 # Handle enumerations
                 self.ctype_string = 'ctypes.c_int'
-                self.ctype_object = ctypes.c_int
+                if ctype_objects:
+                    self.ctype_object = ctypes.c_int
                 self.enumerations = decl.values
                 self.is_enumeration = True
             elif isinstance(decl, declarations.class_t):
@@ -290,7 +328,8 @@ class CtypesBuilder:
                                    declarations.member_function_t)):
                 # Handle constructors and free functions
                 self.ctype_string = 'ctypes.CFUNCTYPE'
-                self.ctype_object = ctypes.CFUNCTYPE
+                if ctype_objects:
+                    self.ctype_object = ctypes.CFUNCTYPE
                 self.is_function = True
                 self.return_type = CtypesBuilder.populate(decl.return_type, decl_origin=decl, builders=builders,
                                                           futures=futures, explicit=self.explicit, parent=self)
@@ -307,6 +346,16 @@ class CtypesBuilder:
 
         return self
 
+    def __getstate__(self) -> tuple:
+        # The live ctypes objects cannot be pickled and the generated code does not depend on them
+        state = [getattr(self, attr_name) for attr_name in self.__slots__]
+        state[self.__slots__.index('ctype_object')] = None
+        return tuple(state)
+
+    def __setstate__(self, state: tuple):
+        for attr_name, value in zip(self.__slots__, state):
+            setattr(self, attr_name, value)
+
     def copy(self, other):
         """
         Copy attributes from another CtypesBuilder instance.
@@ -314,8 +363,8 @@ class CtypesBuilder:
         Args:
             other (CtypesBuilder): The other CtypesBuilder instance to copy attributes from.
         """
-        for attr_name in vars(self):
-            if not attr_name.startswith("__") and hasattr(other, attr_name):
+        for attr_name in self.__slots__:
+            if hasattr(other, attr_name):
                 setattr(self, attr_name, getattr(other, attr_name))
 
     def get_ctype_string(self) -> str:
@@ -378,6 +427,30 @@ class CtypesBuilder:
         Returns:
             str: The string representation of the CtypesBuilder object.
         """
+        stream = io.StringIO()
+        self.write(stream, commented=commented, postfix=postfix, prefix=prefix, begin=begin, end=end,
+                   definition=definition, divider=divider)
+        return stream.getvalue()
+
+    def write(self, stream: Union[TextIO, CodeWriter], commented: Commented = Commented.Mixed, postfix: str = '',
+              prefix: str = '', begin: str = None, end: str = None, definition: Definition = Definition.Undefined,
+              divider: str = '\n\n'):
+        """
+        Write the code of the CtypesBuilder object to a stream, as returned by to_string.
+
+        The code is written piece by piece while it is generated, so the code of the whole object, or of its
+        dependents, is never held in memory at once.
+
+        Args:
+            stream (Union[TextIO, CodeWriter]): The text stream or code writer to write to.
+            commented (Commented): The type of comment to add.
+            postfix (str): The postfix for the generated code.
+            prefix (str): The prefix for the generated code.
+            begin (str): The custom beginning code.
+            end (str): The custom ending code.
+            definition (Definition): The definition type of the comment.
+            divider (str): The divider between multiple generated strings.
+        """
         self.declared = True
         if self.is_function:
             comment = self.get_comment(prefix='# Function type for ', postfix='\n', definition=definition,
@@ -401,67 +474,74 @@ class CtypesBuilder:
                                    postfix=restype_postfix, definition=definition)
             argtypes = self.argtypes(prefix=sub_prefix, commented=Commented.inner(commented),
                                      postfix=argtypes_postfix, definition=definition)
-            if definition == Definition.Pre or (definition == Definition.Undefined and self.has_dependency()):
-                if comment:
-                    comment += ' (Pre-definition)'
-                code = begin + 'None)'
-            elif commented == Commented.NoComment:
-                if definition == Definition.Post or definition == Definition.Mixed:
+            with PrefixedWriter(stream, prefix) as writer:
+                if definition == Definition.Pre or (definition == Definition.Undefined and self.has_dependency()):
                     if comment:
-                        comment += ' (Post-definition)'
-                    if self.pointer_count > 0:
-                        code = f'{funcname}.contents = {self.get_ctype_string_with_pointer(count=-1)}({restype}, ' \
-                               f'{argtypes}' + (')' * self.pointer_count) + end
+                        comment += ' (Pre-definition)'
+                    writer.write(comment)
+                    writer.write(begin + 'None)')
+                elif commented == Commented.NoComment:
+                    if definition == Definition.Post or definition == Definition.Mixed:
+                        if comment:
+                            comment += ' (Post-definition)'
+                        writer.write(comment)
+                        if self.pointer_count > 0:
+                            writer.write(f'{funcname}.contents = {self.get_ctype_string_with_pointer(count=-1)}('
+                                         f'{restype}, {argtypes}' + (')' * self.pointer_count) + end)
+                        else:
+                            writer.write(f'{funcname}.restype = {restype}\n{funcname}.argtypes = [{argtypes}]')
                     else:
-                        code = f'{funcname}.restype = {restype}\n{funcname}.argtypes = [{argtypes}]'
+                        writer.write(comment)
+                        writer.write(begin + f'{restype}, {argtypes}' + (')' * (1 + self.pointer_count)) + end)
                 else:
-                    code = begin + f'{restype}, ' \
-                                   f'{argtypes}' + (')' * (1 + self.pointer_count)) + end
-            else:
-                if definition == Definition.Post or definition == Definition.Mixed:
-                    if comment:
-                        comment += ' (Post-definition)'
-                    if self.pointer_count > 0:
-                        begin_post = f'{funcname}.contents = {self.get_ctype_string_with_pointer(count=-1)}('
-                        restype = indent(restype, len(begin_post) - len(begin))
-                        argtypes = indent(argtypes, len(begin_post) - len(begin))
-                        code = f'{funcname}.contents = {self.get_ctype_string_with_pointer(count=-1)}({restype}, ' \
-                               f'{argtypes}' + (')' * self.pointer_count) + end
-                    else:
-                        begin_argtypes = f'{funcname}.argtypes = ['
-                        argtypes = indent(argtypes, len(begin_argtypes) - len(begin))
-                        if Commented.inner(commented) == Commented.Outline:
-                            begin_restype = f'{funcname}.restype = ('
-                            restype = indent(restype, len(begin_restype) - len(begin))
-                            code = f'{begin_restype}\n{restype})' \
-                                   f'{begin_argtypes}\n{argtypes}{" " * len(begin_argtypes)}]'
+                    if definition == Definition.Post or definition == Definition.Mixed:
+                        if comment:
+                            comment += ' (Post-definition)'
+                        writer.write(comment)
+                        if self.pointer_count > 0:
+                            begin_post = f'{funcname}.contents = {self.get_ctype_string_with_pointer(count=-1)}('
+                            writer.write(begin_post)
+                            write_indented(writer, restype, len(begin_post) - len(begin))
+                            writer.write(', ')
+                            write_indented(writer, argtypes, len(begin_post) - len(begin))
+                            writer.write((')' * self.pointer_count) + end)
                         else:
-                            begin_restype = f'{funcname}.restype = '
-                            restype = indent(restype, len(begin_restype) - len(begin))
-                            code = f'{begin_restype}{restype}' \
-                                   f'{begin_argtypes}\n{argtypes}{" " * len(begin_argtypes)}]'
-                else:
-                    code = f'{begin}\n{restype}\n' \
-                           f'{argtypes}{" " * len(begin)}' + (')' * (1 + self.pointer_count)) + end
-            res = add_prefix_to_lines(f'{comment}{code}', prefix)
+                            begin_argtypes = f'{funcname}.argtypes = ['
+                            if Commented.inner(commented) == Commented.Outline:
+                                begin_restype = f'{funcname}.restype = ('
+                                writer.write(f'{begin_restype}\n')
+                                write_indented(writer, restype, len(begin_restype) - len(begin))
+                                writer.write(')')
+                            else:
+                                begin_restype = f'{funcname}.restype = '
+                                writer.write(begin_restype)
+                                write_indented(writer, restype, len(begin_restype) - len(begin))
+                            writer.write(f'{begin_argtypes}\n')
+                            write_indented(writer, argtypes, len(begin_argtypes) - len(begin))
+                            writer.write(f'{" " * len(begin_argtypes)}]')
+                    else:
+                        writer.write(comment)
+                        writer.write(f'{begin}\n{restype}\n{argtypes}{" " * len(begin)}' +
+                                     (')' * (1 + self.pointer_count)) + end)
         elif self.is_enumeration:
             if begin is None:
                 begin = ''
             if end is None:
                 end = ''
             comment = self.get_comment(prefix='# Enum for ', commented=commented)
-            enumerations = self.enums(prefix=' ' * 4, postfix='\n' + postfix, definition=definition)
             if definition == Definition.Pre or (definition == Definition.Undefined and self.has_dependency()):
-                res = ''
+                pass
+            elif commented == Commented.NoComment:
+                stream.write(f'{begin}class {self.get_decl_string()}(IntEnum):\n')
+                self.write_enums(stream, prefix=' ' * 4, postfix='\n' + postfix, definition=definition)
+                stream.write(end)
             else:
-                if commented == Commented.NoComment:
-                    res = f'{begin}class {self.get_decl_string()}(IntEnum):\n{enumerations}{end}'
-                elif commented == Commented.Inline:
-                    res = add_prefix_to_lines(f'class {self.get_decl_string()}(IntEnum):    {comment}\n{enumerations}',
-                                              prefix)
-                else:
-                    res = add_prefix_to_lines(f'{comment}\nclass {self.get_decl_string()}(IntEnum):\n{enumerations}',
-                                              prefix)
+                with PrefixedWriter(stream, prefix) as writer:
+                    if commented == Commented.Inline:
+                        writer.write(f'class {self.get_decl_string()}(IntEnum):    {comment}\n')
+                    else:
+                        writer.write(f'{comment}\nclass {self.get_decl_string()}(IntEnum):\n')
+                    self.write_enums(writer, prefix=' ' * 4, postfix='\n' + postfix, definition=definition)
         elif self.is_structure:
             if begin is None:
                 begin = ''
@@ -469,44 +549,42 @@ class CtypesBuilder:
                 end = ''
             comment = self.get_comment(prefix='# Structure for ', commented=commented)
             n = len('    _fields_ = [')
-            decls = self.decls(prefix=' ' * n, postfix='\n' + postfix, commented=Commented.inner(commented),
-                               definition=definition)
-
-            if definition == Definition.Pre or (definition == Definition.Undefined and self.has_dependency()):
-                if comment:
-                    comment += ' (Pre-definition)'
-                if commented == Commented.NoComment:
-                    res = add_prefix_to_lines(
-                        f'{begin}class {self.get_decl_string()}(ctypes.Structure):\n    pass{end}', prefix)
-                elif commented == Commented.Inline:
-                    res = add_prefix_to_lines(f'{begin}class {self.get_decl_string()}(ctypes.Structure):    {comment}\n'
-                                              f'    pass{end}', prefix)
-                else:
-                    res = add_prefix_to_lines(f'{comment}\n{begin}class {self.get_decl_string()}(ctypes.Structure):\n'
-                                              f'    pass{end}', prefix)
-            else:
-                code = f'{decls}{" " * n}'
-                if definition == Definition.Post or definition == Definition.Mixed:
+            # The fields are generated before deciding on a pre-definition, since generating them resolves the
+            # dependencies of the structure
+            fields = self.decl_strings(prefix=' ' * n, commented=Commented.inner(commented), definition=definition)
+            with PrefixedWriter(stream, prefix) as writer:
+                if definition == Definition.Pre or (definition == Definition.Undefined and self.has_dependency()):
                     if comment:
-                        comment += ' (Post-definition)'
-                    begin_post = begin + self.get_decl_string() + '._fields_ = ['
-                    decls = indent(decls, len(begin_post) - n)
-                    code = f'{decls}{" " * len(begin_post)}'
+                        comment += ' (Pre-definition)'
                     if commented == Commented.NoComment:
-                        res = add_prefix_to_lines(f'{begin_post}{code}]{end}', prefix)
+                        writer.write(f'{begin}class {self.get_decl_string()}(ctypes.Structure):\n    pass{end}')
+                    elif commented == Commented.Inline:
+                        writer.write(f'{begin}class {self.get_decl_string()}(ctypes.Structure):    {comment}\n'
+                                     f'    pass{end}')
                     else:
-                        res = add_prefix_to_lines(f'{comment}\n{begin_post}{code}]{end}', prefix)
+                        writer.write(f'{comment}\n{begin}class {self.get_decl_string()}(ctypes.Structure):\n'
+                                     f'    pass{end}')
+                elif definition == Definition.Post or definition == Definition.Mixed:
+                    if comment:
+                        comment += ' (Post-definition)'
+                    begin_post = begin + self.get_decl_string() + '._fields_ = ['
+                    if commented != Commented.NoComment:
+                        writer.write(f'{comment}\n')
+                    writer.write(begin_post)
+                    with IndentedWriter(writer, len(begin_post) - n) as indented:
+                        write_fields(indented, fields, '\n' + postfix)
+                    writer.write(f'{" " * len(begin_post)}]{end}')
                 else:
                     if commented == Commented.NoComment:
-                        res = add_prefix_to_lines(
-                            f'{begin}class {self.get_decl_string()}(ctypes.Structure):\n    _fields_ = ['
-                            f'{code}]{end}', prefix)
+                        writer.write(f'{begin}class {self.get_decl_string()}(ctypes.Structure):\n    _fields_ = [')
                     elif commented == Commented.Inline:
-                        res = add_prefix_to_lines(f'{begin}class {self.get_decl_string()}(ctypes.Structure):    '
-                                                  f'{comment}\n    _fields_ = [{code}]{end}', prefix)
+                        writer.write(f'{begin}class {self.get_decl_string()}(ctypes.Structure):    '
+                                     f'{comment}\n    _fields_ = [')
                     else:
-                        res = add_prefix_to_lines(f'{comment}\n{begin}class {self.get_decl_string()}(ctypes.Structure):'
-                                                  f'\n    _fields_ = [{code}]{end}', prefix)
+                        writer.write(f'{comment}\n{begin}class {self.get_decl_string()}(ctypes.Structure):'
+                                     f'\n    _fields_ = [')
+                    write_fields(writer, fields, '\n' + postfix)
+                    writer.write(f'{" " * n}]{end}')
         elif self.is_type:
             if begin is None:
                 begin = f'{self.name} = '
@@ -514,33 +592,32 @@ class CtypesBuilder:
                 prefix += begin
             if end is not None:
                 postfix += end
-            res = self.get_code_comment(comment_prefix='# Type for ', prefix=prefix, postfix=postfix,
-                                        commented=commented)
-            if definition == Definition.Pre or (definition == Definition.Undefined and self.has_dependency()):
-                res = ''
+            code = self.get_code_comment(comment_prefix='# Type for ', prefix=prefix, postfix=postfix,
+                                         commented=commented)
+            if not (definition == Definition.Pre or (definition == Definition.Undefined and self.has_dependency())):
+                stream.write(code)
         else:
             comment = self.get_comment(prefix='# Type for ', commented=commented)
             code, comment = self.get_code_update_comment(comment)
-            if definition == Definition.Pre or (definition == Definition.Undefined and self.has_dependency()):
-                res = ''
-            else:
+            if not (definition == Definition.Pre or (definition == Definition.Undefined and self.has_dependency())):
                 if begin is not None:
                     prefix += begin
                 if end is not None:
                     postfix += end
                 if commented == Commented.NoComment:
-                    res = f'{prefix}{code}{postfix}'
+                    stream.write(f'{prefix}{code}{postfix}')
                 elif commented == Commented.Inline:
-                    res = f'{prefix}{code}{postfix}    {comment}'
+                    stream.write(f'{prefix}{code}{postfix}    {comment}')
                 else:
-                    res = add_prefix_to_lines(f'{comment}\n{code}{postfix}', prefix)
-        dependents = [dependent for dependent in self.dependents
+                    with PrefixedWriter(stream, prefix) as writer:
+                        writer.write(f'{comment}\n{code}{postfix}')
+        dependents = [dependent for dependent in self.dependents or ()
                       if dependent is not self.get_parent() or definition == Definition.Undefined]
         if dependents and self.parent is None:
-            res += divider + divider.join([dependent.to_string(commented=commented, postfix=postfix, prefix=prefix,
-                                                               end=end, definition=Definition.Post)
-                                           for dependent in dependents])
-        return res
+            for dependent in dependents:
+                stream.write(divider)
+                dependent.write(stream, commented=commented, postfix=postfix, prefix=prefix, end=end,
+                                definition=Definition.Post)
 
     def get_innest_declaration_string(self) -> str:
         """
@@ -609,14 +686,24 @@ class CtypesBuilder:
             self.parent.set_dependency(dependency)
             self.dependency = self.parent.dependency
         elif self.dependency is None:
-            parent = self.get_parent()
             self.dependency = dependency
-            self.dependency.dependents.append(parent)
+            self.dependency.add_dependent(self.get_parent())
         elif self.dependency is not dependency and self.dependency.typedef_index() < dependency.typedef_index():
             parent = self.get_parent()
-            self.dependency.dependents.remove(parent)
+            del self.dependency.dependents[parent]
             self.dependency = dependency
-            self.dependency.dependents.append(parent)
+            self.dependency.add_dependent(parent)
+
+    def add_dependent(self, dependent: "CtypesBuilder"):
+        """
+        Register a top-level builder that depends on the current CtypesBuilder instance.
+
+        Args:
+            dependent (CtypesBuilder): The dependent top-level CtypesBuilder instance.
+        """
+        if self.dependents is None:
+            self.dependents = {}
+        self.dependents[dependent] = None
 
     def get_dependency(self) -> Optional["CtypesBuilder"]:
         """
@@ -649,6 +736,8 @@ class CtypesBuilder:
         Returns:
             int: The index of the CtypesBuilder instance within the builders, or -1 if not found.
         """
+        if isinstance(self.builders, BuilderRegistry):
+            return self.builders.index_of(self)
         for index, value in enumerate(self.builders.values()):
             if value is self:
                 return index
@@ -778,12 +867,29 @@ class CtypesBuilder:
             Optional[str]: The enumerations as a code comment.
         """
         if isinstance(self.enumerations, list):
-            txt = ''
+            stream = io.StringIO()
+            self.write_enums(stream, prefix=prefix, postfix=postfix, commented=commented, definition=definition)
+            return stream.getvalue()
+        return None
+
+    def write_enums(self, stream: Union[TextIO, CodeWriter], prefix: str = '', postfix: str = '',
+                    commented: Commented = Commented.Inline, definition: Definition = Definition.Undefined):
+        """
+        Write the enumerations to a stream, as returned by enums.
+
+        Args:
+            stream (Union[TextIO, CodeWriter]): The text stream or code writer to write to.
+            prefix (str): The prefix for the comment.
+            postfix (str): The postfix for the comment.
+            commented (Commented): The type of comment to add.
+            definition (Definition): The definition type of the comment.
+        """
+        if isinstance(self.enumerations, list):
             for enumeration in self.enumerations:
                 if isinstance(enumeration, tuple):
-                    txt += f'{prefix}{enumeration[0]} = {enumeration[1]}{postfix}'
-            return txt
-        return None
+                    stream.write(f'{prefix}{enumeration[0]} = {enumeration[1]}{postfix}')
+        else:
+            stream.write('None')
 
     def decls(self, prefix: str = '', postfix: str = '', commented: Commented = Commented.Inline,
               definition: Definition = Definition.Undefined) -> Optional[str]:
@@ -799,23 +905,69 @@ class CtypesBuilder:
         Returns:
             Optional[str]: The declarations as a code comment.
         """
+        fields = self.decl_strings(prefix=prefix, commented=commented, definition=definition)
+        if fields is None:
+            return None
+        stream = io.StringIO()
+        write_fields(stream, fields, postfix)
+        return stream.getvalue()
+
+    def is_field(self) -> bool:
+        """
+        Check if the current CtypesBuilder instance is emitted as a field of its parent structure.
+
+        Returns:
+            bool: True if the declaration is neither a constructor nor unnamed, and has a ctypes type.
+        """
+        return not self.is_constructor and self.get_ctype_string() is not None and \
+            isinstance(self.name, str) and self.name.isidentifier()
+
+    def decl_strings(self, prefix: str = '', commented: Commented = Commented.Inline,
+                     definition: Definition = Definition.Undefined) -> Optional[List[str]]:
+        """
+        Get the code of every declaration emitted as a structure field.
+
+        Args:
+            prefix (str): The prefix for the comment.
+            commented (Commented): The type of comment to add.
+            definition (Definition): The definition type of the comment.
+
+        Returns:
+            Optional[List[str]]: The code of the fields, or None if the builder has no declarations.
+        """
         if isinstance(self.declarations, list):
-            txt = f'{postfix}'
+            fields = []
             for declaration in self.declarations:
                 if isinstance(declaration, CtypesBuilder):
-                    if not isinstance(declaration.decl, declarations.constructor_t) and \
-                            declaration.get_ctype_string() is not None and isinstance(declaration.name, str) and \
-                            declaration.name.isidentifier():
+                    if declaration.is_field():
                         decl_string = declaration.to_string(commented=commented, prefix=prefix,
                                                             begin=f'("{declaration.name}", ', end='), ',
                                                             definition=definition)
                         if declaration.dependency is not None and definition == Definition.Undefined:
                             continue
-                        txt += f'{decl_string}{postfix}'
-            return txt
+                        fields.append(decl_string)
+            return fields
         return None
 
 
+def write_fields(stream: Union[TextIO, CodeWriter], fields: Optional[List[str]], postfix: str = ''):
+    """
+    Write the code of structure fields to a stream, as returned by CtypesBuilder.decls.
+
+    Args:
+        stream (Union[TextIO, CodeWriter]): The text stream or code writer to write to.
+        fields (Optional[List[str]]): The code of the fields, as returned by CtypesBuilder.decl_strings.
+        postfix (str): The postfix written before the fields and after each of them.
+    """
+    if fields is None:
+        stream.write('None')
+        return
+    stream.write(postfix)
+    for field in fields:
+        stream.write(field)
+        stream.write(postfix)
+
+
 def get_innest_decl(decl: declarations_type) -> declarations_type:
     """
     Recursively retrieve the innermost declaration from a given declaration.
@@ -854,11 +1006,28 @@ def get_decl_string(decl: declarations_type) -> Optional[str]:
         return None
 
 
+def normalize_type(type_str: Optional[str], builders: Optional[BuilderRegistry] = None) -> Optional[str]:
+    """
+    Clean and normalize a C++ type string, through the type cache of the builders if they have one.
+
+    Args:
+        type_str (Optional[str]): The C++ type string to be cleaned.
+        builders (Optional[BuilderRegistry]): A registry of builders.
+
+    Returns:
+        Optional[str]: The cleaned C++ type string, or None if the input is None or empty.
+    """
+    type_cache = getattr(builders, 'type_cache', None)
+    if type_cache is None:
+        return clean_type(type_str)
+    return type_cache.normalize(type_str)
+
+
 def cpp_to_ctypes(
     decl: Union[declarations.declaration_t, declarations.type_t],
     title: str = None,
     decl_origin: Union[declarations.declaration_t, declarations.type_t] = None,
-    builders: Optional[dict] = None,
+    builders: Optional[BuilderRegistry] = None,
     futures: Optional[set] = None,
     explicit: bool = False,
     parent: Optional["CtypesBuilder"] = None
@@ -870,7 +1039,7 @@ def cpp_to_ctypes(
         decl (Union[declarations.declaration_t, declarations.type_t]): The C++ declaration to convert.
         title (str): Optional title for the conversion.
         decl_origin (Union[declarations.declaration_t, declarations.type_t]): The original declaration.
-        builders (Optional[dict]): A dictionary of builders.
+        builders (Optional[BuilderRegistry]): A registry of builders.
         futures (Optional[set]): A set of future declarations.
         explicit (bool): Whether to generate explicit ctypes definitions.
         parent (Optional["CtypesBuilder"]): The parent CtypesBuilder instance, if applicable.
@@ -879,7 +1048,7 @@ def cpp_to_ctypes(
         CtypesBuilder: A CtypesBuilder instance representing the converted declaration.
     """
     if builders is None:
-        builders = {}
+        builders = BuilderRegistry()
     if futures is None:
         futures = set()
     if title is not None and title in builders:
@@ -898,7 +1067,7 @@ def cpp_to_ctypes(
         type_name = 'return_type'
     if type_name is not None:
         decl = getattr(decl, type_name)
-    decl_string = clean_type(get_decl_string(decl))
+    decl_string = normalize_type(get_decl_string(decl), builders)
     if isinstance(decl, declarations.reference_t):
         is_reference = True
         decl = decl.base
@@ -931,14 +1100,14 @@ def cpp_to_ctypes(
         if pointer_count > 0:
             pointer_count -= 1
             is_pointer = True
-        decl_str_cleaned = clean_type(decl_str)
+        decl_str_cleaned = normalize_type(decl_str, builders)
         if isinstance(decl, declarations.array_t):
-            decl_str_cleaned = clean_type(decl.base.decl_string)
+            decl_str_cleaned = normalize_type(decl.base.decl_string, builders)
             size = decl.size
         else:
             size = 0
-        if has_whitespace(decl_str_cleaned) and re.sub(r'&\*', '', decl_str_cleaned) not in cpp_to_ctypes_mapper:
-            decl_str_cleaned = clean_type(decl_string)
+        if has_whitespace(decl_str_cleaned) and not get_ctypes_type(parse_type(decl_str_cleaned)):
+            decl_str_cleaned = normalize_type(decl_string, builders)
         res = cpp_str_to_ctypes(decl_str_cleaned, title, is_cleaned=True, explicit=explicit, name=name,
                                 default_value=default_value, is_pointer=is_pointer, is_type=is_type,
                                 is_function=is_function, is_structure=is_structure,
@@ -965,10 +1134,11 @@ def cpp_str_to_ctypes(
         is_structure: bool = False,
         size: int = 0,
         decl: Union[declarations.declaration_t, declarations.type_t] = None,
-        builders: Optional[Dict[str, CtypesBuilder]] = None,
+        builders: Optional[BuilderRegistry] = None,
         futures: Optional[Set[str]] = None,
         explicit: bool = False,
-        parent: Optional["CtypesBuilder"] = None
+        parent: Optional["CtypesBuilder"] = None,
+        type_node: Optional[TypeNode] = None
 ) -> CtypesBuilder:
     """
     Convert a C++ declaration string to a CtypesBuilder instance.
@@ -986,16 +1156,17 @@ def cpp_str_to_ctypes(
         is_structure (bool): Whether the declaration represents a structure.
         size (int): The size of the declaration (for arrays).
         decl (Union[declarations.declaration_t, declarations.type_t]): The original declaration.
-        builders (Optional[Dict[str, CtypesBuilder]]): A dictionary of builders.
+        builders (Optional[BuilderRegistry]): A registry of builders.
         futures (Optional[Set[str]]): A set of future declarations.
         explicit (bool): Whether to generate explicit ctypes definitions.
         parent (Optional["CtypesBuilder"]): The parent CtypesBuilder instance, if applicable.
+        type_node (Optional[TypeNode]): The parsed type of the cleaned declaration string, if already known.
 
     Returns:
         CtypesBuilder: A CtypesBuilder instance representing the converted declaration.
     """
     if builders is None:
-        builders = {}
+        builders = BuilderRegistry()
     if futures is None:
         futures = set()
     if title is not None and title in builders:
@@ -1004,11 +1175,14 @@ def cpp_str_to_ctypes(
     # Clean the declaration string if necessary
     decl_str_cleaned = decl_str
     if not is_cleaned:
-        decl_str_cleaned = clean_type(decl_str)
+        decl_str_cleaned = normalize_type(decl_str, builders)
     if decl_str_cleaned is not None and decl_str_cleaned:
         # Attempt to map the C++ type to a ctypes type
-        ctypes_type = cpp_to_ctypes_mapper.get(decl_str_cleaned, '')
+        if type_node is None:
+            type_node = parse_type(decl_str_cleaned)
+        ctypes_type = get_ctypes_type(type_node)
     else:
+        type_node = None
         ctypes_type = None
 
     # Create a new CtypesBuilder instance
@@ -1016,80 +1190,101 @@ def cpp_str_to_ctypes(
                         default_value=default_value, is_reference=is_reference, builders=builders,
                         futures=futures, parent=parent)
 
+    # Live ctypes objects are only built when the registry asks for them, the generated code only needs the strings
+    ctype_objects = getattr(builders, 'ctype_objects', True)
+
+    # Reuse the resolution of a type that has already been resolved with the same flags
+    type_cache = getattr(builders, 'type_cache', None)
+    if type_cache is not None:
+        key = (type_node, explicit, is_pointer, size, is_reference, ctype_objects)
+        resolution = type_cache.get(key)
+        if resolution is not None:
+            res.ctype_base_string, res.ctype_string, res.ctype_object, res.pointer_count, \
+                res.array_pointer_count, res.is_reference = resolution
+            return res
+
     if ctypes_type is None:
         res.ctype_base_string = 'None'
         res.ctype_string = 'None'
-        res.ctype_object = None
-        return res
     elif ctypes_type:
         res.ctype_base_string = f'ctypes.{ctypes_type}'
         if is_pointer:
             if not explicit and hasattr(ctypes_module, ctypes_type + '_p') and size == 0:
                 res.ctype_string = f'ctypes.{ctypes_type}_p'
-                res.ctype_object = getattr(ctypes_module, ctypes_type + '_p')
+                if ctype_objects:
+                    res.ctype_object = getattr(ctypes_module, ctypes_type + '_p')
             elif size > 0:
                 res.ctype_string = f'ctypes.POINTER(ctypes.{ctypes_type} * {size})'
-                res.ctype_object = ctypes.POINTER(getattr(ctypes_module, ctypes_type) * size)
+                if ctype_objects:
+                    res.ctype_object = ctypes.POINTER(getattr(ctypes_module, ctypes_type) * size)
             else:
                 res.ctype_string = f'ctypes.POINTER(ctypes.{ctypes_type})'
-                res.ctype_object = ctypes.POINTER(getattr(ctypes_module, ctypes_type))
+                if ctype_objects:
+                    res.ctype_object = ctypes.POINTER(getattr(ctypes_module, ctypes_type))
             res.pointer_count = 1
         else:
             if size > 0:
                 res.ctype_string = f'ctypes.{ctypes_type} * {size}'
-                res.ctype_object = getattr(ctypes_module, ctypes_type) * size
+                if ctype_objects:
+                    res.ctype_object = getattr(ctypes_module, ctypes_type) * size
             else:
                 res.ctype_string = f'ctypes.{ctypes_type}'
-                res.ctype_object = getattr(ctypes_module, ctypes_type)
+                if ctype_objects:
+                    res.ctype_object = getattr(ctypes_module, ctypes_type)
             if decl_str_cleaned == 'void*':
                 res.pointer_count = 1
-    elif decl_str_cleaned == 'void':
+    elif type_node is void_type:
         res.ctype_base_string = 'None'
         if is_pointer:
             if size > 0:
                 res.ctype_string = 'ctypes.c_void_p * {size}'
-                res.ctype_object = ctypes.c_void_p * size
+                if ctype_objects:
+                    res.ctype_object = ctypes.c_void_p * size
                 res.array_pointer_count = 1
             else:
                 res.ctype_string = 'ctypes.c_void_p'
-                res.ctype_object = ctypes.c_void_p
+                if ctype_objects:
+                    res.ctype_object = ctypes.c_void_p
                 res.pointer_count = 1
         else:
             res.ctype_string = 'None'
-            res.ctype_object = None
     elif decl_str_cleaned in builders:
         res.ctype_base_string = decl_str_cleaned
+        inner_ctype_object = builders[decl_str_cleaned].ctype_object
         if is_pointer:
             if size > 0:
                 res.ctype_string = f'ctypes.POINTER({decl_str_cleaned}) * {size}'
-                if builders[decl_str_cleaned].ctype_object is None:
-                    res.ctype_object = ctypes.c_void_p * size
-                else:
-                    res.ctype_object = ctypes.POINTER(builders[decl_str_cleaned].ctype_object) * size
+                if ctype_objects:
+                    if inner_ctype_object is None:
+                        res.ctype_object = ctypes.c_void_p * size
+                    else:
+                        res.ctype_object = ctypes.POINTER(inner_ctype_object) * size
             else:
                 res.ctype_string = f'ctypes.POINTER({decl_str_cleaned})'
-                if builders[decl_str_cleaned].ctype_object is None and is_pointer:
-                    res.ctype_object = ctypes.c_void_p
-                else:
-                    res.ctype_object = ctypes.POINTER(builders[decl_str_cleaned].ctype_object)
+                if ctype_objects:
+                    if inner_ctype_object is None:
+                        res.ctype_object = ctypes.c_void_p
+                    else:
+                        res.ctype_object = ctypes.POINTER(inner_ctype_object)
         else:
             if size > 0:
                 res.ctype_string = f'{decl_str_cleaned} * {size}'
-                if builders[decl_str_cleaned].ctype_object is None:
-                    res.ctype_object = None
-                else:
-                    res.ctype_object = builders[decl_str_cleaned].ctype_object * size
+                if ctype_objects and inner_ctype_object is not None:
+                    res.ctype_object = inner_ctype_object * size
             else:
                 res.ctype_string = decl_str_cleaned
-                res.ctype_object = builders[decl_str_cleaned].ctype_object
+                res.ctype_object = inner_ctype_object
     else:
         pointer_count = 1 if is_pointer else 0
-        if decl_str_cleaned.endswith('&'):
-            decl_str_cleaned = decl_str_cleaned[:-1]
-            res.is_reference = True
-        while decl_str_cleaned.endswith('*'):
-            decl_str_cleaned = decl_str_cleaned[:-1]
-            pointer_count += 1
+        if type_node.extents:
+            # Arrays are resolved from their declarations, their spelling is kept as the base type
+            element_node = type_node
+        else:
+            if type_node.reference == '&':
+                res.is_reference = True
+            pointer_count += type_node.pointer_depth
+            element_node = TypeNode(type_node.base)
+            decl_str_cleaned = type_node.base
         res.ctype_base_string = decl_str_cleaned
         if pointer_count == 0:
             if is_structure or is_function:
@@ -1103,22 +1298,22 @@ def cpp_str_to_ctypes(
                 if is_structure:
                     futures.add(decl_str_cleaned)
                     res.ctype_string = f'ctypes.POINTER({decl_str_cleaned}) * {size}'
-                    res.ctype_object = ctypes.c_void_p * size
                 else:
                     res.ctype_string = f'ctypes.c_void_p * {size}'
+                if ctype_objects:
                     res.ctype_object = ctypes.c_void_p * size
                 res.array_pointer_count = 1
             else:
                 if is_structure:
                     futures.add(decl_str_cleaned)
                     res.ctype_string = f'ctypes.POINTER({decl_str_cleaned})'
-                    res.ctype_object = ctypes.c_void_p
                 else:
                     res.ctype_string = 'ctypes.c_void_p'
+                if ctype_objects:
                     res.ctype_object = ctypes.c_void_p
                 res.pointer_count = 1
         else:
-            if (not explicit or decl_str_cleaned not in cpp_to_ctypes_mapper) and pointer_count > 0:
+            if (not explicit or not get_ctypes_type(element_node)) and pointer_count > 0:
                 pointer_count -= 1
                 is_pointer = True
             else:
@@ -1126,14 +1321,17 @@ def cpp_str_to_ctypes(
             res.collect(cpp_str_to_ctypes(decl_str_cleaned, is_cleaned=True, explicit=explicit, is_pointer=is_pointer,
                                           name=name, default_value=default_value, is_reference=is_reference,
                                           is_type=is_type, is_function=is_function, is_structure=is_structure,
-                                          builders=builders, futures=futures, parent=parent))
+                                          builders=builders, futures=futures, parent=parent,
+                                          type_node=element_node))
             for i in range(pointer_count):
                 res.pointer_wrap(explicit=explicit)
             if size > 0:
                 res.array_pointer_count = pointer_count
                 res.pointer_count = 0
                 res.ctype_string = f'{res.ctype_string} * size'
-                if res.ctype_object is not None:
+                if ctype_objects and res.ctype_object is not None:
                     res.ctype_object = res.ctype_object * size
+    if type_cache is not None:
+        type_cache.store(key, res)
     return res
 
@@ -0,0 +1,182 @@
+from typing import Optional, List, Dict, Set, Iterable, Tuple
+from collections import OrderedDict
+import hashlib
+import json
+import os
+from src.tools.file_tools import atomic_write, get_includes, hash_file
+
+manifest_version = 2
+
+
+class IncrementalManifest:
+    def __init__(self, options_key: str, files: Dict[str, str], entries: "OrderedDict[str, dict]"):
+        """
+        Initializes the record of a previous generation run used by incremental regeneration.
+
+        Args:
+            options_key: A hash of the options the output was generated with.
+            files: The content hashes of every header involved in the run.
+            entries: The emitted builders, in declaration order. Every entry maps a builder name to its source
+             files, the type names it references, whether it is an enumeration, whether it can be pre-defined, its
+             emitted code fragment and, if it is on a dependency cycle, its emitted pre-definition.
+        """
+        self.options_key = options_key
+        self.files = files
+        self.entries = entries
+
+    @classmethod
+    def load(cls, path: str) -> Optional["IncrementalManifest"]:
+        """
+        Load a manifest from a file.
+
+        Args:
+            path (str): The manifest file path.
+
+        Returns:
+            Optional[IncrementalManifest]: The manifest, or None if it does not exist or cannot be read.
+        """
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or data.get('version') != manifest_version:
+            return None
+        return cls(data['options'], data['files'],
+                   OrderedDict((entry['name'], entry) for entry in data['entries']))
+
+    def save(self, path: str):
+        """
+        Save the manifest to a file atomically.
+
+        Args:
+            path (str): The manifest file path.
+        """
+        data = {'version': manifest_version, 'options': self.options_key, 'files': self.files,
+                'entries': list(self.entries.values())}
+        atomic_write(path, json.dumps(data, indent=1).encode())
+
+
+def get_manifest_path(output: str) -> str:
+    """
+    Get the path of the incremental manifest belonging to an output file.
+
+    Args:
+        output (str): The output Python file path.
+
+    Returns:
+        str: The manifest file path.
+    """
+    return output + '.manifest.json'
+
+
+def get_options_key(*options) -> str:
+    """
+    Hash the generation options that invalidate every emitted fragment when they change.
+
+    Args:
+        *options: The option values, including the generator digest, see get_generator_digest, so that fragments
+         emitted by another version of the generator are not reused. They must have a stable repr.
+
+    Returns:
+        str: The hexadecimal hash.
+    """
+    return hashlib.sha256(repr((manifest_version,) + options).encode()).hexdigest()
+
+
+def get_file_hashes(filepaths: Iterable[str], include_paths: Optional[List[str]] = None) -> \
+        Tuple[Dict[str, str], Dict[str, List[str]]]:
+    """
+    Hash every header that the given headers transitively include.
+
+    Args:
+        filepaths (Iterable[str]): The header file paths.
+        include_paths (Optional[List[str]]): The additional include paths.
+
+    Returns:
+        Tuple[Dict[str, str], Dict[str, List[str]]]: The content hash of every resolved header and the include graph.
+    """
+    graph = get_includes(filepaths, include_paths)
+    hashes = {}
+    for filepath in graph:
+        try:
+            hashes[filepath] = hash_file(filepath)
+        except OSError:
+            hashes[filepath] = ''
+    return hashes, graph
+
+
+def get_changed_files(old_hashes: Dict[str, str], new_hashes: Dict[str, str],
+                      graph: Dict[str, List[str]]) -> Set[str]:
+    """
+    Find the headers whose declarations may have changed, i.e. the changed headers and every header including them.
+
+    Args:
+        old_hashes (Dict[str, str]): The header hashes of the previous run.
+        new_hashes (Dict[str, str]): The header hashes of the current run.
+        graph (Dict[str, List[str]]): The include graph of the current run.
+
+    Returns:
+        Set[str]: The paths of the affected headers.
+    """
+    changed = {filepath for filepath, digest in new_hashes.items() if old_hashes.get(filepath) != digest}
+    changed.update(filepath for filepath in old_hashes if filepath not in new_hashes)
+    includers = {}
+    for filepath, includes in graph.items():
+        for include in includes:
+            includers.setdefault(include, []).append(filepath)
+    pending = list(changed)
+    while pending:
+        for includer in includers.get(pending.pop(), []):
+            if includer not in changed:
+                changed.add(includer)
+                pending.append(includer)
+    return changed
+
+
+def get_source_file(decl) -> Optional[str]:
+    """
+    Get the absolute path of the file a declaration is located in.
+
+    Args:
+        decl: The pygccxml declaration.
+
+    Returns:
+        Optional[str]: The file path, or None if the declaration has no location.
+    """
+    location = getattr(decl, 'location', None)
+    if location is None or not location.file_name:
+        return None
+    return os.path.abspath(location.file_name)
+
+
+def get_affected(names: Iterable[str], references: Dict[str, Set[str]], seeds: Set[str]) -> Set[str]:
+    """
+    Close a set of changed builder names over the reference links, in both directions.
+
+    The emitted code of a builder depends on the builders it refers to, and its place in the definition order, as
+    well as whether it is pre-defined, on the builders referring to it. Both have to be regenerated together.
+
+    Args:
+        names (Iterable[str]): The names of all builders, including the ones removed since the previous run.
+        references (Dict[str, Set[str]]): The referenced type names of every builder.
+        seeds (Set[str]): The names of the builders known to be changed.
+
+    Returns:
+        Set[str]: The names of the builders to regenerate.
+    """
+    names = set(names)
+    links = {name: set() for name in names}
+    for name, referenced in references.items():
+        for other in referenced:
+            if other in names and other != name:
+                links.setdefault(name, set()).add(other)
+                links[other].add(name)
+    affected = set(seeds)
+    pending = list(seeds)
+    while pending:
+        for other in links.get(pending.pop(), ()):
+            if other not in affected:
+                affected.add(other)
+                pending.append(other)
+    return affected
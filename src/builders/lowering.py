@@ -0,0 +1,91 @@
+from typing import Optional, Dict, Tuple, Iterable, Iterator
+from src.builders.ctypes_builder import CtypesBuilder, declarations_type, get_innest_decl
+
+# Builder attributes linking to other builders, either directly or through a list or the keys of a dictionary
+linked_attributes = ('parent', 'return_type', 'argument_types', 'arguments', 'declarations', 'dependency',
+                     'dependents')
+
+
+class DeclarationSummary:
+    __slots__ = ('text', 'decl_string')
+
+    def __init__(self, text: str, decl_string: Optional[str]):
+        """
+        Initializes the part of a declaration the code generation reads, standing in for the pygccxml declaration of
+        a lowered builder.
+
+        Args:
+            text: The string representation of the declaration, used in comments.
+            decl_string: The declaration string of the innermost declaration, see get_innest_decl.
+        """
+        self.text = text
+        self.decl_string = decl_string
+
+    @classmethod
+    def of(cls, decl: declarations_type) -> "DeclarationSummary":
+        """
+        Summarize a pygccxml declaration or type.
+
+        Args:
+            decl (declarations_type): The declaration or type object.
+
+        Returns:
+            DeclarationSummary: The summary.
+        """
+        return cls(str(decl), getattr(get_innest_decl(decl), 'decl_string', None))
+
+    def __str__(self) -> str:
+        return self.text
+
+
+def iterate_builders(builders: Iterable[CtypesBuilder]) -> Iterator[CtypesBuilder]:
+    """
+    Walk builders and every builder linked to them, each once.
+
+    Args:
+        builders (Iterable[CtypesBuilder]): The top-level builders.
+
+    Yields:
+        CtypesBuilder: The builders.
+    """
+    visited = set()
+    pending = list(builders)
+    while pending:
+        current = pending.pop()
+        if id(current) in visited:
+            continue
+        visited.add(id(current))
+        yield current
+        for attr_name in linked_attributes:
+            value = getattr(current, attr_name)
+            if isinstance(value, CtypesBuilder):
+                pending.append(value)
+            elif isinstance(value, (list, dict)):
+                pending.extend(inner for inner in value if isinstance(inner, CtypesBuilder))
+
+
+def lower_builders(builders: Iterable[CtypesBuilder]) -> int:
+    """
+    Detach populated builders from pygccxml, so that the parsed declaration tree can be released before the code is
+    emitted.
+
+    The declaration of every builder is replaced by its DeclarationSummary, which is all the code generation reads
+    of it. Builders sharing a declaration share its summary. The emitted code is unchanged.
+
+    Args:
+        builders (Iterable[CtypesBuilder]): The top-level builders.
+
+    Returns:
+        int: The number of distinct declarations summarized.
+    """
+    # The declarations are kept alive along with their summaries, so that their ids are not reused while lowering
+    summaries: Dict[int, Tuple[declarations_type, DeclarationSummary]] = {}
+    for builder in iterate_builders(builders):
+        decl = builder.decl
+        if decl is None or isinstance(decl, DeclarationSummary):
+            continue
+        entry = summaries.get(id(decl))
+        if entry is None:
+            entry = summaries[id(decl)] = (decl, DeclarationSummary.of(decl))
+        builder.decl = entry[1]
+    return len(summaries)
@@ -0,0 +1,178 @@
+from typing import List, Dict, Set, Tuple, Iterable
+from src.builders.ctypes_builder import CtypesBuilder, Definition
+
+
+def get_references(builder: CtypesBuilder) -> Set[str]:
+    """
+    Collect the type names a top-level builder and its inner builders refer to.
+
+    Besides the names of other builders, the result also contains the names of types that are not bound (yet), so
+    that adding such a type later can be detected. The builder's own name is only included if one of its inner
+    builders refers to it, e.g. through a pointer to the structure itself.
+
+    Args:
+        builder (CtypesBuilder): The top-level builder.
+
+    Returns:
+        Set[str]: The referenced type names.
+    """
+    references = set()
+    pending = [builder]
+    visited = set()
+    while pending:
+        current = pending.pop()
+        if id(current) in visited:
+            continue
+        visited.add(id(current))
+        # The declaration string of the top-level builder is its own name rather than a reference
+        names = (current.ctype_base_string,) if current is builder else \
+            (current.ctype_base_string, current.decl_string)
+        for name in names:
+            if isinstance(name, str) and name and name != 'None' and not name.startswith('ctypes.') and \
+                    (current is not builder or name != builder.title):
+                references.add(name)
+                references.add(name.rstrip('*& '))
+        if isinstance(current.return_type, CtypesBuilder):
+            pending.append(current.return_type)
+        for inners in (current.argument_types, current.arguments):
+            if isinstance(inners, list):
+                pending.extend(inner for inner in inners if isinstance(inner, CtypesBuilder))
+        if isinstance(current.declarations, list):
+            # Only the declarations emitted as fields are referred to by the generated code
+            pending.extend(inner for inner in current.declarations
+                           if isinstance(inner, CtypesBuilder) and inner.is_field())
+    return references
+
+
+def is_forward_declarable(builder: CtypesBuilder) -> bool:
+    """
+    Check whether a top-level builder can be pre-defined, i.e. bound to its name before its definition is complete.
+
+    Args:
+        builder (CtypesBuilder): The top-level builder.
+
+    Returns:
+        bool: True for structures and function types, False for enumerations and other types.
+    """
+    return builder.is_function or (builder.is_structure and not builder.is_enumeration)
+
+
+def get_dependency_graph(names: List[str], references: Dict[str, Set[str]]) -> Dict[str, List[str]]:
+    """
+    Build the dependency graph of the top-level builders.
+
+    Args:
+        names (List[str]): The names of the builders, in declaration order.
+        references (Dict[str, Set[str]]): The referenced type names of every builder.
+
+    Returns:
+        Dict[str, List[str]]: The names every builder depends on, in declaration order.
+    """
+    positions = {name: position for position, name in enumerate(names)}
+    return {name: sorted((other for other in references.get(name, ()) if other in positions),
+                         key=positions.__getitem__)
+            for name in names}
+
+
+def get_strongly_connected_components(graph: Dict[str, List[str]], nodes: Iterable[str]) -> List[List[str]]:
+    """
+    Find the strongly connected components of a graph with an iterative version of Tarjan's algorithm.
+
+    Every component is listed after all the components reachable from it, i.e. dependencies come first. The search
+    starts from the nodes in the given order, so that nodes without dependencies between them keep their order.
+
+    Args:
+        graph (Dict[str, List[str]]): The successors of every node.
+        nodes (Iterable[str]): The nodes, in the order they are searched from.
+
+    Returns:
+        List[List[str]]: The components, each listing its nodes in the order they were completed.
+    """
+    indices = {}
+    lowlinks = {}
+    stack = []
+    on_stack = set()
+    components = []
+    for root in nodes:
+        if root in indices:
+            continue
+        indices[root] = lowlinks[root] = len(indices)
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(graph.get(root, ())))]
+        while work:
+            node, successors = work[-1]
+            for successor in successors:
+                if successor not in indices:
+                    indices[successor] = lowlinks[successor] = len(indices)
+                    stack.append(successor)
+                    on_stack.add(successor)
+                    work.append((successor, iter(graph.get(successor, ()))))
+                    break
+                elif successor in on_stack:
+                    lowlinks[node] = min(lowlinks[node], indices[successor])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlinks[parent] = min(lowlinks[parent], lowlinks[node])
+                if lowlinks[node] == indices[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+    return components
+
+
+def get_definition_order(names: List[str], references: Dict[str, Set[str]],
+                         forward_declarable: Set[str]) -> List[Tuple[str, Definition]]:
+    """
+    Order the definitions of the top-level builders so that every type is bound before it is referred to.
+
+    Builders are defined in declaration order, except that the builders a builder depends on are moved before it.
+    Builders on a dependency cycle, including structures referring to themselves, are pre-defined first and
+    completed by a post-definition once the whole cycle is bound. Builders that cannot be pre-defined are defined
+    in between, as soon as the builders they depend on are bound.
+
+    Args:
+        names (List[str]): The names of the builders, in declaration order.
+        references (Dict[str, Set[str]]): The referenced type names of every builder.
+        forward_declarable (Set[str]): The names of the builders that can be pre-defined.
+
+    Returns:
+        List[Tuple[str, Definition]]: The builder names with the definition to emit, in emission order.
+            Definition.Undefined stands for a complete definition.
+    """
+    positions = {name: position for position, name in enumerate(names)}
+    graph = get_dependency_graph(names, references)
+    order = []
+    for component in get_strongly_connected_components(graph, names):
+        if len(component) == 1 and component[0] not in graph[component[0]]:
+            order.append((component[0], Definition.Undefined))
+            continue
+        component.sort(key=positions.__getitem__)
+        members = set(component)
+        order.extend((name, Definition.Pre) for name in component if name in forward_declarable)
+
+        # Complete the cycle, binding the builders that were not pre-defined before the ones referring to them
+        completed = set()
+        for root in component:
+            if root in completed:
+                continue
+            completed.add(root)
+            work = [(root, iter(graph[root]))]
+            while work:
+                node, successors = work[-1]
+                for successor in successors:
+                    if successor in members and successor not in forward_declarable and successor not in completed:
+                        completed.add(successor)
+                        work.append((successor, iter(graph[successor])))
+                        break
+                else:
+                    work.pop()
+                    order.append((node, Definition.Post if node in forward_declarable else Definition.Undefined))
+    return order
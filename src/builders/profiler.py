@@ -0,0 +1,206 @@
+from typing import Optional, Dict, List, Tuple, Iterable
+from contextlib import contextmanager
+import heapq
+import json
+import time
+import tracemalloc
+from src.builders.ctypes_builder import CtypesBuilder
+
+# Kinds of builders counted by the profiler, in report order
+builder_kinds = ['function', 'structure', 'enumeration', 'type', 'other']
+
+
+class Profiler:
+    def __init__(self, enabled: bool = True, trace_memory: bool = True, slowest: int = 10):
+        """
+        Initializes a hook collecting timings, memory usage and counters of a generation run.
+
+        Pass a profiler to main to instrument a run, then read the collected data with report(). A disabled profiler
+        records nothing, so that the instrumented code does not need to check for one.
+
+        Args:
+            enabled: Whether to record anything.
+            trace_memory: Whether to trace memory allocations with tracemalloc to report the peak memory of every
+             phase. Tracing slows the run down noticeably.
+            slowest: The number of slowest declarations to report per phase.
+        """
+        self.enabled = enabled
+        self.trace_memory = trace_memory
+        self.slowest = slowest
+        self.phases: Dict[str, Dict[str, float]] = {}
+        self.declarations: Dict[str, List[Tuple[float, str]]] = {}
+        self.builders: Dict[str, Dict[str, int]] = {}
+        self.caches: Dict[str, Dict[str, object]] = {}
+        self.started_tracing = False
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        Measure the wall time and peak traced memory of a phase for the duration of a with-block.
+
+        Phases with the same name are accumulated.
+
+        Args:
+            name (str): The name of the phase.
+
+        Yields:
+            None
+        """
+        if not self.enabled:
+            yield
+            return
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self.started_tracing = True
+            tracemalloc.reset_peak()
+            memory_start = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            measurement = self.phases.setdefault(name, {'seconds': 0.0})
+            measurement['seconds'] += time.perf_counter() - start
+            if self.trace_memory:
+                current, peak = tracemalloc.get_traced_memory()
+                measurement['peak_memory'] = max(measurement.get('peak_memory', 0), peak)
+                measurement['allocated_memory'] = measurement.get('allocated_memory', 0) + current - memory_start
+
+    def declaration(self, phase: str, name: str, seconds: float):
+        """
+        Record the time spent on a single declaration during a phase.
+
+        Only the slowest declarations of every phase are kept.
+
+        Args:
+            phase (str): The name of the phase, e.g. 'populate' or 'emit'.
+            name (str): The name of the declaration.
+            seconds (float): The time spent on the declaration.
+        """
+        if not self.enabled:
+            return
+        slowest = self.declarations.setdefault(phase, [])
+        if len(slowest) < self.slowest:
+            heapq.heappush(slowest, (seconds, name))
+        elif slowest and seconds > slowest[0][0]:
+            heapq.heapreplace(slowest, (seconds, name))
+
+    @contextmanager
+    def timed_declaration(self, phase: str, name: str):
+        """
+        Measure the time spent on a single declaration for the duration of a with-block.
+
+        Args:
+            phase (str): The name of the phase.
+            name (str): The name of the declaration.
+
+        Yields:
+            None
+        """
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.declaration(phase, name, time.perf_counter() - start)
+
+    def count_builders(self, builders: Iterable[CtypesBuilder]):
+        """
+        Count top-level builders and all builders reachable from them by kind.
+
+        Args:
+            builders (Iterable[CtypesBuilder]): The top-level builders.
+        """
+        if not self.enabled:
+            return
+        top_level = self.builders.setdefault('top_level', dict.fromkeys(builder_kinds, 0))
+        total = self.builders.setdefault('total', dict.fromkeys(builder_kinds, 0))
+        visited = set()
+        for builder in builders:
+            top_level[get_builder_kind(builder)] += 1
+            pending = [builder]
+            while pending:
+                current = pending.pop()
+                if id(current) in visited:
+                    continue
+                visited.add(id(current))
+                total[get_builder_kind(current)] += 1
+                if isinstance(current.return_type, CtypesBuilder):
+                    pending.append(current.return_type)
+                for inners in (current.argument_types, current.arguments, current.declarations):
+                    if isinstance(inners, list):
+                        pending.extend(inner for inner in inners if isinstance(inner, CtypesBuilder))
+
+    def record_cache(self, name: str, cache):
+        """
+        Record the hits and misses of a cache.
+
+        Args:
+            name (str): The name of the cache.
+            cache: The cache, exposing hits and misses counters.
+        """
+        if not self.enabled or cache is None:
+            return
+        hits, misses = cache.hits, cache.misses
+        lookups = hits + misses
+        self.caches[name] = {'hits': hits, 'misses': misses, 'hit_rate': hits / lookups if lookups else None}
+
+    def stop(self):
+        """
+        Stop tracing memory allocations if the profiler started it.
+        """
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    def report(self) -> Dict[str, object]:
+        """
+        Get the collected data.
+
+        Returns:
+            Dict[str, object]: The wall time in seconds and, if traced, the peak and net allocated memory in bytes of
+             every phase, the builder counts by kind, the slowest declarations of every phase and the cache hit rates.
+        """
+        return {
+            'phases': {name: dict(measurement) for name, measurement in self.phases.items()},
+            'builders': {name: dict(counts) for name, counts in self.builders.items()},
+            'slowest_declarations': {phase: [{'name': name, 'seconds': seconds}
+                                             for seconds, name in sorted(slowest, reverse=True)]
+                                     for phase, slowest in self.declarations.items()},
+            'caches': {name: dict(stats) for name, stats in self.caches.items()},
+        }
+
+    def to_json(self, indent: Optional[int] = 2) -> str:
+        """
+        Get the collected data as JSON.
+
+        Args:
+            indent (Optional[int]): The indentation of the JSON document.
+
+        Returns:
+            str: The JSON report.
+        """
+        return json.dumps(self.report(), indent=indent)
+
+
+def get_builder_kind(builder: CtypesBuilder) -> str:
+    """
+    Get the kind of builder, as counted by the profiler.
+
+    Args:
+        builder (CtypesBuilder): The builder.
+
+    Returns:
+        str: 'function', 'structure', 'enumeration', 'type' or 'other'.
+    """
+    if builder.is_function:
+        return 'function'
+    elif builder.is_enumeration:
+        return 'enumeration'
+    elif builder.is_structure:
+        return 'structure'
+    elif builder.is_type:
+        return 'type'
+    return 'other'
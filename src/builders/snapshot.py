@@ -0,0 +1,217 @@
+from typing import Optional, List, Dict, Set, Tuple, Iterable, TextIO
+import functools
+import hashlib
+import io
+import os
+import pickle
+import sys
+from pygccxml import parser, declarations
+from src.builders.builder_registry import BuilderRegistry
+from src.builders.ctypes_builder import Commented, Definition
+from src.builders.lowering import DeclarationSummary
+from src.builders.profiler import Profiler
+from src.tools.file_tools import atomic_open, hash_file
+from src.tools.parse_cache import ParseCache
+
+snapshot_format_version = 1
+
+# Version of the generator, as in setup.py. Part of the snapshot and incremental keys, so that the output of another
+# version is not reused, even where the generator code cannot be hashed
+generator_version = '2023.1'
+
+
+class SnapshotPickler(pickle.Pickler):
+    # The declarations of builders that have not been lowered are reduced to their summaries. Pickle memoizes the
+    # reduced objects, so every declaration is summarized once even if many builders share it
+    summarized_types = (declarations.declaration_t, declarations.type_t, declarations.argument_t)
+
+    def reducer_override(self, obj):
+        if isinstance(obj, self.summarized_types):
+            summary = DeclarationSummary.of(obj)
+            return DeclarationSummary, (summary.text, summary.decl_string)
+        return NotImplemented
+
+
+class GenerationSnapshot:
+    def __init__(self, names: List[str], builders: BuilderRegistry, references: Dict[str, Set[str]],
+                 forward_declarable: Set[str], definition_order: List[Tuple[str, Definition]]):
+        """
+        Initializes the fully resolved result of a generation run, from which the code can be emitted again without
+        parsing the headers or populating the builders.
+
+        The builders are stored detached from pygccxml, as lowered by lower_builders, so a snapshot only holds the
+        names, ctypes strings, dependencies and comments of the builders.
+
+        Args:
+            names: The names of the builders, in declaration order.
+            builders: The populated builders, before any code was emitted from them.
+            references: The type names every builder refers to.
+            forward_declarable: The names of the builders that can be pre-defined.
+            definition_order: The builder names and how they are defined, in emission order.
+        """
+        self.names = names
+        self.builders = builders
+        self.references = references
+        self.forward_declarable = forward_declarable
+        self.definition_order = definition_order
+
+    def to_bytes(self) -> bytes:
+        """
+        Serialize the snapshot.
+
+        Returns:
+            bytes: The versioned binary snapshot.
+        """
+        stream = io.BytesIO()
+        SnapshotPickler(stream, pickle.HIGHEST_PROTOCOL).dump((snapshot_format_version, self.names, self.builders,
+                                                              self.references, self.forward_declarable,
+                                                              self.definition_order))
+        return stream.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> Optional["GenerationSnapshot"]:
+        """
+        Deserialize a snapshot.
+
+        Args:
+            data (bytes): The binary snapshot, as returned by to_bytes.
+
+        Returns:
+            Optional[GenerationSnapshot]: The snapshot, or None if it is corrupted or of another format version.
+        """
+        try:
+            data = pickle.loads(data)
+        except Exception:
+            return None
+        if not isinstance(data, tuple) or not data or data[0] != snapshot_format_version:
+            return None
+        return cls(*data[1:])
+
+    @classmethod
+    def load(cls, cache: ParseCache, key: str) -> Optional["GenerationSnapshot"]:
+        """
+        Load a snapshot from the cache.
+
+        Args:
+            cache (ParseCache): The cache holding the snapshots.
+            key (str): The snapshot key, as returned by get_snapshot_key.
+
+        Returns:
+            Optional[GenerationSnapshot]: The snapshot, or None on a cache miss.
+        """
+        data = cache.load(key)
+        if data is None:
+            return None
+        snapshot = cls.from_bytes(data)
+        if snapshot is None:
+            # A corrupted or incompatible entry is handled as a miss
+            cache.hits -= 1
+            cache.misses += 1
+        return snapshot
+
+    def save(self, cache: ParseCache, key: str):
+        """
+        Store the snapshot in the cache.
+
+        Args:
+            cache (ParseCache): The cache holding the snapshots.
+            key (str): The snapshot key, as returned by get_snapshot_key.
+        """
+        cache.store(key, self.to_bytes())
+
+    def write(self, output: str, commented: Commented = Commented.Mixed, profiler: Optional[Profiler] = None):
+        """
+        Write the Python ctypes code of the builders to a file in definition order, replacing the file atomically.
+
+        Writing the code updates the state of the builders, so a snapshot can be written only once.
+
+        Args:
+            output (str): The output Python file path.
+            commented (Commented): The type of comments to add to the code.
+            profiler (Optional[Profiler]): A profiler timing the emission of every declaration.
+        """
+        with atomic_open(output) as f:
+            self.write_to(f, commented=commented, profiler=profiler)
+
+    def write_to(self, stream: TextIO, commented: Commented = Commented.Mixed, profiler: Optional[Profiler] = None):
+        """
+        Write the Python ctypes code of the builders to a text stream in definition order.
+
+        Writing the code updates the state of the builders, so a snapshot can be written only once.
+
+        Args:
+            stream (TextIO): The stream to write the code to.
+            commented (Commented): The type of comments to add to the code.
+            profiler (Optional[Profiler]): A profiler timing the emission of every declaration.
+        """
+        if profiler is None:
+            profiler = Profiler(enabled=False)
+        stream.write('import ctypes\n%s' % ('from enum import IntEnum\n' if any(
+            self.builders[name].is_enumeration for name in self.names) else ''))
+
+        for name, definition in self.definition_order:
+            stream.write('\n')
+            with profiler.timed_declaration('emit', name):
+                self.builders[name].write(stream, commented=commented, definition=definition)
+            stream.write('\n')
+
+
+def get_snapshot_key(cache: ParseCache, filepaths: List[str],
+                     xml_generator_config: parser.xml_generator_configuration_t,
+                     source_files: Iterable[str], *options) -> str:
+    """
+    Compute the cache key of a generation snapshot.
+
+    Besides the inputs of the parse, the key covers the content of the source files the declarations are selected
+    by, the generation options and the code of the generator itself, so that a snapshot is invalidated whenever any
+    of them changes.
+
+    Args:
+        cache (ParseCache): The cache holding the snapshots.
+        filepaths (List[str]): The header file paths to be parsed.
+        xml_generator_config (parser.xml_generator_configuration_t): The XML generator configuration.
+        source_files (Iterable[str]): The source file paths.
+        *options: The generation options the builders depend on. They must have a stable repr.
+
+    Returns:
+        str: The hexadecimal snapshot key.
+    """
+    digest = hashlib.sha256()
+    digest.update(cache.key(filepaths, xml_generator_config, kind='snapshot').encode())
+    for item in [snapshot_format_version, get_generator_digest(), options]:
+        digest.update(repr(item).encode())
+        digest.update(b'\0')
+    for source_file in sorted(source_files):
+        digest.update(source_file.encode())
+        digest.update(b'\0')
+        try:
+            digest.update(hash_file(source_file).encode())
+        except OSError:
+            digest.update(b'missing')
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def get_generator_digest() -> str:
+    """
+    Hash the version and the code of the generator, so that snapshots of a previous version are not reused.
+
+    Returns:
+        str: The hexadecimal hash of the generator version and of the source files of the package, or of the
+         executable for a frozen (PyInstaller) build, which does not ship the source files.
+    """
+    digest = hashlib.sha256(generator_version.encode())
+    digest.update(b'\0')
+    if getattr(sys, 'frozen', False):
+        digest.update(hash_file(sys.executable).encode())
+        return digest.hexdigest()
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    for directory, directories, filenames in os.walk(root):
+        directories.sort()
+        for filename in sorted(filenames):
+            if filename.endswith('.py'):
+                path = os.path.join(directory, filename)
+                digest.update(os.path.relpath(path, root).encode())
+                digest.update(hash_file(path).encode())
+    return digest.hexdigest()
@@ -0,0 +1,130 @@
+from typing import Optional, Dict, List, Set, Callable, Iterable
+from collections import OrderedDict
+import fnmatch
+import re
+import warnings
+from src.builders.builder_registry import BuilderRegistry
+from src.builders.ordering import get_references
+from src.builders.profiler import get_builder_kind
+
+
+def read_symbol_patterns(symbols: Optional[List[str]] = None, symbols_file: Optional[str] = None) -> List[str]:
+    """
+    Collect the symbol names and glob patterns given on the command line and in a symbols file.
+
+    The symbols file lists one name or pattern per line. Blank lines and lines starting with '#' are ignored.
+
+    Args:
+        symbols (Optional[List[str]]): The names or patterns given directly.
+        symbols_file (Optional[str]): The path of the symbols file.
+
+    Returns:
+        List[str]: The names and patterns, in the order they were given, without duplicates.
+    """
+    patterns = list(symbols or [])
+    if symbols_file is not None:
+        with open(symbols_file, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    patterns.append(line)
+    return list(OrderedDict.fromkeys(patterns))
+
+
+class SymbolSelection:
+    def __init__(self, patterns: Iterable[str]):
+        """
+        Initializes a selection of the declarations to generate by name.
+
+        Declarations whose names match one of the patterns are selected, along with the transitive closure of the
+        declarations they refer to, e.g. the structures, enumerations and typedefs of their arguments and fields.
+
+        Args:
+            patterns: The declaration names or glob patterns ('*', '?' and '[...]').
+        """
+        self.patterns = list(patterns)
+        self.pattern = re.compile('|'.join(fnmatch.translate(pattern) for pattern in self.patterns)) \
+            if self.patterns else None
+        self.matched: List[str] = []
+        self.required_by: Dict[str, str] = OrderedDict()
+        self.kinds: Dict[str, str] = {}
+        self.builders: Optional[BuilderRegistry] = None
+
+    def matches(self, name: str) -> bool:
+        """
+        Check whether a declaration name matches one of the patterns.
+
+        Args:
+            name (str): The declaration name.
+
+        Returns:
+            bool: True if the name matches.
+        """
+        return self.pattern is not None and self.pattern.match(name) is not None
+
+    @property
+    def names(self) -> Set[str]:
+        """
+        Get the names of the selected declarations.
+
+        Returns:
+            Set[str]: The matched declarations and their dependencies.
+        """
+        return set(self.matched).union(self.required_by)
+
+    def select(self, candidates: Iterable[str], populate: Callable[[Set[str]], BuilderRegistry]) -> BuilderRegistry:
+        """
+        Select the matching declarations and close the selection over their references.
+
+        The selected declarations are populated, the declarations their builders refer to are added, and this is
+        repeated until no declaration is added, so that every reference is resolved through the registry as in a
+        full run.
+
+        Args:
+            candidates (Iterable[str]): The names of the declarations that can be generated, in declaration order.
+            populate (Callable[[Set[str]], BuilderRegistry]): Populates the builders of the given declaration names.
+
+        Returns:
+            BuilderRegistry: The builders of the selected declarations.
+        """
+        candidates = list(OrderedDict.fromkeys(candidates))
+        available = set(candidates)
+        self.matched = [name for name in candidates if self.matches(name)]
+        unmatched = [pattern for pattern in self.patterns
+                     if not any(fnmatch.fnmatchcase(name, pattern) for name in self.matched)]
+        if unmatched:
+            n = len(unmatched)
+            warnings.warn('The following symbol%s (%s) do%s not match any declaration' %
+                          ('s' if n > 1 else '', ', '.join(unmatched), '' if n > 1 else 'es'))
+
+        self.required_by = OrderedDict()
+        selected = set(self.matched)
+        while True:
+            builders = populate(selected)
+            added = False
+            for name, builder in builders.items():
+                for reference in sorted(get_references(builder)):
+                    if reference in available and reference not in selected:
+                        selected.add(reference)
+                        self.required_by[reference] = name
+                        added = True
+            if not added:
+                break
+        self.kinds = {name: get_builder_kind(builder) for name, builder in builders.items()}
+        self.builders = builders
+        return builders
+
+    def report(self) -> str:
+        """
+        Get a human-readable summary of the selection, listing every pulled in declaration with the reason.
+
+        Returns:
+            str: The summary lines.
+        """
+        n = len(self.matched)
+        m = len(self.required_by)
+        lines = ['Symbol selection: %d declaration%s matched, %d dependenc%s pulled in' %
+                 (n, '' if n == 1 else 's', m, 'y' if m == 1 else 'ies')]
+        for name, dependent in self.required_by.items():
+            lines.append('  %s (%s), required by %s' % (name, self.kinds.get(name, 'unknown'), dependent))
+        return '\n'.join(lines)
@@ -0,0 +1,85 @@
+from typing import Optional, Dict, Tuple
+from src.tools.string_tools import clean_type
+
+
+class TypeCache:
+    def __init__(self):
+        """
+        Initializes a memo of C++ type resolutions shared by the builders of a registry.
+
+        Type strings are normalized with clean_type once per distinct string. The ctypes resolution of a parsed type
+        is memoized along with the flags it depends on, so that every further use of the type, in any spelling, only
+        creates a light builder carrying its own name, default value and parent. Only the resolutions to fundamental
+        ctypes types and void are stored, since they do not depend on the builders registered so far.
+        """
+        self.normalized: Dict[str, str] = {}
+        self.resolutions: Dict[tuple, tuple] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def normalize(self, type_str: Optional[str]) -> Optional[str]:
+        """
+        Clean and normalize a C++ type string, as clean_type does.
+
+        Args:
+            type_str (Optional[str]): The C++ type string.
+
+        Returns:
+            Optional[str]: The cleaned C++ type string, or the input if it is None or empty.
+        """
+        if type_str is None or not type_str:
+            return type_str
+        cleaned_type = self.normalized.get(type_str)
+        if cleaned_type is None:
+            cleaned_type = self.normalized[type_str] = clean_type(type_str)
+        return cleaned_type
+
+    def get(self, key: tuple) -> Optional[Tuple]:
+        """
+        Look up the resolution of a type.
+
+        Args:
+            key (tuple): The type node and the flags of the resolution.
+
+        Returns:
+            Optional[Tuple]: The ctypes base string, ctypes string, ctypes object, pointer count, array pointer count
+             and reference flag of the resolved type, or None if the type has not been resolved yet.
+        """
+        resolution = self.resolutions.get(key)
+        if resolution is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return resolution
+
+    def store(self, key: tuple, builder) -> bool:
+        """
+        Store the resolution of a type, if it does not depend on other builders.
+
+        Args:
+            key (tuple): The type node and the flags of the resolution.
+            builder (CtypesBuilder): The builder the type has been resolved to.
+
+        Returns:
+            bool: True if the resolution has been stored.
+        """
+        ctype_base_string = builder.ctype_base_string
+        if ctype_base_string != 'None' and not (isinstance(ctype_base_string, str) and
+                                                ctype_base_string.startswith('ctypes.')):
+            return False
+        self.resolutions[key] = (ctype_base_string, builder.ctype_string, builder.ctype_object, builder.pointer_count,
+                                 builder.array_pointer_count, builder.is_reference)
+        return True
+
+    def report(self) -> str:
+        """
+        Get a human-readable summary of the cache hits and misses.
+
+        Returns:
+            str: The summary line.
+        """
+        lookups = self.hits + self.misses
+        rate = 100.0 * self.hits / lookups if lookups else 0.0
+        return f'Type cache: {self.hits} hit{"" if self.hits == 1 else "s"}, ' \
+               f'{self.misses} miss{"" if self.misses == 1 else "es"} ({rate:.1f}% hit rate), ' \
+               f'{len(self.normalized)} distinct type string{"" if len(self.normalized) == 1 else "s"}'
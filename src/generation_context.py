@@ -0,0 +1,219 @@
+from typing import Optional, List, Dict, TextIO
+import io
+import threading
+import types
+from collections import OrderedDict
+from pygccxml import parser
+from src.builders.ctypes_builder import Commented
+from src.builders.ordering import get_references, is_forward_declarable, get_definition_order
+from src.builders.profiler import Profiler
+from src.builders.snapshot import GenerationSnapshot
+from src.builders.symbol_selection import SymbolSelection, read_symbol_patterns
+from src.builders.type_cache import TypeCache
+from src.main import populate_builders, get_declarations, get_inputs, get_xml_generator_config, populated_types
+from src.parsers.parallel_parser import parse_parallel
+from src.parsers.prelude import Prelude
+from src.tools.identifier_index import IdentifierIndex
+from src.tools.parse_cache import ParseCache, default_max_size, get_parse_key
+
+
+class GenerationContext:
+    def __init__(self, generator_path: str = None, generator_name: str = None, include_paths: List[str] = None,
+                 cache_dir: str = None, cache_size: int = default_max_size, max_parses: int = 8, jobs: int = 1,
+                 skip_comments: bool = False, ctype_objects: bool = False, prelude: List[str] = None):
+        """
+        Initializes a reusable context generating Python ctypes code in memory, for tools embedding the generator.
+
+        A context keeps the parsed declarations of its last parses, the identifiers of the source files and the type
+        resolutions between generations, so that generating again from unchanged headers skips the parse. Parses are
+        keyed by the content of the headers and of everything they include, so changed headers are parsed again.
+
+        Contexts share no mutable state, so several contexts can generate in parallel threads. The generations of a
+        single context are serialized. The only process-wide state is the interning of immutable type nodes.
+
+        Args:
+            generator_path: Path to the XML generator executable. Defaults to the one found on the system.
+            generator_name: Name of the XML generator. Defaults to the one found on the system.
+            include_paths: List of additional include paths for parsing.
+            cache_dir: Directory of a parse cache shared with other runs. Defaults to None, which keeps the parsed
+             declarations in memory only.
+            cache_size: Maximum size of the parse cache in bytes, if cache_dir is given.
+            max_parses: Maximum number of parses kept in memory, the least recently used being dropped first.
+            jobs: Number of XML generator processes to run in parallel, one header per process. A value below 1 uses
+             all CPUs.
+            skip_comments: Disregard identifiers in comments and string literals of the source files.
+            ctype_objects: Also build the live ctypes objects of the types while generating the code.
+            prelude: Includes common to the headers, parsed once rather than read again for every header, see
+             src.parsers.prelude.Prelude.
+        """
+        self.xml_generator_config = get_xml_generator_config(generator_path, generator_name, include_paths)
+        self.parse_cache = None if cache_dir is None else ParseCache(cache_dir, max_size=cache_size)
+        self.max_parses = max_parses
+        self.jobs = jobs
+        self.ctype_objects = ctype_objects
+        self.prelude = Prelude(prelude) if prelude else None
+        self.parses: Dict[str, list] = OrderedDict()
+        self.identifier_index = IdentifierIndex(skip_comments=skip_comments)
+        self.type_cache = TypeCache()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def parse(self, filepaths: List[str]) -> list:
+        """
+        Parse C++ header files, reusing the declarations of a previous parse of the context if the inputs did not
+        change.
+
+        The declarations are only read by the generation, so they are shared by the generations reusing them.
+
+        Args:
+            filepaths (List[str]): The header file paths to parse.
+
+        Returns:
+            list: The parsed declarations, as returned by pygccxml.parser.parse.
+        """
+        key = self.parse_key(filepaths)
+        decls = self.parses.get(key)
+        if decls is not None:
+            self.hits += 1
+            self.parses.move_to_end(key)
+            return decls
+        self.misses += 1
+        decls = self.parses[key] = self.read(filepaths)
+        while len(self.parses) > max(self.max_parses, 1):
+            self.parses.popitem(last=False)
+        return decls
+
+    def parse_key(self, filepaths: List[str]) -> str:
+        """
+        Compute the key the declarations of a parse are kept under.
+
+        Args:
+            filepaths (List[str]): The header file paths to parse.
+
+        Returns:
+            str: The key, covering the content of the headers and of everything they include.
+        """
+        return get_parse_key(filepaths, self.xml_generator_config)
+
+    def read(self, filepaths: List[str]) -> list:
+        """
+        Parse C++ header files with the XML generator, or read them from the parse cache.
+
+        Args:
+            filepaths (List[str]): The header file paths to parse.
+
+        Returns:
+            list: The parsed declarations, as returned by pygccxml.parser.parse.
+        """
+        if self.jobs != 1 or self.prelude is not None:
+            return parse_parallel(filepaths, self.xml_generator_config, jobs=self.jobs, cache=self.parse_cache,
+                                  prelude=self.prelude)
+        if self.parse_cache is not None:
+            return self.parse_cache.parse(filepaths, self.xml_generator_config)
+        return parser.parse(filepaths, self.xml_generator_config)
+
+    def write(self, stream: TextIO, filenames: List[str], source_files: List[str] = None,
+              allow_dirs: List[str] = None, symbols: List[str] = None, symbols_file: str = None,
+              commented: Commented = Commented.Mixed, profiler: Optional[Profiler] = None):
+        """
+        Generate the Python ctypes code of C++ header files to a text stream.
+
+        The code is identical to the one main writes for the same arguments.
+
+        Args:
+            stream (TextIO): The stream to write the code to.
+            filenames (List[str]): List of C++ header file paths to parse.
+            source_files (List[str], optional): List of source file paths to consider during parsing. Defaults to None.
+            allow_dirs (List[str], optional): Directories whose headers' declarations are generated as well. Defaults
+             to None.
+            symbols (List[str], optional): Names or glob patterns of the declarations to generate. Defaults to None,
+             which generates all declarations.
+            symbols_file (str, optional): Path of a file listing more names or glob patterns, one per line. Defaults to
+             None.
+            commented (Commented, optional): The type of comments to add to the generated code. Defaults to
+             Commented.Mixed.
+            profiler (Profiler, optional): A hook collecting the time of every phase and the cache hit rates of the
+             context. Memory tracing is process-wide, so the profilers of generations running in parallel should not
+             trace memory. Defaults to None.
+
+        Raises:
+            Exception: Raised when no valid files are provided or all provided files do not exist.
+        """
+        if profiler is None:
+            profiler = Profiler(enabled=False)
+        filepaths, source_files, location_filter = get_inputs(filenames, source_files, allow_dirs)
+        symbol_patterns = read_symbol_patterns(symbols, symbols_file)
+
+        with self.lock:
+            try:
+                with profiler.phase('parse'):
+                    decls = self.parse(filepaths)
+
+                with profiler.phase('identifiers'):
+                    header_words = self.identifier_index.identifiers(sorted(source_files), jobs=self.jobs)
+
+                with profiler.phase('populate'):
+                    def populate(names=None):
+                        return populate_builders(decls, header_words, names, type_cache=self.type_cache,
+                                                 ctype_objects=self.ctype_objects, profiler=profiler,
+                                                 location_filter=location_filter)
+
+                    if symbol_patterns:
+                        builders = SymbolSelection(symbol_patterns).select(
+                            (decl.name for decl in get_declarations(decls, location_filter)
+                             if decl.name in header_words and isinstance(decl, populated_types)), populate)
+                    else:
+                        builders = populate()
+                    names = list(builders)
+
+                with profiler.phase('ordering'):
+                    references = {name: get_references(builders[name]) for name in names}
+                    forward_declarable = set(name for name in names if is_forward_declarable(builders[name]))
+                    definition_order = get_definition_order(names, references, forward_declarable)
+
+                with profiler.phase('emit'):
+                    GenerationSnapshot(names, builders, references, forward_declarable,
+                                       definition_order).write_to(stream, commented=commented, profiler=profiler)
+
+                profiler.record_cache('parse', self)
+                profiler.record_cache('identifiers', self.identifier_index)
+                profiler.record_cache('types', self.type_cache)
+                profiler.count_builders(builders.values())
+            finally:
+                profiler.stop()
+
+    def generate(self, filenames: List[str], source_files: List[str] = None, allow_dirs: List[str] = None,
+                 symbols: List[str] = None, symbols_file: str = None, commented: Commented = Commented.Mixed,
+                 profiler: Optional[Profiler] = None) -> str:
+        """
+        Generate the Python ctypes code of C++ header files, see write.
+
+        Returns:
+            str: The generated code.
+        """
+        stream = io.StringIO()
+        self.write(stream, filenames, source_files=source_files, allow_dirs=allow_dirs, symbols=symbols,
+                   symbols_file=symbols_file, commented=commented, profiler=profiler)
+        return stream.getvalue()
+
+    def generate_module(self, filenames: List[str], module_name: str = 'bindings', source_files: List[str] = None,
+                        allow_dirs: List[str] = None, symbols: List[str] = None, symbols_file: str = None,
+                        profiler: Optional[Profiler] = None) -> types.ModuleType:
+        """
+        Generate the Python ctypes code of C++ header files and execute it into a new module, without writing it to
+        disk, see write.
+
+        The module is not added to sys.modules, so that contexts do not interfere with each other's modules.
+
+        Args:
+            module_name (str, optional): The name of the module. Defaults to 'bindings'.
+
+        Returns:
+            types.ModuleType: The module holding the generated types.
+        """
+        code = self.generate(filenames, source_files=source_files, allow_dirs=allow_dirs, symbols=symbols,
+                             symbols_file=symbols_file, commented=Commented.NoComment, profiler=profiler)
+        module = types.ModuleType(module_name)
+        exec(compile(code, '<%s>' % module_name, 'exec'), module.__dict__)
+        return module
@@ -1,36 +1,120 @@
 import os
+import gc
 import argparse
+import functools
+import json
 from pygccxml import utils, declarations, parser
 from collections import OrderedDict
-from typing import List
+from typing import List, Optional, Set, Iterable, Tuple
 import warnings
-from src.builders.ctypes_builder import CtypesBuilder
+from src.builders.builder_registry import BuilderRegistry
+from src.builders.ctypes_builder import CtypesBuilder, Commented, Definition
+from src.builders.incremental import *
+from src.builders.lowering import lower_builders
+from src.builders.type_cache import TypeCache
+from src.builders.ordering import get_references, is_forward_declarable, get_definition_order
+from src.builders.profiler import Profiler
+from src.builders.snapshot import GenerationSnapshot, get_snapshot_key, get_generator_digest
+from src.builders.symbol_selection import SymbolSelection, read_symbol_patterns
+from src.parsers.async_parser import parse_pipelined, log_progress
+from src.parsers.location_filter import LocationFilter
+from src.parsers.parallel_parser import parse_parallel
+from src.parsers.prelude import Prelude, get_include_spelling
+from src.tools.file_tools import atomic_open, get_includes
+from src.tools.file_watcher import FileWatcher, watch
+from src.tools.generation_client import request_generation
+from src.tools.identifier_index import IdentifierIndex
+from src.tools.log_tools import logger
+from src.tools.parse_cache import ParseCache, default_max_size
 from src.tools.string_tools import *
 
 
-def main(filenames: List[str], output: str,
-         generator_path: str = None, generator_name: str = None, include_paths: List[str] = None,
-         source_files: List[str] = None):
+# Comment styles of the generated code by command line name
+comment_styles = OrderedDict([('mixed', Commented.Mixed), ('inline', Commented.Inline), ('outline', Commented.Outline),
+                              ('none', Commented.NoComment)])
+
+populated_types = (declarations.typedef_t, declarations.free_function_type_t, declarations.enumeration_t,
+                   declarations.class_t, declarations.constructor_t, declarations.free_function_t)
+
+
+def populate_builders(decls: list, header_words: Set[str], names: Optional[Set[str]] = None,
+                      type_cache: Optional[TypeCache] = None, ctype_objects: bool = True,
+                      profiler: Optional[Profiler] = None,
+                      location_filter: Optional[LocationFilter] = None) -> BuilderRegistry:
     """
-    Parse C++ header files, extract declarations, and generate Python ctypes code.
+    Populate the builders of the top-level C++ declarations referenced in the source files.
 
     Args:
-        filenames (List[str]): List of C++ header file paths to parse.
-        output (str): Output Python file path for generated ctypes code.
-        generator_path (str, optional): Path to the XML generator executable. Defaults to None.
-        generator_name (str, optional): Name of the XML generator. Defaults to None.
-        include_paths (List[str], optional): List of additional include paths for parsing. Defaults to None.
-        source_files (List[str], optional): List of source file paths to consider during parsing. Defaults to None.
+        decls (list): The parsed declarations, as returned by pygccxml.parser.parse.
+        header_words (Set[str]): The identifiers found in the source files.
+        names (Optional[Set[str]]): If given, only the declarations with these names are populated. Defaults to None.
+        type_cache (Optional[TypeCache]): The type resolution cache to use. Defaults to a new cache.
+        ctype_objects (bool): Whether to also build the live ctypes objects of the types. Defaults to True.
+        profiler (Optional[Profiler]): The profiler recording the time spent on every declaration. Defaults to None.
+        location_filter (Optional[LocationFilter]): If given, only the declarations located in the files it keeps are
+         populated. Defaults to None. Only the declarations of the global namespace are considered.
+
+    Returns:
+        BuilderRegistry: The builders by declaration name, in declaration order.
+    """
+    if profiler is None:
+        profiler = Profiler(enabled=False)
+    builders = BuilderRegistry(type_cache=type_cache, ctype_objects=ctype_objects)
+    futures = set()
+    for decl in get_declarations(decls, location_filter):
+        if decl.name in header_words and (names is None or decl.name in names):
+            if isinstance(decl, populated_types):
+                with profiler.timed_declaration('populate', decl.name):
+                    builders[decl.name] = CtypesBuilder.populate(decl, title=decl.name, builders=builders,
+                                                                 futures=futures)
+    # Forward and circular references are resolved by the definition order rather than while emitting the code
+    futures.clear()
+    return builders
 
-    Raises:
-        Exception: Raised when no valid files are provided or all provided files do not exist.
-        UserWarning: Raised when some provided files do not exist.
+
+def get_declarations(decls: list, location_filter: Optional[LocationFilter] = None) -> Iterable:
+    """
+    Get the top-level C++ declarations to consider for generation.
+
+    Args:
+        decls (list): The parsed declarations, as returned by pygccxml.parser.parse.
+        location_filter (Optional[LocationFilter]): If given, the declarations located in the files it keeps.
+         Defaults to None.
 
     Returns:
-        None
+        Iterable: The declarations, in declaration order.
+    """
+    if location_filter is None:
+        return decls[0].declarations
+    return location_filter.declarations(decls[0])
+
+
+@functools.lru_cache(maxsize=None)
+def find_xml_generator() -> Tuple[str, str]:
+    """
+    Find the XML generator, once per process since repeated generations, e.g. in watch mode, use the same one.
+
+    Returns:
+        Tuple[str, str]: The path and the name of the XML generator, as returned by pygccxml.utils.find_xml_generator.
+    """
+    return utils.find_xml_generator()
+
+
+def get_xml_generator_config(generator_path: str = None, generator_name: str = None,
+                             include_paths: List[str] = None) -> parser.xml_generator_configuration_t:
+    """
+    Configure the XML generator.
+
+    Args:
+        generator_path (str, optional): Path to the XML generator executable. Defaults to the one found on the system.
+        generator_name (str, optional): Name of the XML generator. Defaults to the one found on the system.
+        include_paths (List[str], optional): List of additional include paths for parsing. Defaults to None.
+
+    Returns:
+        parser.xml_generator_configuration_t: The XML generator configuration.
     """
     # Find out the C++ parser
-    generator_path_utils, generator_name_utils = utils.find_xml_generator()
+    generator_path_utils, generator_name_utils = find_xml_generator()
 
     # Set generator_path and generator_name if not provided
     if generator_path is None:
@@ -38,12 +122,52 @@ def main(filenames: List[str], output: str,
     if generator_name is None:
         generator_name = generator_name_utils
 
-    # Configure the XML generator
-    xml_generator_config = parser.xml_generator_configuration_t(
+    return parser.xml_generator_configuration_t(
         xml_generator_path=generator_path,
         xml_generator=generator_name,
         include_paths=include_paths if include_paths else [])
 
+
+def get_watched_paths(filenames: List[str], include_paths: List[str] = None,
+                      source_files: List[str] = None) -> List[str]:
+    """
+    Get the files a generation depends on, to be watched for changes.
+
+    Args:
+        filenames (List[str]): The C++ header file paths to parse.
+        include_paths (List[str], optional): The additional include paths. Defaults to None.
+        source_files (List[str], optional): The source file paths. Defaults to None.
+
+    Returns:
+        List[str]: The absolute paths of the headers, of the headers they transitively include that can be resolved
+         and of the source files.
+    """
+    filepaths = [os.path.abspath(filename) for filename in filenames]
+    paths = set(filepaths)
+    paths.update(get_includes([filepath for filepath in filepaths if os.path.isfile(filepath)], include_paths))
+    paths.update(os.path.abspath(source_file) for source_file in source_files or [])
+    return sorted(paths)
+
+
+def get_inputs(filenames: List[str], source_files: List[str] = None,
+               allow_dirs: List[str] = None) -> Tuple[List[str], Set[str], LocationFilter]:
+    """
+    Validate the headers of a generation and get the files its declarations are selected by.
+
+    Args:
+        filenames (List[str]): The C++ header file paths to parse.
+        source_files (List[str], optional): The source file paths. Defaults to None.
+        allow_dirs (List[str], optional): The directories whose headers' declarations are generated as well. Defaults
+         to None.
+
+    Raises:
+        Exception: Raised when no valid files are provided or all provided files do not exist.
+        UserWarning: Raised when some provided files do not exist.
+
+    Returns:
+        Tuple[List[str], Set[str], LocationFilter]: The absolute paths of the existing headers, the absolute paths of
+         the source files, including the headers, and the location filter of the declarations.
+    """
     filepaths = []
     invalid_filenames = []
 
@@ -70,40 +194,303 @@ def main(filenames: List[str], output: str,
                                                                                                   invalid_filenames),
                                                                                               '' if n > 1 else 'es'))
 
-
-    # Parse C++ declarations from the provided files
-    decls = parser.parse(filepaths, xml_generator_config)
-
-    builders = OrderedDict()
-    futures = set()
-
     if source_files is None:
         source_files = set(filepaths)
     else:
         source_files = set(map(lambda x: os.path.abspath(x), source_files)).union(set(filepaths))
-    header_words = set()
 
-    # Extract words from source files for future reference
-    for source_file in source_files:
-        header_words = header_words.union(get_words(source_file))
+    # Only consider the declarations of the provided headers, their directories and the allowed directories
+    location_filter = LocationFilter(source_files, [os.path.dirname(filepath) for filepath in filepaths] +
+                                     [os.path.abspath(directory) for directory in allow_dirs or []])
+    return filepaths, source_files, location_filter
 
-    # Extract and process C++ declarations
-    for decl in decls[0].declarations:
-        if decl.name in header_words:
-            if isinstance(decl, (declarations.typedef_t, declarations.free_function_type_t,
-                                 declarations.enumeration_t, declarations.class_t, declarations.constructor_t,
-                                 declarations.free_function_t)):
-                builders[decl.name] = CtypesBuilder.populate(decl, title=decl.name, builders=builders, futures=futures)
 
-    # Write Python ctypes code to the output file
-    with open(output, 'w') as f:
-        f.write('import ctypes\n%s' % ('from enum import IntEnum\n'
-                if any([builder.is_enumeration for builder in builders.values()]) else ''))
+def main(filenames: List[str], output: str,
+         generator_path: str = None, generator_name: str = None, include_paths: List[str] = None,
+         source_files: List[str] = None, cache_dir: str = None, no_cache: bool = False,
+         cache_size: int = default_max_size, jobs: int = 1, job_timeout: float = None, incremental: bool = False,
+         skip_comments: bool = False, ctype_objects: bool = False, profiler: Optional[Profiler] = None,
+         allow_dirs: List[str] = None, symbols: List[str] = None, symbols_file: str = None, stream_xml: bool = False,
+         commented: Commented = Commented.Mixed, prelude: List[str] = None, pipeline: bool = False,
+         shard_memory: int = None):
+    """
+    Parse C++ header files, extract declarations, and generate Python ctypes code.
 
-        for builder in builders.values():
-            f.write('\n')
-            f.write(builder.to_string())
-            f.write('\n')
+    Args:
+        filenames (List[str]): List of C++ header file paths to parse.
+        output (str): Output Python file path for generated ctypes code.
+        generator_path (str, optional): Path to the XML generator executable. Defaults to None.
+        generator_name (str, optional): Name of the XML generator. Defaults to None.
+        include_paths (List[str], optional): List of additional include paths for parsing. Defaults to None.
+        source_files (List[str], optional): List of source file paths to consider during parsing. Defaults to None.
+        cache_dir (str, optional): Directory of the parse cache. Defaults to ~/.cache/py-cpp-bindings.
+        no_cache (bool, optional): Disable the parse cache. Defaults to False.
+        cache_size (int, optional): Maximum size of the parse cache in bytes. Defaults to 512 MiB.
+        jobs (int, optional): Number of XML generator processes to run in parallel, one header per process. A value
+         below 1 uses all CPUs. Defaults to 1, which parses all headers in a single run.
+        job_timeout (float, optional): Maximum number of seconds the XML generator may spend on a single header.
+         Headers that time out are disregarded. Defaults to None.
+        incremental (bool, optional): Only regenerate the declarations affected by header changes since the previous
+         incremental run and reuse the code emitted for the others. The output is identical to a full run.
+         Defaults to False.
+        skip_comments (bool, optional): Disregard identifiers in comments and string literals of the source files when
+         selecting the declarations to generate. Defaults to False.
+        ctype_objects (bool, optional): Also build the live ctypes objects of the types while generating the code.
+         The generated code does not depend on them. Defaults to False.
+        profiler (Profiler, optional): A hook collecting the time and memory of every phase, the builder counts, the
+         slowest declarations and the cache hit rates of the run. Read them with profiler.report() afterwards.
+         Defaults to None.
+        allow_dirs (List[str], optional): Directories whose headers' declarations are generated in addition to the
+         ones of the provided files, the source files and the headers next to the provided files. Declarations of
+         other headers, e.g. system headers, are disregarded. Defaults to None.
+        symbols (List[str], optional): Names or glob patterns of the declarations to generate. Only these
+         declarations and the declarations they refer to, transitively, are generated. Defaults to None, which
+         generates all declarations.
+        symbols_file (str, optional): Path of a file listing more names or glob patterns, one per line. Defaults to
+         None.
+        stream_xml (bool, optional): Stream the XML generator output of every header and only read the
+         declarations of the headers kept by the location filter, and the declarations they refer to, into
+         declaration objects. This bounds the memory of the parse phase by the bound declarations rather than by
+         everything the headers include. Defaults to False.
+        commented (Commented, optional): The type of comments to add to the generated code. Defaults to
+         Commented.Mixed.
+        prelude (List[str], optional): Includes common to the headers, e.g. '<string>'. The prelude is parsed once,
+         and cached, and the declarations of its files are not read again from the output of every header. Defaults to
+         None.
+        pipeline (bool, optional): Run the XML generator as asyncio subprocesses, up to jobs at once, and read the
+         output of every header while the next headers are compiled, printing the progress of every header. The
+         declarations are the same. Defaults to False.
+        shard_memory (int, optional): Parse and populate the headers in shards of consecutive headers, so that the
+         process stays below this number of bytes, reading the declarations of one shard at a time. The output is
+         identical. The populate phase then includes the parse of the shards. Cannot be combined with incremental
+         runs and symbol selection. Defaults to None, which parses all headers at once.
+
+    Raises:
+        Exception: Raised when no valid files are provided or all provided files do not exist.
+        UserWarning: Raised when some provided files do not exist.
+
+    Returns:
+        None
+    """
+    if profiler is None:
+        profiler = Profiler(enabled=False)
+
+    try:
+        # Configure the XML generator
+        xml_generator_config = get_xml_generator_config(generator_path, generator_name, include_paths)
+
+        filepaths, source_files, location_filter = get_inputs(filenames, source_files, allow_dirs)
+
+        parse_cache = None if no_cache else ParseCache(cache_dir, max_size=cache_size)
+        symbol_patterns = read_symbol_patterns(symbols, symbols_file)
+        if shard_memory is not None and (incremental or symbol_patterns):
+            raise Exception('Sharded generation cannot be combined with incremental generation or symbol selection')
+
+        # Emit the code from the resolved builders of a previous run with the same inputs, skipping the parse and the
+        # population. Runs with a job timeout are not snapshot, since their result depends on the headers timing out.
+        snapshot_key = None
+        if parse_cache is not None and not incremental and job_timeout is None:
+            with profiler.phase('snapshot'):
+                snapshot_key = get_snapshot_key(parse_cache, filepaths, xml_generator_config, source_files,
+                                                sorted(location_filter.files), location_filter.directories,
+                                                symbol_patterns, skip_comments, prelude)
+                snapshot = GenerationSnapshot.load(parse_cache, snapshot_key)
+            if snapshot is not None:
+                logger.info(parse_cache.report())
+                with profiler.phase('emit'):
+                    snapshot.write(output, commented=commented, profiler=profiler)
+                profiler.record_cache('parse', parse_cache)
+                profiler.count_builders(snapshot.builders.values())
+                return
+
+        # Parse C++ declarations from the provided files, reusing cached declarations if the inputs did not change
+        with profiler.phase('parse'):
+            if shard_memory is not None:
+                # The shards are parsed one at a time while populating
+                decls = None
+            elif pipeline:
+                decls = parse_pipelined(filepaths, xml_generator_config, jobs=jobs, timeout=job_timeout,
+                                        cache=parse_cache, location_filter=location_filter if stream_xml else None,
+                                        prelude=Prelude(prelude) if prelude else None, progress=log_progress)
+            elif jobs != 1 or job_timeout is not None or stream_xml or prelude:
+                decls = parse_parallel(filepaths, xml_generator_config, jobs=jobs, timeout=job_timeout,
+                                       cache=parse_cache, location_filter=location_filter if stream_xml else None,
+                                       prelude=Prelude(prelude) if prelude else None)
+            elif parse_cache is not None:
+                decls = parse_cache.parse(filepaths, xml_generator_config)
+            else:
+                decls = parser.parse(filepaths, xml_generator_config)
+            if parse_cache is not None:
+                logger.info(parse_cache.report())
+
+        # Extract words from source files for future reference
+        with profiler.phase('identifiers'):
+            identifier_index = IdentifierIndex(None if parse_cache is None else
+                                               os.path.join(parse_cache.cache_dir, 'identifiers.pickle'),
+                                               skip_comments=skip_comments)
+            header_words = identifier_index.identifiers(sorted(source_files), jobs=jobs)
+            identifier_index.save()
+            if parse_cache is not None:
+                logger.info(identifier_index.report())
+
+        # Extract and process C++ declarations
+        type_cache = TypeCache()
+        with profiler.phase('populate'):
+            # Restrict the generation to the requested symbols and the declarations they need
+            selection = None
+            if symbol_patterns:
+                selection = SymbolSelection(symbol_patterns)
+                selection.select((decl.name for decl in get_declarations(decls, location_filter)
+                                  if decl.name in header_words and isinstance(decl, populated_types)),
+                                 lambda selected: populate_builders(decls, header_words, selected,
+                                                                    type_cache=type_cache, ctype_objects=ctype_objects,
+                                                                    profiler=profiler, location_filter=location_filter))
+                logger.info(selection.report())
+            selected_names = selection.names if selection is not None else None
+
+            if shard_memory is not None:
+                # Imported here, since the sharded generation builds on this module
+                from src.sharding import populate_shards
+                builders = populate_shards(filepaths, xml_generator_config, header_words, shard_memory, location_filter,
+                                           jobs=jobs, timeout=job_timeout, cache=parse_cache, stream_xml=stream_xml,
+                                           prelude=Prelude(prelude) if prelude else None, type_cache=type_cache,
+                                           ctype_objects=ctype_objects, profiler=profiler)
+                names = list(builders)
+                manifest = None
+            elif not incremental:
+                if selection is not None:
+                    builders = selection.builders
+                else:
+                    builders = populate_builders(decls, header_words, type_cache=type_cache,
+                                                 ctype_objects=ctype_objects, profiler=profiler,
+                                                 location_filter=location_filter)
+                names = list(builders)
+                manifest = None
+            else:
+                # Find the declarations affected by header changes since the previous run and only populate those
+                sources = OrderedDict()
+                for decl in get_declarations(decls, location_filter):
+                    if decl.name in header_words and isinstance(decl, populated_types) and \
+                            (selected_names is None or decl.name in selected_names):
+                        sources.setdefault(decl.name, set()).add(get_source_file(decl) or '')
+                names = list(sources)
+                manifest_path = get_manifest_path(output)
+                manifest = IncrementalManifest.load(manifest_path)
+                options_key = get_options_key(xml_generator_config.xml_generator_path,
+                                              xml_generator_config.xml_generator, include_paths, filepaths,
+                                              sorted(location_filter.files), location_filter.directories,
+                                              symbol_patterns, commented.name, prelude, get_generator_digest())
+                file_hashes, include_graph = get_file_hashes(filepaths, include_paths)
+                if manifest is None or manifest.options_key != options_key:
+                    builders = populate_builders(decls, header_words, selected_names, type_cache=type_cache,
+                                                 ctype_objects=ctype_objects, profiler=profiler,
+                                                 location_filter=location_filter)
+                    manifest = IncrementalManifest(options_key, file_hashes, OrderedDict())
+                else:
+                    changed_files = get_changed_files(manifest.files, file_hashes, include_graph)
+                    removed = [name for name in manifest.entries if name not in sources]
+                    seeds = set(removed)
+                    for name in names:
+                        entry = manifest.entries.get(name)
+                        if entry is None or entry['files'] != sorted(sources[name]) or \
+                                not changed_files.isdisjoint(sources[name]):
+                            seeds.add(name)
+                    references = {name: set(entry['references']) for name, entry in manifest.entries.items()}
+                    affected = get_affected(names + removed, references, seeds)
+                    while True:
+                        builders = populate_builders(decls, header_words, affected, type_cache=type_cache,
+                                                     ctype_objects=ctype_objects, profiler=profiler,
+                                                     location_filter=location_filter)
+                        for name, builder in builders.items():
+                            references[name] = get_references(builder)
+                        expanded = get_affected(names + removed, references, affected)
+                        if expanded == affected:
+                            break
+                        affected = expanded
+                    manifest.files = file_hashes
+
+        logger.info(type_cache.report())
+
+        # Detach the builders from the parsed declarations, so that the declaration tree is released before the code is
+        # emitted
+        with profiler.phase('lowering'):
+            lower_builders(builders.values())
+            del decls
+            # The declaration tree is cyclic, so it is only freed by the garbage collector
+            gc.collect()
+
+        # Order the definitions so that every type is bound before it is referred to
+        with profiler.phase('ordering'):
+            references = {}
+            forward_declarable = set()
+            for name in names:
+                if name in builders:
+                    references[name] = get_references(builders[name])
+                    if is_forward_declarable(builders[name]):
+                        forward_declarable.add(name)
+                else:
+                    references[name] = set(manifest.entries[name]['references'])
+                    if manifest.entries[name]['forward_declarable']:
+                        forward_declarable.add(name)
+            definition_order = get_definition_order(names, references, forward_declarable)
+
+        # Write Python ctypes code to the output file
+        if manifest is None:
+            snapshot = GenerationSnapshot(names, builders, references, forward_declarable, definition_order)
+            # Store the resolved builders before emitting the code updates them
+            if snapshot_key is not None:
+                with profiler.phase('snapshot'):
+                    snapshot.save(parse_cache, snapshot_key)
+            with profiler.phase('emit'):
+                snapshot.write(output, commented=commented, profiler=profiler)
+        else:
+            with profiler.phase('emit'):
+                is_enumeration = [builders[name].is_enumeration if name in builders else
+                                  manifest.entries[name]['is_enumeration'] for name in names]
+                fragments = {}
+                with atomic_open(output) as f:
+                    f.write('import ctypes\n%s' % ('from enum import IntEnum\n' if any(is_enumeration) else ''))
+
+                    for name, definition in definition_order:
+                        f.write('\n')
+                        with profiler.timed_declaration('emit', name):
+                            if name in builders:
+                                fragments[name, definition] = builders[name].to_string(commented=commented,
+                                                                                       definition=definition)
+                            elif definition == Definition.Pre:
+                                fragments[name, definition] = manifest.entries[name]['pre']
+                            else:
+                                fragments[name, definition] = manifest.entries[name]['fragment']
+                            f.write(fragments[name, definition])
+                        f.write('\n')
+
+        # Record what has been emitted for the next incremental run
+        if manifest is not None:
+            with profiler.phase('manifest'):
+                entries = OrderedDict()
+                for name in names:
+                    if name in builders:
+                        pre = fragments.get((name, Definition.Pre))
+                        fragment = fragments.get((name, Definition.Post), fragments.get((name, Definition.Undefined)))
+                        entries[name] = {'name': name, 'files': sorted(sources[name]),
+                                         'references': sorted(references[name]),
+                                         'is_enumeration': builders[name].is_enumeration,
+                                         'forward_declarable': name in forward_declarable, 'fragment': fragment,
+                                         'pre': pre}
+                    else:
+                        entries[name] = manifest.entries[name]
+                manifest.entries = entries
+                manifest.save(manifest_path)
+                logger.info('Incremental generation: %d of %d declaration%s regenerated' %
+                            (len(builders), len(names), '' if len(names) == 1 else 's'))
+
+        # Collect the counters of the run
+        profiler.record_cache('parse', parse_cache)
+        profiler.record_cache('identifiers', identifier_index)
+        profiler.record_cache('types', type_cache)
+        profiler.count_builders(builders.values())
+    finally:
+        profiler.stop()
 
 
 if __name__ == "__main__":
@@ -111,15 +498,157 @@ if __name__ == "__main__":
                                      add_help=True)
 
     # Define command-line arguments corresponding to main() parameters with hyphens
-    argparser.add_argument("-f", "--filenames", nargs="+", required=True, help="List of C++ header file paths to parse")
-    argparser.add_argument("-o", "--output", required=True, help="Output Python file path for generated ctypes code")
+    argparser.add_argument("-f", "--filenames", nargs="+", help="List of C++ header file paths to parse")
+    argparser.add_argument("-o", "--output", help="Output Python file path for generated ctypes code")
     argparser.add_argument("-p", "--generator-path", help="Path to the XML generator executable")
     argparser.add_argument("-n", "--generator-name", help="Name of the XML generator")
     argparser.add_argument("-i", "--include-paths", nargs="+", help="List of additional include paths for parsing")
     argparser.add_argument("-s", "--source-files", nargs="+",
                            help="List of source file paths to consider during parsing")
+    argparser.add_argument("--cache-dir", help="Directory of the parse cache (defaults to ~/.cache/py-cpp-bindings)")
+    argparser.add_argument("--no-cache", action="store_true", help="Disable the parse cache")
+    argparser.add_argument("--cache-size", type=int, default=default_max_size // (1024 * 1024),
+                           help="Maximum size of the parse cache in MiB")
+    argparser.add_argument("-j", "--jobs", type=int, default=1,
+                           help="Number of headers to parse in parallel, one XML generator process each "
+                                "(0 uses all CPUs)")
+    argparser.add_argument("--job-timeout", type=float,
+                           help="Maximum number of seconds the XML generator may spend on a single header")
+    argparser.add_argument("--incremental", action="store_true",
+                           help="Only regenerate the declarations affected by header changes since the previous "
+                                "incremental run (keeps a manifest next to the output)")
+    argparser.add_argument("--skip-comments", action="store_true",
+                           help="Disregard identifiers in comments and string literals of the source files")
+    argparser.add_argument("--allow-dirs", nargs="+",
+                           help="Directories whose headers' declarations are generated in addition to the ones of the "
+                                "provided files and their directories")
+    argparser.add_argument("--symbols", nargs="+",
+                           help="Names or glob patterns of the declarations to generate, along with the declarations "
+                                "they need")
+    argparser.add_argument("--symbols-file", help="File listing names or glob patterns of the declarations to "
+                                                  "generate, one per line")
+    argparser.add_argument("--stream-xml", action="store_true",
+                           help="Stream the XML generator output and only read the declarations of the provided "
+                                "headers and allowed directories, and the declarations they refer to")
+    argparser.add_argument("--prelude", nargs="+", metavar="INCLUDE",
+                           help="Includes common to the headers, e.g. system headers, parsed once and cached rather "
+                                "than read again for every header")
+    argparser.add_argument("--pipeline", action="store_true",
+                           help="Read the XML generator output of every header while the next headers are compiled, "
+                                "reporting the progress of every header")
+    argparser.add_argument("--shard-memory", type=int, metavar="MIB",
+                           help="Parse and populate the headers in shards small enough for the generator to stay "
+                                "below MIB MiB of memory")
+    argparser.add_argument("--comments", default="mixed", choices=list(comment_styles),
+                           help="Type of comments to add to the generated code (default: mixed)")
+    argparser.add_argument("--profile", nargs="?", const="-", metavar="PATH",
+                           help="Print a JSON report of the time and memory of every phase, the builder counts, the "
+                                "slowest declarations and the cache hit rates, or write it to PATH")
+    argparser.add_argument("--ctype-objects", action="store_true",
+                           help="Also build the live ctypes objects of the types while generating the code")
+    argparser.add_argument("--server", metavar="SOCKET",
+                           help="Send the generation to the generation server listening on the Unix socket SOCKET "
+                                "(see src.server), generating in-process if no server is running")
+    argparser.add_argument("--manifest", metavar="PATH",
+                           help="Generate every target listed in the batch manifest PATH (JSON or TOML), compiling "
+                                "each header of the targets once, instead of the provided files and output")
+    argparser.add_argument("--watch", action="store_true",
+                           help="Keep running and regenerate the output incrementally whenever the headers, their "
+                                "includes or the source files change")
+    argparser.add_argument("--watch-interval", type=float, default=0.2,
+                           help="Number of seconds between two checks for changes in watch mode (default: 0.2)")
 
     args = argparser.parse_args()
+    if args.manifest is None and (not args.filenames or not args.output):
+        argparser.error("the following arguments are required: -f/--filenames, -o/--output")
+    if args.manifest is not None:
+        combined = [option for option, value in [('--filenames', args.filenames), ('--output', args.output),
+                                                 ('--incremental', args.incremental), ('--watch', args.watch),
+                                                 ('--server', args.server),
+                                                 ('--pipeline', args.pipeline),
+                                                 ('--shard-memory', args.shard_memory),
+                                                 ('--job-timeout', args.job_timeout),
+                                                 ('--stream-xml', args.stream_xml),
+                                                 ('--source-files', args.source_files),
+                                                 ('--allow-dirs', args.allow_dirs),
+                                                 ('--symbols', args.symbols),
+                                                 ('--symbols-file', args.symbols_file)] if value]
+        if combined:
+            argparser.error("--manifest cannot be combined with %s" % ', '.join(combined))
+    if args.shard_memory is not None:
+        combined = [option for option, value in [('--incremental', args.incremental), ('--watch', args.watch),
+                                                 ('--symbols', args.symbols), ('--symbols-file', args.symbols_file),
+                                                 ('--pipeline', args.pipeline)] if value]
+        if combined:
+            argparser.error("--shard-memory cannot be combined with %s" % ', '.join(combined))
 
-    # Call the main function with arguments from the command line
-    main(args.filenames, args.output, args.generator_path, args.generator_name, args.include_paths, args.source_files)
+    def write_profile(report: dict):
+        if args.profile == '-':
+            print(json.dumps(report, indent=2))
+        else:
+            with open(args.profile, 'w') as f:
+                f.write(json.dumps(report, indent=2))
+
+    def run_manifest():
+        # Imported here, since the batch generation builds on this module
+        from src.batch import run_batch
+        profiler = Profiler() if args.profile is not None else None
+        reports = run_batch(args.manifest, generator_path=args.generator_path, generator_name=args.generator_name,
+                            include_paths=args.include_paths, cache_dir=args.cache_dir, no_cache=args.no_cache,
+                            cache_size=args.cache_size * 1024 * 1024, jobs=args.jobs, skip_comments=args.skip_comments,
+                            ctype_objects=args.ctype_objects, commented=comment_styles[args.comments],
+                            prelude=args.prelude, profiler=profiler)
+        for report in reports:
+            if report['ok']:
+                logger.info('Generated %s in %.2f seconds' % (report['output'], report['seconds']))
+            else:
+                logger.error('Failed to generate %s: %s' % (report['output'], report['error']))
+        if profiler is not None:
+            write_profile({'batch': profiler.report(), 'targets': reports})
+        failed = sum(not report['ok'] for report in reports)
+        if failed:
+            raise Exception('%d of %d batch target%s failed' % (failed, len(reports), '' if len(reports) == 1 else 's'))
+
+    def run():
+        # Call the main function with arguments from the command line
+        arguments = OrderedDict([
+            ('filenames', args.filenames), ('output', args.output), ('generator_path', args.generator_path),
+            ('generator_name', args.generator_name), ('include_paths', args.include_paths),
+            ('source_files', args.source_files), ('cache_dir', args.cache_dir), ('no_cache', args.no_cache),
+            ('cache_size', args.cache_size * 1024 * 1024), ('jobs', args.jobs), ('job_timeout', args.job_timeout),
+            ('incremental', args.incremental or args.watch), ('skip_comments', args.skip_comments),
+            ('ctype_objects', args.ctype_objects), ('allow_dirs', args.allow_dirs), ('symbols', args.symbols),
+            ('symbols_file', args.symbols_file), ('stream_xml', args.stream_xml), ('commented', args.comments),
+            # Bare prelude names of existing files are resolved here, since the server runs in another directory
+            ('prelude', None if args.prelude is None else [get_include_spelling(include) for include in args.prelude]),
+            ('pipeline', args.pipeline),
+            ('shard_memory', None if args.shard_memory is None else args.shard_memory * 1024 * 1024)])
+        report = None
+        response = None
+        if args.server is not None:
+            response = request_generation(args.server, OrderedDict([('cwd', os.getcwd())], **arguments))
+        if response is not None:
+            if not response['ok']:
+                raise Exception('The generation server failed: %s' % response['error'])
+            logger.info('Generated by the server in %.2f seconds (%.2f seconds waiting)' %
+                        (response['seconds'], response['queued_seconds']))
+            report = response['profile']
+        else:
+            profiler = Profiler() if args.profile is not None else None
+            arguments['commented'] = comment_styles[args.comments]
+            main(profiler=profiler, **arguments)
+            if profiler is not None:
+                report = profiler.report()
+        if args.profile is not None and report is not None:
+            write_profile(report)
+
+    if args.manifest is not None:
+        run_manifest()
+    elif args.watch:
+        try:
+            watch(run, FileWatcher(lambda: get_watched_paths(args.filenames, args.include_paths, args.source_files),
+                                   interval=args.watch_interval))
+        except KeyboardInterrupt:
+            pass
+    else:
+        run()
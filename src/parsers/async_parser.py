@@ -0,0 +1,304 @@
+from typing import Optional, List, Callable, Set, Union
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import os
+import subprocess
+import tempfile
+import warnings
+import pygccxml
+from pygccxml import parser, declarations
+from pygccxml.parser import declarations_joiner
+from src.parsers.location_filter import LocationFilter
+from src.parsers.parallel_parser import ParseTimeoutError, get_command_line, kill_process_tree, check_xml_file, \
+    check_timed_out, create_xml_file
+from src.parsers.prelude import Prelude
+from src.parsers.xml_filter import filter_xml_file, get_file_names, prune_xml_file
+from src.tools.log_tools import logger
+from src.tools.parse_cache import ParseCache
+
+# Called with the stage a header has gone through ('compiled' or 'read'), its path, the number of headers through
+# that stage and the total number of headers
+ProgressCallback = Callable[[str, str, int, int], None]
+
+# Steps of pygccxml's join of the headers of a parse, as named in the version pinned in requirements.txt
+join_steps = ('_join_top_namespaces', '_join_class_hierarchy', '_project_reader_t__declarated_types',
+              '_relink_declarated_types')
+
+
+async def create_xml_file_async(filepath: str, xml_file: str,
+                                xml_generator_config: parser.xml_generator_configuration_t,
+                                timeout: Optional[float] = None) -> str:
+    """
+    Run the XML generator on a single header file as an asyncio subprocess and write its XML output.
+
+    The generator process (and any process it spawned) is killed once the timeout expires or when the calling task is
+    cancelled. If the installed pygccxml does not have the command line builder, see get_command_line, pygccxml runs
+    the generator in a worker thread instead, without a timeout, and the process is not killed.
+
+    Args:
+        filepath (str): The absolute path of the header file.
+        xml_file (str): The path of the XML file to generate.
+        xml_generator_config (parser.xml_generator_configuration_t): The XML generator configuration.
+        timeout (Optional[float]): The maximum number of seconds the generator may run. Defaults to no limit.
+
+    Raises:
+        ParseTimeoutError: Raised when the generator did not finish in time.
+        RuntimeError: Raised when the generator failed or did not produce the XML file.
+        Exception: Raised when a timeout is given but the installed pygccxml does not have the command line builder.
+
+    Returns:
+        str: The path of the generated XML file.
+    """
+    command_line = get_command_line(filepath, xml_file, xml_generator_config)
+    if command_line is None:
+        return await asyncio.get_running_loop().run_in_executor(None, create_xml_file, filepath, xml_file,
+                                                                xml_generator_config, timeout)
+    process = await asyncio.create_subprocess_shell(command_line, stdout=subprocess.PIPE,
+                                                    start_new_session=os.name == 'posix')
+    try:
+        output, _ = await asyncio.wait_for(process.communicate(), timeout)
+    except BaseException as e:
+        # Timed out, cancelled or interrupted
+        kill_process_tree(process.pid)
+        await process.wait()
+        if isinstance(e, asyncio.TimeoutError):
+            raise ParseTimeoutError('Parsing %s took longer than %s seconds' % (filepath, timeout))
+        raise
+    check_xml_file(filepath, xml_file, xml_generator_config, output, process.returncode)
+    return xml_file
+
+
+def read_translation_unit(xml_file: str, xml_generator_config: parser.xml_generator_configuration_t,
+                          file_names: Optional[Set[str]] = None,
+                          location_filter: Optional[LocationFilter] = None) -> list:
+    """
+    Read the declarations of the XML generator output of a single header file.
+
+    Args:
+        xml_file (str): The path of the XML file.
+        xml_generator_config (parser.xml_generator_configuration_t): The XML generator configuration.
+        file_names (Optional[Set[str]]): If given, the output is first reduced to the declarations that are not located
+         in these files, the ones of a prelude, and the ones they refer to. Defaults to None.
+        location_filter (Optional[LocationFilter]): If given, the output is reduced to the declarations the filter keeps
+         and the declarations they refer to, see parse_parallel. Defaults to None.
+
+    Returns:
+        list: The top-level namespaces of the header, to be joined by join_translation_units.
+    """
+    reduce_xml_file(xml_file, file_names, location_filter)
+    reader = parser.source_reader_t(xml_generator_config)
+    decls = reader.read_xml_file(xml_file)
+    xml_generator_config.xml_generator_from_xml_file = reader.xml_generator_from_xml_file
+    return decls
+
+
+def reduce_xml_file(xml_file: str, file_names: Optional[Set[str]] = None,
+                    location_filter: Optional[LocationFilter] = None) -> str:
+    """
+    Reduce the XML generator output of a single header file before it is read, in place, see read_translation_unit.
+
+    Returns:
+        str: The path of the XML file.
+    """
+    if file_names is not None:
+        prune_xml_file(xml_file, file_names)
+    if location_filter is not None:
+        filter_xml_file(xml_file, location_filter)
+    return xml_file
+
+
+def join_translation_units(translation_units: List[list],
+                           xml_generator_config: parser.xml_generator_configuration_t) -> list:
+    """
+    Join the declarations read from the XML generator output of several header files into a single declaration tree.
+
+    This is the join pygccxml.parser.parse runs after reading the headers in its default file by file mode, so joining
+    the headers in the order of the parse yields the same tree. pygccxml does not expose the join, so its steps are
+    called by their names in the version pinned in requirements.txt, see can_join_translation_units.
+
+    Args:
+        translation_units (List[list]): The declarations of every header, as returned by read_translation_unit.
+        xml_generator_config (parser.xml_generator_configuration_t): The XML generator configuration.
+
+    Raises:
+        Exception: Raised when the installed pygccxml does not have the join steps.
+
+    Returns:
+        list: The parsed declarations, as returned by pygccxml.parser.parse.
+    """
+    if not can_join_translation_units():
+        raise Exception('Joining headers read separately needs the join steps of pygccxml (%s), which pygccxml %s '
+                        'does not have, see requirements.txt' % (', '.join(join_steps), pygccxml.__version__))
+    reader = parser.project_reader_t(xml_generator_config)
+    answer = []
+    for decls in translation_units:
+        answer = reader._join_top_namespaces(answer, decls)
+    for ns in answer:
+        if isinstance(ns, declarations.namespace_t):
+            declarations_joiner.join_declarations(ns)
+    leaved_classes = reader._join_class_hierarchy(answer)
+    declarated_types = reader._project_reader_t__declarated_types(answer)
+    reader._relink_declarated_types(leaved_classes, declarated_types)
+    declarations_joiner.bind_aliases(declarations.make_flatten(answer))
+    return answer
+
+
+def can_join_translation_units() -> bool:
+    """
+    Check whether the installed pygccxml has the join steps join_translation_units calls.
+
+    Returns:
+        bool: True if headers read separately can be joined.
+    """
+    return all(hasattr(parser.project_reader_t, step) for step in join_steps)
+
+
+async def parse_async(filepaths: List[str], xml_generator_config: parser.xml_generator_configuration_t,
+                      jobs: int = None, timeout: Optional[float] = None, cache: Optional[ParseCache] = None,
+                      location_filter: Optional[LocationFilter] = None, prelude: Optional[Prelude] = None,
+                      progress: Optional[ProgressCallback] = None) -> list:
+    """
+    Parse C++ header files file by file, reading the output of every header as soon as the XML generator finished it,
+    while the generator compiles the next headers.
+
+    The XML generator runs as asyncio subprocesses, up to jobs at once. Reading the output of the headers into
+    declarations, usually the larger part of a parse, is bound by the interpreter, so the outputs are read one at a
+    time in a worker thread, in the order the headers finish. The declarations of the headers are then joined in the
+    order of filepaths, so the result is the same as the one of parse_parallel for the same arguments. If the installed
+    pygccxml does not have the join steps, see can_join_translation_units, the outputs are only reduced as they
+    finish, and pygccxml.parser.parse reads and joins them once all headers are compiled, with a warning.
+
+    Cancelling the task kills the running generator processes and drops the outputs not read yet.
+
+    Args:
+        filepaths (List[str]): The absolute header file paths to parse.
+        xml_generator_config (parser.xml_generator_configuration_t): The XML generator configuration.
+        jobs (int): The maximum number of concurrent generator processes. Defaults to the number of CPUs.
+        timeout (Optional[float]): The maximum number of seconds a single header may take. Headers that time out are
+         disregarded with a warning. Defaults to no limit.
+        cache (Optional[ParseCache]): The cache of per-header XML outputs, shared with parse_parallel. Defaults to
+         None.
+        location_filter (Optional[LocationFilter]): If given, the output of every header is reduced to the
+         declarations the filter keeps, see parse_parallel. Defaults to None.
+        prelude (Optional[Prelude]): If given, the prelude is compiled along with the headers, see parse_parallel.
+         Defaults to None.
+        progress (Optional[ProgressCallback]): Called whenever a header has been compiled and whenever it has been
+         read, the prelude included. Defaults to None.
+
+    Raises:
+        Exception: Raised when every header timed out.
+
+    Returns:
+        list: The parsed declarations, as returned by pygccxml.parser.parse.
+    """
+    if jobs is None or jobs < 1:
+        jobs = os.cpu_count() or 1
+    joinable = can_join_translation_units()
+    if not joinable:
+        warnings.warn('pygccxml %s does not have the join steps of the version in requirements.txt, so the headers are '
+                      'read once all of them are compiled' % pygccxml.__version__)
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(jobs)
+    total = len(filepaths) + (prelude is not None)
+    counts = {'compiled': 0, 'read': 0}
+
+    def report(stage: str, filepath: str):
+        counts[stage] += 1
+        if progress is not None:
+            progress(stage, filepath, counts[stage], total)
+
+    async def compile_header(filepath: str, xml_file: str, kind: str, job_timeout: Optional[float]):
+        # Reuse the cached XML of unchanged headers
+        key = None
+        if cache is not None:
+            key = await loop.run_in_executor(None, cache.key, [filepath], xml_generator_config, kind)
+            data = cache.load(key)
+            if data is not None:
+                with open(xml_file, 'wb') as f:
+                    f.write(data)
+                report('compiled', filepath)
+                return
+        async with slots:
+            await create_xml_file_async(filepath, xml_file, xml_generator_config, job_timeout)
+        if cache is not None:
+            with open(xml_file, 'rb') as f:
+                cache.store(key, f.read())
+        report('compiled', filepath)
+
+    with tempfile.TemporaryDirectory(prefix='py-cpp-bindings-') as temp_dir, \
+            ThreadPoolExecutor(max_workers=1) as reader:
+        xml_files = [os.path.join(temp_dir, '%d.xml' % i) for i in range(len(filepaths))]
+
+        async def read_prelude():
+            header = prelude.write_header(temp_dir if cache is None else cache.cache_dir)
+            xml_file = os.path.join(temp_dir, 'prelude.xml')
+            await compile_header(header, xml_file, 'prelude', None)
+            file_names = await loop.run_in_executor(reader, get_file_names, xml_file)
+            if joinable:
+                decls = await loop.run_in_executor(reader, read_translation_unit, xml_file, xml_generator_config, None,
+                                                   location_filter)
+            else:
+                decls = await loop.run_in_executor(reader, reduce_xml_file, xml_file, None, location_filter)
+            report('read', header)
+            return decls, file_names
+
+        # The prelude is started first, so that it is compiled along with the first headers
+        prelude_task = None if prelude is None else asyncio.ensure_future(read_prelude())
+
+        async def read_header(i: int) -> Union[list, str, None]:
+            try:
+                await compile_header(filepaths[i], xml_files[i], 'xml', timeout)
+            except ParseTimeoutError:
+                return None
+            # The declarations of the prelude are read once, from its own output, rather than once per header
+            file_names = None if prelude_task is None else (await prelude_task)[1]
+            if joinable:
+                decls = await loop.run_in_executor(reader, read_translation_unit, xml_files[i], xml_generator_config,
+                                                   file_names, location_filter)
+            else:
+                decls = await loop.run_in_executor(reader, reduce_xml_file, xml_files[i], file_names, location_filter)
+            report('read', filepaths[i])
+            return decls
+
+        tasks = ([] if prelude_task is None else [prelude_task]) + \
+            [asyncio.ensure_future(read_header(i)) for i in range(len(filepaths))]
+        try:
+            results = await asyncio.gather(*tasks)
+        except BaseException:
+            # Stop the other headers, killing their generator processes, before the temporary directory is removed
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        translation_units = results[len(tasks) - len(filepaths):]
+        check_timed_out(filepaths, [i for i, decls in enumerate(translation_units) if decls is None], timeout)
+        translation_units = [decls for decls in translation_units if decls is not None]
+        if prelude_task is not None:
+            translation_units.insert(0, results[0][0])
+        if not joinable:
+            # The translation units are the reduced outputs, read as parse_parallel reads them
+            file_configurations = [parser.create_gccxml_fc(xml_file) for xml_file in translation_units]
+            return await loop.run_in_executor(reader, parser.parse, file_configurations, xml_generator_config)
+        return await loop.run_in_executor(reader, join_translation_units, translation_units, xml_generator_config)
+
+
+def parse_pipelined(filepaths: List[str], xml_generator_config: parser.xml_generator_configuration_t,
+                    jobs: int = None, timeout: Optional[float] = None, cache: Optional[ParseCache] = None,
+                    location_filter: Optional[LocationFilter] = None, prelude: Optional[Prelude] = None,
+                    progress: Optional[ProgressCallback] = None) -> list:
+    """
+    Parse C++ header files with parse_async in a new event loop, see parse_async.
+
+    Returns:
+        list: The parsed declarations, as returned by pygccxml.parser.parse.
+    """
+    return asyncio.run(parse_async(filepaths, xml_generator_config, jobs=jobs, timeout=timeout, cache=cache,
+                                   location_filter=location_filter, prelude=prelude, progress=progress))
+
+
+def log_progress(stage: str, filepath: str, done: int, total: int):
+    """
+    Log the progress of a parse, see ProgressCallback.
+    """
+    logger.info('%s %d/%d: %s' % (stage.capitalize(), done, total, filepath))
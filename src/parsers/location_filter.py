@@ -0,0 +1,176 @@
+from typing import Optional, Dict, Set, List, Iterable, Iterator
+import os
+from pygccxml import declarations
+
+# Namespaces of the C++ standard library, pruned without looking at their declarations
+default_pruned_namespaces = frozenset({'std'})
+
+
+class LocationFilter:
+    def __init__(self, files: Iterable[str] = (), directories: Iterable[str] = (),
+                 pruned_namespaces: Iterable[str] = default_pruned_namespaces):
+        """
+        Initializes a filter selecting declarations by the file they are located in.
+
+        Declarations are kept if they are located in one of the given files or anywhere below one of the given
+        directories. Declarations without a location, e.g. compiler builtins, are disregarded. When reducing the XML
+        generator output, see filter_xml_file, the pruned namespaces and the namespaces reserved to the implementation
+        (starting with a double underscore) are dropped as a whole, so that system declarations are skipped before
+        they are read.
+
+        Args:
+            files: The paths of the files whose declarations are kept.
+            directories: The paths of the directories whose files' declarations are kept.
+            pruned_namespaces: The names of the namespaces that are dropped from the XML generator output.
+        """
+        self.files = {normalize_path(file) for file in files}
+        self.directories = [os.path.join(normalize_path(directory), '') for directory in directories]
+        self.pruned_namespaces = frozenset(pruned_namespaces)
+        self.allowed: Dict[str, bool] = {}
+
+    def allows_file(self, file_name: Optional[str]) -> bool:
+        """
+        Check whether the declarations of a file are kept.
+
+        Args:
+            file_name (Optional[str]): The file path, as reported by the declaration's location.
+
+        Returns:
+            bool: True if the file is one of the files or below one of the directories of the filter.
+        """
+        if not file_name:
+            return False
+        allowed = self.allowed.get(file_name)
+        if allowed is None:
+            path = normalize_path(file_name)
+            allowed = self.allowed[file_name] = path in self.files or \
+                any(path.startswith(directory) for directory in self.directories)
+        return allowed
+
+    def allows(self, decl: declarations.declaration_t) -> bool:
+        """
+        Check whether a declaration is kept.
+
+        Args:
+            decl (declarations.declaration_t): The declaration.
+
+        Returns:
+            bool: True if the declaration is located in a file kept by the filter.
+        """
+        location = getattr(decl, 'location', None)
+        return location is not None and self.allows_file(location.file_name)
+
+    def prunes(self, name: str) -> bool:
+        """
+        Check whether the namespaces of a name are skipped as a whole.
+
+        Args:
+            name (str): The namespace name.
+
+        Returns:
+            bool: True for the pruned names and the names reserved to the implementation.
+        """
+        return name in self.pruned_namespaces or name.startswith('__')
+
+    def get_required_names(self, namespace: declarations.namespace_t) -> Set[str]:
+        """
+        Get the names of the declarations of a namespace that the declarations kept by the filter refer to, directly
+        or not, but that are located in files the filter does not keep.
+
+        Args:
+            namespace (declarations.namespace_t): The namespace, usually the global namespace.
+
+        Returns:
+            Set[str]: The names of the referenced declarations.
+        """
+        pending: List[declarations.declaration_t] = []
+        others: Dict[str, List[declarations.declaration_t]] = {}
+        for decl in namespace.declarations:
+            if isinstance(decl, declarations.namespace_t):
+                continue
+            if self.allows(decl):
+                pending.append(decl)
+            elif decl.name:
+                others.setdefault(decl.name, []).append(decl)
+
+        required: Set[str] = set()
+        while pending:
+            for referenced in get_referenced_declarations(pending.pop()):
+                # Nested declarations are defined along with the top-level one
+                while referenced.parent is not None and not isinstance(referenced.parent, declarations.namespace_t):
+                    referenced = referenced.parent
+                name = referenced.name
+                if referenced.parent is not None and referenced.parent.parent is None and name in others and \
+                        name not in required:
+                    required.add(name)
+                    pending.extend(others[name])
+        return required
+
+    def declarations(self, namespace: declarations.namespace_t) -> Iterator[declarations.declaration_t]:
+        """
+        Walk the declarations of a namespace, in declaration order.
+
+        Nested namespaces are not walked: the generated code only names the declarations of the global namespace. The
+        declarations the kept ones refer to, directly or not, are kept as well wherever they are located, so that the
+        generated code defines the types it uses, e.g. the ones of a system header in an include directory.
+
+        Args:
+            namespace (declarations.namespace_t): The namespace to walk, usually the global namespace.
+
+        Yields:
+            declarations.declaration_t: The declarations kept by the filter.
+        """
+        required = self.get_required_names(namespace)
+        for decl in namespace.declarations:
+            if not isinstance(decl, declarations.namespace_t) and (self.allows(decl) or decl.name in required):
+                yield decl
+
+
+def get_referenced_declarations(decl: declarations.declaration_t) -> Iterator[declarations.declaration_t]:
+    """
+    Get the declarations a declaration refers to by type: the ones of a typedef's or a variable's type, of a function's
+    return and argument types, and of a class's bases and data members.
+
+    Args:
+        decl (declarations.declaration_t): The declaration.
+
+    Yields:
+        declarations.declaration_t: The referenced declarations.
+    """
+    types = []
+    pending = [decl]
+    while pending:
+        decl = pending.pop()
+        if isinstance(decl, (declarations.typedef_t, declarations.variable_t)):
+            types.append(decl.decl_type)
+        elif isinstance(decl, declarations.calldef_t):
+            types.extend(argument.decl_type for argument in decl.arguments)
+            if decl.return_type is not None:
+                types.append(decl.return_type)
+        elif isinstance(decl, declarations.class_t):
+            yield from (base.related_class for base in decl.bases)
+            pending.extend(member for member in decl.declarations
+                           if isinstance(member, (declarations.variable_t, declarations.class_t)))
+
+    while types:
+        type_ = types.pop()
+        if isinstance(type_, declarations.declarated_t):
+            yield type_.declaration
+        elif isinstance(type_, declarations.compound_t):
+            types.append(type_.base)
+        elif isinstance(type_, declarations.calldef_type_t):
+            types.extend(type_.arguments_types)
+            types.append(type_.return_type)
+
+
+def normalize_path(path: str) -> str:
+    """
+    Normalize a file path for comparisons.
+
+    Args:
+        path (str): The file path.
+
+    Returns:
+        str: The absolute, normalized path, case-folded where the file system is case-insensitive.
+    """
+    return os.path.normcase(os.path.abspath(path))
@@ -0,0 +1,285 @@
+from typing import Optional, List
+from concurrent.futures import ThreadPoolExecutor
+import os
+import signal
+import subprocess
+import tempfile
+import warnings
+import pygccxml
+from pygccxml import parser
+from src.parsers.location_filter import LocationFilter
+from src.parsers.prelude import Prelude
+from src.parsers.xml_filter import filter_xml_file, get_file_names, prune_xml_file
+from src.tools.parse_cache import ParseCache
+from src.tools.string_tools import join_iterable
+
+
+class ParseTimeoutError(RuntimeError):
+    # Raised when the XML generator does not finish a header within the allowed time
+    pass
+
+
+def get_command_line(filepath: str, xml_file: str,
+                     xml_generator_config: parser.xml_generator_configuration_t) -> Optional[str]:
+    """
+    Get the shell command line running the XML generator on a header file, as pygccxml runs it.
+
+    Args:
+        filepath (str): The absolute path of the header file.
+        xml_file (str): The path of the XML file to generate.
+        xml_generator_config (parser.xml_generator_configuration_t): The XML generator configuration.
+
+    Returns:
+        Optional[str]: The command line, or None if the installed pygccxml does not have the command line builder of
+         the version pinned in requirements.txt.
+    """
+    reader = parser.source_reader_t(xml_generator_config)
+    # pygccxml does not expose the command line builder, but it is the only way to match its exact invocation
+    create_command_line = getattr(reader, '_source_reader_t__create_command_line', None)
+    if create_command_line is None:
+        return None
+    return create_command_line(filepath, xml_file)
+
+
+def kill_process_tree(pid: int):
+    """
+    Kill an XML generator process started in its own session, along with any process it spawned.
+
+    Args:
+        pid (int): The process id.
+    """
+    if os.name == 'posix':
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+    else:
+        subprocess.call(['taskkill', '/F', '/T', '/PID', str(pid)], stdout=subprocess.DEVNULL,
+                        stderr=subprocess.DEVNULL)
+
+
+def check_xml_file(filepath: str, xml_file: str, xml_generator_config: parser.xml_generator_configuration_t,
+                   output: bytes, returncode: int):
+    """
+    Check that the XML generator succeeded on a header file.
+
+    Args:
+        filepath (str): The absolute path of the header file.
+        xml_file (str): The path of the generated XML file.
+        xml_generator_config (parser.xml_generator_configuration_t): The XML generator configuration.
+        output (bytes): The standard output of the generator.
+        returncode (int): The exit status of the generator.
+
+    Raises:
+        RuntimeError: Raised when the generator failed or did not produce the XML file.
+    """
+    msg = output.decode(errors='replace').strip()
+    generator = xml_generator_config.xml_generator.upper()
+    if not os.path.isfile(xml_file):
+        raise RuntimeError('Error occurred while running %s on %s: xml file does not exist' % (generator, filepath))
+    if (msg and not xml_generator_config.ignore_gccxml_output) or returncode:
+        raise RuntimeError('Error occurred while running %s on %s: %s status:%s' % (generator, filepath, msg,
+                                                                                  returncode))
+
+
+def create_xml_file(filepath: str, xml_file: str, xml_generator_config: parser.xml_generator_configuration_t,
+                    timeout: Optional[float] = None) -> str:
+    """
+    Run the XML generator on a single header file and write its XML output.
+
+    Unlike pygccxml's source_reader_t.create_xml_file, the generator process (and any process it spawned) is killed
+    once the timeout expires. If the installed pygccxml does not have the command line builder, see get_command_line,
+    pygccxml runs the generator, without a timeout.
+
+    Args:
+        filepath (str): The absolute path of the header file.
+        xml_file (str): The path of the XML file to generate.
+        xml_generator_config (parser.xml_generator_configuration_t): The XML generator configuration.
+        timeout (Optional[float]): The maximum number of seconds the generator may run. Defaults to no limit.
+
+    Raises:
+        ParseTimeoutError: Raised when the generator did not finish in time.
+        RuntimeError: Raised when the generator failed or did not produce the XML file.
+        Exception: Raised when a timeout is given but the installed pygccxml does not have the command line builder.
+
+    Returns:
+        str: The path of the generated XML file.
+    """
+    command_line = get_command_line(filepath, xml_file, xml_generator_config)
+    if command_line is None:
+        if timeout is not None:
+            raise Exception('Job timeouts need the XML generator command line builder of pygccxml, which pygccxml %s '
+                            'does not have, see requirements.txt' % pygccxml.__version__)
+        return parser.source_reader_t(xml_generator_config).create_xml_file(filepath, xml_file)
+    process = subprocess.Popen(args=command_line, shell=True, stdout=subprocess.PIPE,
+                               start_new_session=os.name == 'posix')
+    try:
+        output, _ = process.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        kill_process_tree(process.pid)
+        process.communicate()
+        raise ParseTimeoutError('Parsing %s took longer than %s seconds' % (filepath, timeout))
+    check_xml_file(filepath, xml_file, xml_generator_config, output, process.returncode)
+    return xml_file
+
+
+def create_prelude_xml_file(prelude: Prelude, xml_file: str,
+                            xml_generator_config: parser.xml_generator_configuration_t,
+                            cache: Optional[ParseCache] = None) -> str:
+    """
+    Write the XML generator output of a prelude, reusing the cached output of a previous run with the same XML
+    generator configuration.
+
+    Args:
+        prelude (Prelude): The prelude.
+        xml_file (str): The path of the XML file to generate.
+        xml_generator_config (parser.xml_generator_configuration_t): The XML generator configuration.
+        cache (Optional[ParseCache]): The cache of XML outputs. Defaults to None.
+
+    Returns:
+        str: The path of the generated XML file.
+    """
+    header = prelude.write_header(os.path.dirname(xml_file) if cache is None else cache.cache_dir)
+    key = None
+    if cache is not None:
+        key = cache.key([header], xml_generator_config, kind='prelude')
+        data = cache.load(key)
+        if data is not None:
+            with open(xml_file, 'wb') as f:
+                f.write(data)
+            return xml_file
+    create_xml_file(header, xml_file, xml_generator_config)
+    if cache is not None:
+        with open(xml_file, 'rb') as f:
+            cache.store(key, f.read())
+    return xml_file
+
+
+def create_xml_files(filepaths: List[str], xml_files: List[str],
+                     xml_generator_config: parser.xml_generator_configuration_t, jobs: int = None,
+                     timeout: Optional[float] = None, cache: Optional[ParseCache] = None) -> List[int]:
+    """
+    Write the XML generator output of every header file, running one XML generator process per header in a bounded
+    pool.
+
+    Args:
+        filepaths (List[str]): The absolute header file paths.
+        xml_files (List[str]): The paths of the XML files to write, one per header.
+        xml_generator_config (parser.xml_generator_configuration_t): The XML generator configuration.
+        jobs (int): The maximum number of concurrent generator processes. Defaults to the number of CPUs.
+        timeout (Optional[float]): The maximum number of seconds a single header may take. Defaults to no limit.
+        cache (Optional[ParseCache]): The cache of per-header XML outputs. Defaults to None.
+
+    Returns:
+        List[int]: The indices of the headers that timed out, whose XML files are not written.
+    """
+    if jobs is None or jobs < 1:
+        jobs = os.cpu_count() or 1
+
+    keys = [None] * len(filepaths)
+    pending = []
+
+    # Reuse the cached XML of unchanged headers
+    for i, filepath in enumerate(filepaths):
+        if cache is not None:
+            keys[i] = cache.key([filepath], xml_generator_config, kind='xml')
+            data = cache.load(keys[i])
+            if data is not None:
+                with open(xml_files[i], 'wb') as f:
+                    f.write(data)
+                continue
+        pending.append(i)
+
+    timed_out = []
+    with ThreadPoolExecutor(max_workers=min(jobs, max(1, len(pending)))) as executor:
+        futures = {i: executor.submit(create_xml_file, filepaths[i], xml_files[i], xml_generator_config, timeout)
+                   for i in pending}
+        for i, future in futures.items():
+            try:
+                future.result()
+            except ParseTimeoutError:
+                timed_out.append(i)
+                continue
+            if cache is not None:
+                with open(xml_files[i], 'rb') as f:
+                    cache.store(keys[i], f.read())
+    return timed_out
+
+
+def check_timed_out(filepaths: List[str], timed_out: List[int], timeout: Optional[float]):
+    """
+    Warn about the headers the XML generator timed out on, which are disregarded.
+
+    Args:
+        filepaths (List[str]): The absolute header file paths.
+        timed_out (List[int]): The indices of the headers that timed out.
+        timeout (Optional[float]): The maximum number of seconds a single header may take.
+
+    Raises:
+        Exception: Raised when every header timed out.
+    """
+    if not timed_out:
+        return
+    n = len(timed_out)
+    names = join_iterable([filepaths[i] for i in timed_out])
+    if n == len(filepaths):
+        raise Exception('Parsing timed out for all of the provided files (%s)' % names)
+    warnings.warn('Parsing the following file%s (%s) timed out after %s seconds and %s been disregarded' %
+                  ('s' if n > 1 else '', names, timeout, 'have' if n > 1 else 'has'))
+
+
+def parse_parallel(filepaths: List[str], xml_generator_config: parser.xml_generator_configuration_t,
+                   jobs: int = None, timeout: Optional[float] = None, cache: Optional[ParseCache] = None,
+                   location_filter: Optional[LocationFilter] = None, prelude: Optional[Prelude] = None) -> list:
+    """
+    Parse C++ header files file by file, running one XML generator process per header in a bounded pool.
+
+    The generated XML files are then read and joined by pygccxml in the order of filepaths, which yields the same
+    declaration tree as pygccxml.parser.parse in its default file by file mode. When a cache is given, the XML output
+    of every header is cached separately, so a change to one header only regenerates that header.
+
+    Args:
+        filepaths (List[str]): The absolute header file paths to parse.
+        xml_generator_config (parser.xml_generator_configuration_t): The XML generator configuration.
+        jobs (int): The maximum number of concurrent generator processes. Defaults to the number of CPUs.
+        timeout (Optional[float]): The maximum number of seconds a single header may take. Headers that time out are
+         disregarded with a warning. Defaults to no limit.
+        cache (Optional[ParseCache]): The cache of per-header XML outputs. Defaults to None.
+        location_filter (Optional[LocationFilter]): If given, the XML output of every header is streamed and reduced
+         to the declarations the filter keeps and the declarations they refer to before pygccxml reads it, so the
+         declarations of other files are never materialized. The cache holds the complete outputs. Defaults to None.
+        prelude (Optional[Prelude]): If given, the prelude is parsed first, and the output of every header is reduced
+         to the declarations that are not located in the prelude's files and the ones they refer to. Defaults to None.
+
+    Raises:
+        Exception: Raised when every header timed out.
+
+    Returns:
+        list: The parsed declarations, as returned by pygccxml.parser.parse.
+    """
+    with tempfile.TemporaryDirectory(prefix='py-cpp-bindings-') as temp_dir:
+        xml_files = [os.path.join(temp_dir, '%d.xml' % i) for i in range(len(filepaths))]
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            # The prelude is compiled while the headers are
+            prelude_future = None if prelude is None else executor.submit(
+                create_prelude_xml_file, prelude, os.path.join(temp_dir, 'prelude.xml'), xml_generator_config, cache)
+            timed_out = create_xml_files(filepaths, xml_files, xml_generator_config, jobs=jobs, timeout=timeout,
+                                         cache=cache)
+            prelude_xml_file = None if prelude_future is None else prelude_future.result()
+
+        check_timed_out(filepaths, timed_out, timeout)
+
+        xml_files = [xml_file for i, xml_file in enumerate(xml_files) if i not in timed_out]
+        if prelude_xml_file is not None:
+            # The declarations of the prelude are read once, from its own output, rather than once per header
+            file_names = get_file_names(prelude_xml_file)
+            for xml_file in xml_files:
+                prune_xml_file(xml_file, file_names)
+            xml_files.insert(0, prelude_xml_file)
+
+        if location_filter is not None:
+            for xml_file in xml_files:
+                filter_xml_file(xml_file, location_filter)
+
+        file_configurations = [parser.create_gccxml_fc(xml_file) for xml_file in xml_files]
+        return parser.parse(file_configurations, xml_generator_config)
@@ -0,0 +1,74 @@
+from typing import Optional, List, Iterable
+import hashlib
+import os
+from src.tools.file_tools import atomic_write
+
+
+class Prelude:
+    def __init__(self, includes: Iterable[str]):
+        """
+        Initializes a prelude, a set of includes common to the parsed headers, e.g. system headers.
+
+        The prelude is compiled by the XML generator on its own, once, and the declarations of its files are only read
+        from its output. The output of every header is reduced to the declarations of the header's other files and the
+        prelude declarations they refer to, so reading a header costs roughly its own content.
+
+        Args:
+            includes: The includes, as written in an include directive ('<string>' or '"config.h"'), or as a bare
+             name, which is included as a system header unless it names an existing file.
+        """
+        self.includes: List[str] = [get_include_spelling(include) for include in includes]
+
+    def source(self) -> str:
+        """
+        Get the source of the prelude header.
+
+        Returns:
+            str: The include directives.
+        """
+        return ''.join('#include %s\n' % include for include in self.includes)
+
+    def write_header(self, directory: str) -> str:
+        """
+        Write the prelude header to a directory, under a name derived from its content, so that the same prelude has
+        the same header path, and thus the same parse cache key, across runs.
+
+        Args:
+            directory (str): The directory.
+
+        Returns:
+            str: The path of the prelude header.
+        """
+        source = self.source().encode()
+        header = os.path.join(directory, 'prelude-%s.h' % hashlib.sha256(source).hexdigest()[:16])
+        try:
+            with open(header, 'rb') as f:
+                if f.read() == source:
+                    return header
+        except OSError:
+            pass
+        atomic_write(header, source)
+        return header
+
+    def __repr__(self):
+        return 'Prelude(%r)' % self.includes
+
+
+def get_include_spelling(include: str, directory: Optional[str] = None) -> str:
+    """
+    Get the spelling of an include in an include directive.
+
+    Args:
+        include (str): The include, as written in an include directive or as a bare name.
+        directory (Optional[str]): The directory a bare name is looked up in. Defaults to the working directory.
+
+    Returns:
+        str: The include within angle brackets or quotes. Existing files are included by absolute path.
+    """
+    include = include.strip()
+    if include.startswith('<') or include.startswith('"'):
+        return include
+    path = include if directory is None else os.path.join(directory, include)
+    if os.path.isfile(path):
+        return '"%s"' % os.path.abspath(path)
+    return '<%s>' % include
@@ -0,0 +1,327 @@
+from typing import Optional, Dict, List, Set, Tuple, Iterator
+import os
+import sys
+import re
+import xml.etree.ElementTree as ElementTree
+from xml.parsers import expat
+from xml.sax.saxutils import quoteattr
+from src.parsers.location_filter import LocationFilter
+
+# Attributes of the XML generator output referring to a single element by id
+reference_attributes = ('type', 'returns', 'context', 'basetype', 'comment')
+# Attributes referring to a space-separated list of elements, possibly prefixed with an access specifier
+reference_list_attributes = ('members', 'bases', 'throw')
+reference_names = frozenset(reference_attributes + reference_list_attributes)
+members_pattern = re.compile(r'\bmembers="([^"]*)"')
+
+
+def get_references(element: ElementTree.Element) -> Tuple[str, ...]:
+    """
+    Get the ids of the elements an element of the XML generator output refers to.
+
+    The references of the element's children, e.g. the types of function arguments and base classes, are included.
+
+    Args:
+        element (ElementTree.Element): The element, a direct child of the document root.
+
+    Returns:
+        Tuple[str, ...]: The referenced ids.
+    """
+    references = []
+    for node in [element] + list(element):
+        for attribute in reference_attributes:
+            value = node.get(attribute)
+            if value:
+                references.append(sys.intern(value))
+        for attribute in reference_list_attributes:
+            value = node.get(attribute)
+            if value:
+                references.extend(sys.intern(item.rpartition(':')[2]) for item in value.split())
+    return tuple(references)
+
+
+def iterate_elements(xml_file: str) -> Iterator[Tuple[ElementTree.Element, ElementTree.Element]]:
+    """
+    Stream the direct children of the document root of an XML file.
+
+    Every child is discarded once it has been yielded, so only one of them is in memory at a time.
+
+    Args:
+        xml_file (str): The path of the XML file.
+
+    Yields:
+        Tuple[ElementTree.Element, ElementTree.Element]: The document root, without children, and the child.
+    """
+    root = None
+    depth = 0
+    for event, element in ElementTree.iterparse(xml_file, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = element
+            depth += 1
+            continue
+        depth -= 1
+        if depth == 1:
+            yield root, element
+            root.clear()
+
+
+def get_kept_ids(xml_file: str, location_filter: LocationFilter) -> Set[str]:
+    """
+    Get the ids of the elements needed to read the declarations kept by a location filter.
+
+    The kept declarations are the ones LocationFilter.declarations yields for the global namespace. They are closed
+    over the elements they refer to, including the members of every kept class and the enclosing scopes of every kept
+    element.
+
+    Args:
+        xml_file (str): The path of the XML generator output.
+        location_filter (LocationFilter): The filter selecting the declarations.
+
+    Returns:
+        Set[str]: The ids of the elements to keep.
+    """
+    references: Dict[str, Tuple[str, ...]] = {}
+    namespaces: Dict[str, Tuple[str, str]] = {}
+    candidates: List[Tuple[str, str, str]] = []
+    files: Dict[str, str] = {}
+    for _, element in iterate_elements(xml_file):
+        id_ = element.get('id')
+        if id_ is None:
+            continue
+        id_ = sys.intern(id_)
+        if element.tag == 'File':
+            files[id_] = element.get('name')
+            continue
+        references[id_] = get_references(element)
+        context = element.get('context')
+        if element.tag == 'Namespace':
+            namespaces[id_] = (element.get('name', ''), context)
+        elif context is not None and element.get('file') is not None:
+            candidates.append((id_, context, element.get('file')))
+
+    # Namespaces whose located declarations are kept, i.e. the global namespace and the nested ones that are not pruned
+    walked: Dict[str, bool] = {}
+
+    def is_walked(namespace: str) -> bool:
+        chain = []
+        while namespace not in walked:
+            name, context = namespaces[namespace]
+            if context is None:
+                walked[namespace] = True
+            elif location_filter.prunes(name) or context not in namespaces:
+                walked[namespace] = False
+            else:
+                chain.append(namespace)
+                namespace = context
+        for nested in chain:
+            walked[nested] = walked[namespace]
+        return walked[namespace]
+
+    kept = {namespace for namespace, (_, context) in namespaces.items() if context is None}
+    pending = [id_ for id_, context, file in candidates
+               if context in namespaces and is_walked(context) and location_filter.allows_file(files.get(file))]
+    while pending:
+        id_ = pending.pop()
+        if id_ in kept:
+            continue
+        kept.add(id_)
+        pending.extend(reference for reference in references.get(id_, ()) if reference not in kept)
+    return kept
+
+
+def filter_xml_file(xml_file: str, location_filter: LocationFilter) -> str:
+    """
+    Reduce the output of the XML generator to the declarations kept by a location filter, in place.
+
+    The output is streamed twice: once to collect the references between its elements and once to write the kept
+    elements, so only the reference graph is held in memory. Reading the reduced output with pygccxml yields the same
+    declaration objects for the kept declarations as reading the full output, while the declarations of other
+    files, e.g. system headers, are never materialized.
+
+    Args:
+        xml_file (str): The path of the XML generator output.
+        location_filter (LocationFilter): The filter selecting the declarations.
+
+    Returns:
+        str: The path of the reduced XML file, which is xml_file.
+    """
+    return write_kept_elements(xml_file, get_kept_ids(xml_file, location_filter))
+
+
+def get_file_names(xml_file: str) -> Set[str]:
+    """
+    Get the files the declarations of an output of the XML generator are located in.
+
+    Args:
+        xml_file (str): The path of the XML generator output.
+
+    Returns:
+        Set[str]: The file names, as written by the XML generator.
+    """
+    return set(element.get('name') for _, element in iterate_elements(xml_file) if element.tag == 'File')
+
+
+def get_ids_outside(xml_file: str, file_names: Set[str]) -> Tuple[Set[str], List[List], int]:
+    """
+    Get the ids of the elements needed to read the declarations that are not located in some files.
+
+    The declarations located in other files are closed over the elements they refer to, including the members of
+    every kept class and the enclosing scopes of every kept element. All namespaces are kept. The output is scanned
+    with expat rather than built into elements, since only the attributes are needed.
+
+    Args:
+        xml_file (str): The path of the XML generator output.
+        file_names (Set[str]): The names of the files whose declarations are only kept if they are referred to.
+
+    Returns:
+        Tuple[Set[str], List[List], int]: The ids of the elements to keep, including the files and the elements
+         without id, the id and the first and last lines of every direct child of the document root, and the line of
+         the closing tag of the root.
+    """
+    # The attributes of every element and of its children, whose references are only read for the kept elements
+    elements: Dict[str, List[Dict[str, str]]] = {}
+    located: List[Tuple[str, str]] = []
+    files: Dict[str, str] = {}
+    kept: Set[Optional[str]] = set()
+    children: List[List] = []
+    end_line = 0
+    depth = 0
+    current = None
+
+    def start_element(tag: str, attributes: Dict[str, str]):
+        nonlocal depth, current
+        depth += 1
+        if depth == 2:
+            id_ = attributes.get('id')
+            children.append([id_, expat_parser.CurrentLineNumber, None])
+            if id_ is None or tag == 'File':
+                if tag == 'File':
+                    files[id_] = attributes.get('name')
+                kept.add(id_)
+                current = None
+                return
+            current = elements[id_] = [attributes]
+            if tag == 'Namespace':
+                kept.add(id_)
+            elif 'file' in attributes:
+                located.append((id_, attributes['file']))
+        elif depth > 2 and current is not None:
+            current.append(attributes)
+
+    def end_element(tag: str):
+        nonlocal depth, end_line
+        depth -= 1
+        if depth == 1:
+            children[-1][2] = expat_parser.CurrentLineNumber
+        elif depth == 0:
+            end_line = expat_parser.CurrentLineNumber
+
+    expat_parser = expat.ParserCreate()
+    expat_parser.StartElementHandler = start_element
+    expat_parser.EndElementHandler = end_element
+    with open(xml_file, 'rb') as f:
+        expat_parser.ParseFile(f)
+
+    # The files are listed after the declarations, so the locations are resolved once the whole output was read
+    pending = [id_ for id_, file in located if files.get(file) not in file_names]
+    while pending:
+        id_ = pending.pop()
+        if id_ in kept:
+            continue
+        kept.add(id_)
+        for attributes in elements.get(id_, ()):
+            for attribute in reference_names.intersection(attributes):
+                value = attributes[attribute]
+                if attribute in reference_list_attributes:
+                    pending.extend(item.rpartition(':')[2] for item in value.split())
+                elif value:
+                    pending.append(value)
+    return kept, children, end_line
+
+
+def prune_xml_file(xml_file: str, file_names: Set[str]) -> str:
+    """
+    Remove the declarations located in some files from the output of the XML generator, in place, unless the other
+    declarations refer to them.
+
+    The XML generator writes every direct child of the document root on lines of its own, so the kept elements are
+    copied line by line, only the members of the namespaces being rewritten.
+
+    Args:
+        xml_file (str): The path of the XML generator output.
+        file_names (Set[str]): The names of the files whose declarations are removed.
+
+    Returns:
+        str: The path of the pruned XML file, which is xml_file.
+    """
+    kept, children, end_line = get_ids_outside(xml_file, file_names)
+    lines = [first for _, first, _ in children] + [end_line]
+    if any(last >= following for (_, _, last), following in zip(children, lines[1:])):
+        # Elements sharing a line cannot be copied line by line
+        return write_kept_elements(xml_file, kept)
+
+    pruned_file = xml_file + '.pruned'
+    with open(xml_file, encoding='utf-8') as source, open(pruned_file, 'w', encoding='utf-8') as f:
+        number = 0
+        for line in source:
+            number += 1
+            if number == lines[0]:
+                break
+            f.write(line)
+        for (id_, _, _), following in zip(children, lines[1:]):
+            element = [line]
+            for line in source:
+                number += 1
+                if number == following:
+                    break
+                element.append(line)
+            if id_ in kept:
+                text = ''.join(element)
+                if text.lstrip().startswith('<Namespace '):
+                    text = members_pattern.sub(lambda match: 'members="%s"' % ' '.join(
+                        member for member in match.group(1).split() if member in kept), text, count=1)
+                f.write(text)
+        f.write(line)
+        for line in source:
+            f.write(line)
+    os.replace(pruned_file, xml_file)
+    return xml_file
+
+
+def write_kept_elements(xml_file: str, kept: Set[str]) -> str:
+    """
+    Rewrite an output of the XML generator with the kept elements only, in place.
+
+    The files are always kept, and the members of the kept elements are reduced to the kept ones.
+
+    Args:
+        xml_file (str): The path of the XML generator output.
+        kept (Set[str]): The ids of the elements to keep.
+
+    Returns:
+        str: The path of the rewritten XML file, which is xml_file.
+    """
+    filtered_file = xml_file + '.filtered'
+    with open(filtered_file, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0"?>\n')
+        started = False
+        for root, element in iterate_elements(xml_file):
+            if not started:
+                attributes = ''.join(' %s=%s' % (name, quoteattr(value)) for name, value in root.attrib.items())
+                f.write('<%s%s>\n' % (root.tag, attributes))
+                tag = root.tag
+                started = True
+            id_ = element.get('id')
+            if id_ is not None and id_ not in kept and element.tag != 'File':
+                continue
+            members = element.get('members')
+            if members is not None:
+                element.set('members', ' '.join(member for member in members.split() if member in kept))
+            element.tail = '\n'
+            f.write('  ')
+            f.write(ElementTree.tostring(element, encoding='unicode'))
+        if started:
+            f.write('</%s>\n' % tag)
+    os.replace(filtered_file, xml_file)
+    return xml_file
@@ -0,0 +1,141 @@
+from typing import Optional, Dict
+import os
+import stat
+import time
+import inspect
+import argparse
+import threading
+import socketserver
+from src.builders.profiler import Profiler
+from src.main import main, comment_styles
+from src.parsers.prelude import get_include_spelling
+from src.tools.generation_client import path_fields, send_message, receive_message
+from src.tools.log_tools import logger
+
+# Keyword arguments of main a request may set
+request_fields = [name for name in inspect.signature(main).parameters if name != 'profiler']
+
+
+def get_main_arguments(request: Dict[str, object]) -> Dict[str, object]:
+    """
+    Get the keyword arguments of main for a generation request.
+
+    Args:
+        request (Dict[str, object]): The request, holding keyword arguments of main by name and, optionally, the
+         working directory relative paths are resolved against ('cwd'). The comment style ('commented') is given by
+         its command line name.
+
+    Raises:
+        Exception: Raised when the request sets unknown arguments or misses the filenames or the output.
+
+    Returns:
+        Dict[str, object]: The keyword arguments.
+    """
+    unknown = sorted(name for name in request if name not in request_fields and name != 'cwd')
+    if unknown:
+        n = len(unknown)
+        raise Exception('Unknown request field%s (%s)' % ('s' if n > 1 else '', ', '.join(unknown)))
+    if not request.get('filenames') or not request.get('output'):
+        raise Exception('A request needs filenames and an output')
+    cwd = request.get('cwd') or os.getcwd()
+    arguments = {}
+    for name, value in request.items():
+        if name == 'cwd':
+            continue
+        if name in path_fields and value is not None:
+            value = [os.path.join(cwd, item) for item in value] if isinstance(value, list) else \
+                os.path.join(cwd, value)
+        elif name == 'prelude' and value is not None:
+            # Bare names of existing files are headers of the client rather than system headers
+            value = [get_include_spelling(item, cwd) for item in value]
+        arguments[name] = value
+    if 'commented' in arguments:
+        if arguments['commented'] not in comment_styles:
+            raise Exception('Unknown comment style %s, expected one of %s' %
+                            (arguments['commented'], ', '.join(comment_styles)))
+        arguments['commented'] = comment_styles[arguments['commented']]
+    return arguments
+
+
+class GenerationServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, max_concurrent: Optional[int] = None):
+        """
+        Initializes a long-lived generation server listening on a Unix socket.
+
+        Every connection may send several requests, one JSON object per line, each answered with one JSON object per
+        line. The generator discovery, the imported modules and the page cache of the parse cache stay warm between
+        requests, so a request only pays for the generation itself.
+
+        Args:
+            socket_path: The path of the Unix socket. A stale socket file left by a previous server is replaced.
+            max_concurrent: The maximum number of generations run at the same time. Further requests wait for a
+             free slot. Defaults to the number of CPUs.
+        """
+        self.socket_path = os.path.abspath(socket_path)
+        if os.path.exists(self.socket_path) and stat.S_ISSOCK(os.stat(self.socket_path).st_mode):
+            os.remove(self.socket_path)
+        self.slots = threading.BoundedSemaphore(max_concurrent if max_concurrent and max_concurrent > 0 else
+                                                os.cpu_count() or 1)
+        super().__init__(self.socket_path, GenerationRequestHandler)
+        # Only the owner may send requests, since they read and write files on the server's behalf
+        os.chmod(self.socket_path, 0o600)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+    def generate(self, request: Dict[str, object]) -> Dict[str, object]:
+        """
+        Serve a generation request.
+
+        Args:
+            request (Dict[str, object]): The request.
+
+        Returns:
+            Dict[str, object]: The response, see src.tools.generation_client.request_generation.
+        """
+        start = time.perf_counter()
+        with self.slots:
+            queued = time.perf_counter() - start
+            profiler = Profiler(trace_memory=False)
+            try:
+                main(profiler=profiler, **get_main_arguments(request))
+            except Exception as e:
+                logger.exception('Generation request failed')
+                return {'ok': False, 'error': str(e) or type(e).__name__, 'queued_seconds': queued}
+            return {'ok': True, 'queued_seconds': queued, 'seconds': time.perf_counter() - start - queued,
+                    'profile': profiler.report()}
+
+
+class GenerationRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        # Serve the requests of a connection until the client closes it
+        while True:
+            try:
+                request = receive_message(self.rfile)
+            except ValueError as e:
+                send_message(self.wfile, {'ok': False, 'error': 'Invalid request: %s' % e})
+                return
+            if request is None:
+                return
+            send_message(self.wfile, self.server.generate(request))
+
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(description="Serve code generation requests on a Unix socket.",
+                                        add_help=True)
+    argparser.add_argument("socket", help="Path of the Unix socket to listen on")
+    argparser.add_argument("-j", "--max-concurrent", type=int,
+                           help="Maximum number of generations run at the same time (defaults to the number of CPUs)")
+
+    args = argparser.parse_args()
+
+    with GenerationServer(args.socket, args.max_concurrent) as server:
+        print('Serving generation requests on %s' % server.socket_path)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,254 @@
+from typing import Optional, List, Dict, Set, Tuple, Iterator
+import gc
+import os
+import sys
+import tempfile
+import warnings
+from pygccxml import parser, declarations
+from src.builders.builder_registry import BuilderRegistry
+from src.builders.ctypes_builder import CtypesBuilder
+from src.builders.lowering import lower_builders
+from src.builders.profiler import Profiler
+from src.builders.type_cache import TypeCache
+from src.main import populated_types
+from src.parsers.location_filter import LocationFilter
+from src.parsers.parallel_parser import create_xml_files, create_prelude_xml_file, check_timed_out
+from src.parsers.prelude import Prelude
+from src.parsers.xml_filter import filter_xml_file, get_file_names, prune_xml_file
+from src.tools.log_tools import logger
+from src.tools.parse_cache import ParseCache
+from src.tools.string_tools import join_iterable
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Estimated memory of the declarations read from an XML generator output, per byte of output. The declarations take
+# 5 to 7 times the size of the output, the rest covers the allocator overhead
+declaration_bytes_per_xml_byte = 8
+
+
+class ShardLayout:
+    __slots__ = ('positions', 'walked', 'count')
+
+    def __init__(self):
+        """
+        Initializes the layout of the global namespace in the declaration tree of all headers, as far as the shards
+        parsed so far tell it: the position of the declarations it already holds, and the ones already walked.
+        """
+        self.positions: Dict[tuple, int] = {}
+        self.walked: Set[tuple] = set()
+        self.count = 0
+
+    def walk(self, namespace: declarations.namespace_t,
+             location_filter: LocationFilter) -> Iterator[Tuple[int, declarations.declaration_t]]:
+        """
+        Walk the declarations of a shard as LocationFilter.declarations does, skipping the declarations that joining
+        the shard with the previous shards would drop, and adding the others to the layout.
+
+        A declaration that only the declarations of a later shard refer to is walked in that shard, at the position of
+        its first declaration.
+
+        Args:
+            namespace (declarations.namespace_t): The global namespace of the shard.
+            location_filter (LocationFilter): The filter of the declarations to generate.
+
+        Yields:
+            Tuple[int, declarations.declaration_t]: The position of every declaration kept by the filter in the global
+             namespace of all headers, and the declaration.
+        """
+        required = location_filter.get_required_names(namespace)
+        for decl in namespace.declarations:
+            if isinstance(decl, declarations.namespace_t):
+                continue
+            kept = location_filter.allows(decl) or decl.name in required
+            key = get_join_key(decl)
+            if key is None:
+                self.count += 1
+                if kept:
+                    yield self.count - 1, decl
+                continue
+            position = self.positions.get(key)
+            if position is None:
+                position = self.positions[key] = self.count
+                self.count += 1
+            elif key in self.walked:
+                continue
+            if kept:
+                self.walked.add(key)
+                yield position, decl
+
+
+def get_join_key(decl: declarations.declaration_t) -> Optional[tuple]:
+    """
+    Get the key pygccxml joins the declarations of several headers by: of two declarations of a namespace with the
+    same key, only the first one is kept.
+
+    Args:
+        decl (declarations.declaration_t): The declaration.
+
+    Returns:
+        Optional[tuple]: The key, or None for the unnamed declarations, which are not joined by name.
+    """
+    if isinstance(decl, declarations.calldef_t):
+        # Overloads are kept, and redeclarations joined
+        return type(decl).__name__, decl.name, decl.function_type().decl_string
+    if not decl.name:
+        return None
+    return type(decl).__name__, decl.name
+
+
+def get_memory_usage() -> int:
+    """
+    Get the memory used by the process.
+
+    Returns:
+        int: The resident set size in bytes, or its peak where the current size is not available, or 0.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in KiB on Linux and in bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def get_shards(sizes: List[int], budget: int, shared_size: int = 0) -> List[range]:
+    """
+    Split headers into shards of consecutive headers, whose declarations fit in a memory budget.
+
+    Args:
+        sizes (List[int]): The size of the XML generator output of every header.
+        budget (int): The memory the declarations of a shard may take, in bytes.
+        shared_size (int): The size of an output read along with every shard, e.g. the one of the prelude.
+
+    Returns:
+        List[range]: The indices of the headers of every shard, in order. A header that does not fit in the budget on
+         its own gets a shard of its own.
+    """
+    shards = []
+    start = 0
+    used = shared_size * declaration_bytes_per_xml_byte
+    for i, size in enumerate(sizes):
+        used += size * declaration_bytes_per_xml_byte
+        if used > budget and i > start:
+            shards.append(range(start, i))
+            start = i
+            used = (shared_size + size) * declaration_bytes_per_xml_byte
+    if start < len(sizes):
+        shards.append(range(start, len(sizes)))
+    return shards
+
+
+def populate_shards(filepaths: List[str], xml_generator_config: parser.xml_generator_configuration_t,
+                    header_words: Set[str], memory_limit: int, location_filter: LocationFilter, jobs: int = 1,
+                    timeout: Optional[float] = None, cache: Optional[ParseCache] = None, stream_xml: bool = False,
+                    prelude: Optional[Prelude] = None, type_cache: Optional[TypeCache] = None,
+                    ctype_objects: bool = True, profiler: Optional[Profiler] = None) -> BuilderRegistry:
+    """
+    Populate the builders of C++ header files shard by shard, so that the declarations of only one shard of headers
+    are in memory at a time.
+
+    The XML generator output of every header is written to disk first. The headers are then split into shards of
+    consecutive headers whose declarations are estimated to fit in the memory left below the limit. The declarations
+    of every shard are read and populated into a registry shared by all shards, and the builders are lowered, so that
+    the declarations of the shard are released before the next shard is read. The builders of the previous shards
+    are the symbol table the builders of the next shards are resolved against, as in a single parse of all headers.
+
+    Declarations joined with a declaration of a previous shard are skipped, and the builders are ordered as the
+    declarations of all headers would be, so that the builders are the ones populate_builders returns for a single
+    parse of all headers.
+
+    Args:
+        filepaths (List[str]): The absolute header file paths to parse.
+        xml_generator_config (parser.xml_generator_configuration_t): The XML generator configuration.
+        header_words (Set[str]): The identifiers found in the source files.
+        memory_limit (int): The memory the process should stay below, in bytes.
+        location_filter (LocationFilter): The filter of the declarations to generate.
+        jobs (int, optional): The maximum number of concurrent XML generator processes. Defaults to 1.
+        timeout (Optional[float], optional): The maximum number of seconds a single header may take, see
+         parse_parallel. Defaults to no limit.
+        cache (Optional[ParseCache], optional): The cache of per-header XML outputs. Defaults to None.
+        stream_xml (bool, optional): Reduce the output of every header to the declarations the location filter
+         keeps, see parse_parallel. Defaults to False.
+        prelude (Optional[Prelude], optional): The prelude read along with every shard, see parse_parallel. Defaults
+         to None.
+        type_cache (Optional[TypeCache], optional): The type resolution cache to use. Defaults to a new cache.
+        ctype_objects (bool, optional): Whether to also build the live ctypes objects of the types. Defaults to True.
+        profiler (Optional[Profiler], optional): The profiler recording the time spent on every declaration. Defaults
+         to None.
+
+    Raises:
+        Exception: Raised when every header timed out, or when the process already uses more memory than the limit.
+
+    Returns:
+        BuilderRegistry: The lowered builders by declaration name, in declaration order.
+    """
+    if profiler is None:
+        profiler = Profiler(enabled=False)
+
+    with tempfile.TemporaryDirectory(prefix='py-cpp-bindings-') as temp_dir:
+        # The XML generator processes hold the memory of the compilation, not this process
+        xml_files = [os.path.join(temp_dir, '%d.xml' % i) for i in range(len(filepaths))]
+        timed_out = create_xml_files(filepaths, xml_files, xml_generator_config, jobs=jobs, timeout=timeout,
+                                     cache=cache)
+        check_timed_out(filepaths, timed_out, timeout)
+        filepaths = [filepath for i, filepath in enumerate(filepaths) if i not in timed_out]
+        xml_files = [xml_file for i, xml_file in enumerate(xml_files) if i not in timed_out]
+        prelude_xml_file = None
+        if prelude is not None:
+            prelude_xml_file = create_prelude_xml_file(prelude, os.path.join(temp_dir, 'prelude.xml'),
+                                                       xml_generator_config, cache=cache)
+            file_names = get_file_names(prelude_xml_file)
+            for xml_file in xml_files:
+                prune_xml_file(xml_file, file_names)
+        if stream_xml:
+            for xml_file in xml_files + ([] if prelude_xml_file is None else [prelude_xml_file]):
+                filter_xml_file(xml_file, location_filter)
+
+        memory_usage = get_memory_usage()
+        if memory_usage >= memory_limit:
+            raise Exception('The generator already uses %d MiB, more than the memory limit of %d MiB' %
+                            (memory_usage // 2 ** 20, memory_limit // 2 ** 20))
+        sizes = [os.path.getsize(xml_file) for xml_file in xml_files]
+        shared_size = 0 if prelude_xml_file is None else os.path.getsize(prelude_xml_file)
+        budget = memory_limit - memory_usage
+        shards = get_shards(sizes, budget, shared_size)
+        oversized = [filepaths[shard[0]] for shard in shards
+                     if len(shard) == 1 and (shared_size + sizes[shard[0]]) * declaration_bytes_per_xml_byte > budget]
+        if oversized:
+            n = len(oversized)
+            warnings.warn('The declarations of the following header%s (%s) may not fit in the memory limit' %
+                          ('s' if n > 1 else '', join_iterable(oversized)))
+        logger.info('Sharded generation: %d header%s in %d shard%s' %
+                    (len(filepaths), '' if len(filepaths) == 1 else 's', len(shards), '' if len(shards) == 1 else 's'))
+
+        builders = BuilderRegistry(type_cache=type_cache, ctype_objects=ctype_objects)
+        futures = set()
+        layout = ShardLayout()
+        positions: Dict[str, int] = {}
+        for shard in shards:
+            shard_xml_files = ([] if prelude_xml_file is None else [prelude_xml_file]) + [xml_files[i] for i in shard]
+            decls = parser.parse([parser.create_gccxml_fc(xml_file) for xml_file in shard_xml_files],
+                                 xml_generator_config)
+            for position, decl in layout.walk(decls[0], location_filter):
+                if decl.name in header_words and isinstance(decl, populated_types):
+                    positions[decl.name] = min(position, positions.get(decl.name, position))
+                    with profiler.timed_declaration('populate', decl.name):
+                        builders[decl.name] = CtypesBuilder.populate(decl, title=decl.name, builders=builders,
+                                                                     futures=futures)
+            # Release the declarations of the shard before the next one is read
+            lower_builders(builders.values())
+            del decls
+            gc.collect()
+        futures.clear()
+
+    # A name populated again by a later shard is ordered by its first declaration, as in a single parse
+    for name in sorted(builders, key=positions.__getitem__):
+        builders.move_to_end(name)
+    return builders
@@ -0,0 +1,214 @@
+from typing import Optional, List, Dict, Iterable
+from contextlib import contextmanager
+import hashlib
+import os
+import re
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+include_pattern = re.compile(r'^\s*#\s*include\s*([<"])([^>"]+)[>"]', re.MULTILINE)
+
+# Serializes the umask reads that have to set the umask, see get_umask
+umask_lock = threading.Lock()
+
+
+@contextmanager
+def file_lock(lock_path: str, shared: bool = False):
+    """
+    Acquire an inter-process lock on a lock file for the duration of a with-block.
+
+    Args:
+        lock_path (str): The path of the lock file. It is created if it does not exist.
+        shared (bool): Whether to take a shared (read) lock instead of an exclusive one. Shared locks are only
+         supported on POSIX systems; elsewhere an exclusive lock is taken.
+
+    Yields:
+        None
+    """
+    lock_dir = os.path.dirname(lock_path)
+    if lock_dir:
+        os.makedirs(lock_dir, exist_ok=True)
+    with open(lock_path, 'a+b') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def atomic_open(file_path: str, mode: str = 'w'):
+    """
+    Open a temporary file in the same directory as a file, to be renamed to it at the end of a with-block.
+
+    Readers of the file see either its previous or its complete new content. If the with-block raises, the file is
+    left untouched.
+
+    Args:
+        file_path (str): The destination file path.
+        mode (str): The mode to open the temporary file with, 'w' or 'wb'.
+
+    Yields:
+        The temporary file object.
+    """
+    directory = os.path.dirname(os.path.abspath(file_path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix=os.path.basename(file_path))
+    try:
+        with os.fdopen(fd, mode) as temp_file:
+            yield temp_file
+        # Temporary files are only accessible to the owner, while the file is expected to keep its permissions
+        os.chmod(temp_path, get_file_mode(file_path))
+        os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def get_file_mode(file_path: str) -> int:
+    """
+    Get the permission bits of a file, or the ones a new file would be created with.
+
+    Args:
+        file_path (str): The file path.
+
+    Returns:
+        int: The permission bits.
+    """
+    try:
+        return os.stat(file_path).st_mode & 0o777
+    except OSError:
+        return 0o666 & ~get_umask()
+
+
+def get_umask() -> int:
+    """
+    Get the file mode creation mask of the process without changing it where the system reports it (Linux 4.7 and
+    later).
+
+    Elsewhere, the mask can only be read by setting it. It is then briefly set to the restrictive 0o077 rather than
+    to 0, so that files created meanwhile by other threads are never more accessible than intended, and under a lock,
+    so that concurrent reads do not restore each other's temporary mask.
+
+    Returns:
+        int: The umask.
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('Umask:'):
+                    return int(line.split()[1], 8)
+    except (OSError, ValueError, IndexError):
+        pass
+    with umask_lock:
+        umask = os.umask(0o077)
+        os.umask(umask)
+    return umask
+
+
+def atomic_write(file_path: str, data: bytes):
+    """
+    Write data to a file atomically by writing a temporary file in the same directory and renaming it.
+
+    Args:
+        file_path (str): The destination file path.
+        data (bytes): The content to write.
+    """
+    with atomic_open(file_path, 'wb') as temp_file:
+        temp_file.write(data)
+
+
+def hash_file(file_path: str) -> str:
+    """
+    Compute the SHA-256 digest of a file's content.
+
+    Args:
+        file_path (str): The path to the file.
+
+    Returns:
+        str: The hexadecimal digest of the file content.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def resolve_include(name: str, quoted: bool, including_file: str, include_paths: Iterable[str]) -> Optional[str]:
+    """
+    Resolve an include directive to a file path the way a C++ preprocessor would.
+
+    Args:
+        name (str): The included name as written in the directive.
+        quoted (bool): Whether the directive used quotes (searched relative to the including file first).
+        including_file (str): The path of the file containing the directive.
+        include_paths (Iterable[str]): The additional include paths.
+
+    Returns:
+        Optional[str]: The absolute path of the included file, or None if it cannot be found.
+    """
+    search_paths = [os.path.dirname(including_file)] if quoted else []
+    search_paths.extend(include_paths)
+    for search_path in search_paths:
+        candidate = os.path.join(search_path, name)
+        if os.path.isfile(candidate):
+            return os.path.abspath(candidate)
+    return None
+
+
+def get_includes(file_paths: Iterable[str], include_paths: Optional[List[str]] = None) -> Dict[str, List[str]]:
+    """
+    Collect the transitive include graph of a set of files by scanning their include directives.
+
+    Includes that cannot be resolved against the including file's directory or the include paths (typically
+    system headers) are recorded by their spelling, enclosed in angle brackets or quotes.
+
+    Args:
+        file_paths (Iterable[str]): The files to start the scan from.
+        include_paths (Optional[List[str]]): The additional include paths.
+
+    Returns:
+        Dict[str, List[str]]: A mapping of every visited file to the resolved paths or spellings it includes.
+    """
+    if include_paths is None:
+        include_paths = []
+    graph = {}
+    pending = [os.path.abspath(file_path) for file_path in file_paths]
+    while pending:
+        file_path = pending.pop()
+        if file_path in graph:
+            continue
+        includes = []
+        graph[file_path] = includes
+        try:
+            with open(file_path, 'r', errors='replace') as file:
+                content = file.read()
+        except OSError:
+            continue
+        for match in include_pattern.finditer(content):
+            quoted = match.group(1) == '"'
+            resolved = resolve_include(match.group(2), quoted, file_path, include_paths)
+            if resolved is None:
+                includes.append(f'"{match.group(2)}"' if quoted else f'<{match.group(2)}>')
+            else:
+                includes.append(resolved)
+                if resolved not in graph:
+                    pending.append(resolved)
+    return graph
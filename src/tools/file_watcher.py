@@ -0,0 +1,109 @@
+from typing import Optional, List, Dict, Tuple, Callable, Iterable
+import os
+import time
+from src.tools.log_tools import logger
+
+FileState = Optional[Tuple[int, int]]
+
+
+class FileWatcher:
+    def __init__(self, get_paths: Callable[[], Iterable[str]], interval: float = 0.2):
+        """
+        Initializes a watcher detecting changes to a set of files by polling their modification times and sizes.
+
+        Polling works the same on every platform and file system, and stat calls on the few files of a generation
+        are cheap enough to run several times per second.
+
+        Args:
+            get_paths: Returns the paths of the files to watch. It is called again after every change, since the
+             set of files, e.g. the includes of a header, may change as well.
+            interval: The number of seconds between two polls.
+        """
+        self.get_paths = get_paths
+        self.interval = interval
+        self.states: Dict[str, FileState] = {}
+
+    def scan(self, paths: Optional[Iterable[str]] = None) -> Dict[str, FileState]:
+        """
+        Get the state of the watched files.
+
+        Args:
+            paths (Optional[Iterable[str]]): The files to scan. Defaults to the watched files.
+
+        Returns:
+            Dict[str, FileState]: The modification time in nanoseconds and the size of every file, or None for the
+             files that do not exist.
+        """
+        states = {}
+        for path in self.get_paths() if paths is None else paths:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                states[path] = None
+                continue
+            states[path] = (stat.st_mtime_ns, stat.st_size)
+        return states
+
+    def update(self):
+        """
+        Record the current state of the watched files, against which the next changes are detected.
+        """
+        self.states = self.scan()
+
+    def changed(self) -> List[str]:
+        """
+        Get the files that changed since the last update.
+
+        Returns:
+            List[str]: The paths of the changed, added or removed files.
+        """
+        states = self.scan(self.states)
+        return sorted(path for path, state in states.items() if state != self.states[path])
+
+    def wait(self) -> List[str]:
+        """
+        Block until some of the watched files changed since the last update and their content settled.
+
+        Editors often save a file in several writes, so the files are polled until two consecutive polls agree.
+
+        Returns:
+            List[str]: The paths of the changed files.
+        """
+        while True:
+            time.sleep(self.interval)
+            changed = self.changed()
+            if changed:
+                break
+        states = self.scan(self.states)
+        while True:
+            time.sleep(self.interval)
+            settled = self.scan(self.states)
+            if settled == states:
+                return self.changed()
+            states = settled
+
+
+def watch(run: Callable[[], None], watcher: FileWatcher):
+    """
+    Run a generation, then again whenever watched files change, until interrupted.
+
+    Errors of a run, e.g. a header that does not compile while being edited, are reported and the watcher keeps
+    running.
+
+    Args:
+        run (Callable[[], None]): Runs the generation.
+        watcher (FileWatcher): The watcher of the generation's input files.
+    """
+    changed = None
+    while True:
+        # The state is recorded before the run, so that changes made during the run trigger another run
+        watcher.update()
+        start = time.perf_counter()
+        try:
+            run()
+        except Exception:
+            logger.exception('Generation failed, waiting for changes')
+        else:
+            logger.info('Generated in %.2f seconds%s' % (time.perf_counter() - start, '' if changed is None else
+                                                          ' after changes to %s' % ', '.join(changed)))
+        changed = watcher.wait()
@@ -0,0 +1,76 @@
+from typing import Optional, Dict, BinaryIO
+import json
+import socket
+
+# Request fields holding file or directory paths, resolved against the working directory of the client
+path_fields = ('filenames', 'output', 'include_paths', 'source_files', 'cache_dir', 'allow_dirs', 'symbols_file')
+
+
+def send_message(stream: BinaryIO, message: Dict[str, object]):
+    """
+    Send a message of the generation server protocol, a JSON object on a single line.
+
+    Args:
+        stream (BinaryIO): The stream of the connection.
+        message (Dict[str, object]): The message.
+    """
+    stream.write(json.dumps(message).encode() + b'\n')
+    stream.flush()
+
+
+def receive_message(stream: BinaryIO) -> Optional[Dict[str, object]]:
+    """
+    Receive a message of the generation server protocol.
+
+    Args:
+        stream (BinaryIO): The stream of the connection.
+
+    Raises:
+        ValueError: Raised when the message is not a JSON object.
+
+    Returns:
+        Optional[Dict[str, object]]: The message, or None if the connection was closed.
+    """
+    line = stream.readline()
+    if not line:
+        return None
+    message = json.loads(line.decode())
+    if not isinstance(message, dict):
+        raise ValueError('Expected a JSON object, got %s' % type(message).__name__)
+    return message
+
+
+def request_generation(socket_path: str, request: Dict[str, object],
+                       timeout: Optional[float] = None) -> Optional[Dict[str, object]]:
+    """
+    Send a generation request to a generation server.
+
+    Args:
+        socket_path (str): The path of the Unix socket the server listens on.
+        request (Dict[str, object]): The keyword arguments of src.main.main, along with the working directory
+         ('cwd') relative paths are resolved against.
+        timeout (Optional[float]): The maximum number of seconds to wait for the response. Defaults to no limit.
+
+    Returns:
+        Optional[Dict[str, object]]: The response, or None if no server is listening on the socket, in which case
+         the caller is expected to generate in-process. A response has 'ok' set to True and carries the time
+         spent waiting for a free slot ('queued_seconds'), generating ('seconds') and the profiler report
+         ('profile'), or has 'ok' set to False and carries the error message ('error').
+    """
+    if not hasattr(socket, 'AF_UNIX'):
+        return None
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        try:
+            connection.connect(socket_path)
+        except (FileNotFoundError, ConnectionRefusedError):
+            return None
+        connection.settimeout(timeout)
+        with connection.makefile('rwb') as stream:
+            send_message(stream, request)
+            response = receive_message(stream)
+    finally:
+        connection.close()
+    if response is None:
+        return {'ok': False, 'error': 'The generation server closed the connection'}
+    return response
@@ -0,0 +1,139 @@
+from typing import Dict, Set, Tuple, Iterable
+from concurrent.futures import ProcessPoolExecutor
+import os
+import pickle
+from src.tools.file_tools import file_lock, atomic_write
+from src.tools.string_tools import get_words
+
+index_format_version = 1
+
+
+def scan_file(file_path: str, skip_comments: bool) -> Tuple[str, int, int, frozenset]:
+    """
+    Extract the identifiers of a file along with the file's modification time and size.
+
+    Args:
+        file_path (str): The path to the file.
+        skip_comments (bool): Whether to disregard identifiers in comments and string literals.
+
+    Returns:
+        Tuple[str, int, int, frozenset]: The file path, its modification time in nanoseconds, its size and its
+         identifiers.
+    """
+    stat = os.stat(file_path)
+    return file_path, stat.st_mtime_ns, stat.st_size, frozenset(get_words(file_path, skip_comments=skip_comments))
+
+
+class IdentifierIndex:
+    def __init__(self, cache_path: str = None, skip_comments: bool = False):
+        """
+        Initializes an index of the identifiers found in source files.
+
+        The identifiers of every file are cached, keyed by the file's modification time and size, so unchanged files
+        are not read again. If cache_path is given, the cache is also persisted across runs; concurrent processes
+        sharing the file are serialized through a lock file.
+
+        Args:
+            cache_path: The path of the persistent cache file. Defaults to an in-memory cache only.
+            skip_comments: Whether to disregard identifiers in comments and string or character literals.
+        """
+        self.cache_path = cache_path
+        self.skip_comments = skip_comments
+        self.entries: Dict[str, Tuple[int, int, frozenset]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.modified = False
+        if cache_path is not None:
+            self.entries.update(self.load())
+
+    def load(self) -> Dict[str, Tuple[int, int, frozenset]]:
+        """
+        Load the persistent cache.
+
+        Returns:
+            Dict[str, Tuple[int, int, frozenset]]: The cached identifiers by file path, or an empty dictionary if the
+             cache does not exist or cannot be read.
+        """
+        with file_lock(self.cache_path + '.lock', shared=True):
+            return self.read().get(self.skip_comments, {})
+
+    def read(self) -> Dict[bool, Dict[str, Tuple[int, int, frozenset]]]:
+        """
+        Read the persistent cache file without locking it.
+
+        Returns:
+            Dict[bool, Dict[str, Tuple[int, int, frozenset]]]: The cached identifiers by file path, for both values of
+             skip_comments.
+        """
+        try:
+            with open(self.cache_path, 'rb') as f:
+                data = pickle.load(f)
+        except (OSError, EOFError, ValueError, pickle.PickleError):
+            return {}
+        if not isinstance(data, dict) or data.get('version') != index_format_version:
+            return {}
+        return data['entries']
+
+    def save(self):
+        """
+        Merge the new entries into the persistent cache and drop the entries of files that no longer exist.
+        """
+        if self.cache_path is None or not self.modified:
+            return
+        with file_lock(self.cache_path + '.lock'):
+            data = self.read()
+            entries = data.get(self.skip_comments, {})
+            entries.update(self.entries)
+            data[self.skip_comments] = {path: entry for path, entry in entries.items() if os.path.exists(path)}
+            atomic_write(self.cache_path, pickle.dumps({'version': index_format_version, 'entries': data},
+                                                       pickle.HIGHEST_PROTOCOL))
+        self.modified = False
+
+    def identifiers(self, file_paths: Iterable[str], jobs: int = 1) -> Set[str]:
+        """
+        Get the union of the identifiers found in a set of files.
+
+        Args:
+            file_paths (Iterable[str]): The paths to the files.
+            jobs (int): The number of processes scanning changed files in parallel. A value below 1 uses all CPUs.
+
+        Returns:
+            Set[str]: The identifiers found in the files.
+        """
+        words = set()
+        pending = []
+        for file_path in file_paths:
+            entry = self.entries.get(file_path)
+            stat = os.stat(file_path)
+            if entry is not None and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+                self.hits += 1
+                words.update(entry[2])
+            else:
+                self.misses += 1
+                pending.append(file_path)
+
+        if jobs < 1:
+            jobs = os.cpu_count() or 1
+        if jobs > 1 and len(pending) > 1:
+            with ProcessPoolExecutor(max_workers=min(jobs, len(pending))) as executor:
+                results = list(executor.map(scan_file, pending, [self.skip_comments] * len(pending),
+                                            chunksize=max(1, len(pending) // (4 * jobs))))
+        else:
+            results = [scan_file(file_path, self.skip_comments) for file_path in pending]
+
+        for file_path, mtime, size, file_words in results:
+            self.entries[file_path] = (mtime, size, file_words)
+            words.update(file_words)
+        if results:
+            self.modified = True
+        return words
+
+    def report(self) -> str:
+        """
+        Get a human-readable summary of the cache hits and misses.
+
+        Returns:
+            str: The summary line.
+        """
+        return f'Identifier index: {self.hits} cached file{"" if self.hits == 1 else "s"}, ' \
+               f'{self.misses} scanned file{"" if self.misses == 1 else "s"}'
@@ -0,0 +1,25 @@
+import logging
+
+
+def create_logger(name: str) -> logging.Logger:
+    """
+    Create a logger writing to the standard error stream, in the format of the pygccxml loggers.
+
+    Args:
+        name (str): The logger name.
+
+    Returns:
+        logging.Logger: The logger, reporting INFO messages and above.
+    """
+    logger = logging.getLogger(name)
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(levelname)s %(message)s'))
+        logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    return logger
+
+
+# Reports of the generation: cache hit rates, selected symbols, progress, ... Kept off the standard output, which the
+# server, batch and profiling modes write to
+logger = create_logger('py-cpp-bindings')
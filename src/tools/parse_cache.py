@@ -0,0 +1,229 @@
+from typing import Optional, List, Iterable
+import functools
+import hashlib
+import os
+import pickle
+import shutil
+import subprocess
+import pygccxml
+from pygccxml import parser
+from src.tools.file_tools import file_lock, atomic_write, get_includes
+
+default_cache_dir = os.path.join(os.path.expanduser('~'), '.cache', 'py-cpp-bindings')
+default_max_size = 512 * 1024 * 1024
+cache_format_version = 1
+
+
+class ParseCache:
+    def __init__(self, cache_dir: str = None, max_size: int = default_max_size):
+        """
+        Initializes a content-addressed, size-bounded on-disk cache for parsed C++ declarations.
+
+        Entries are stored as one file per key. Reads refresh an entry's modification time so that eviction can drop
+        the least recently used entries once the total size exceeds max_size. All writes and evictions are serialized
+        through a lock file, which allows several processes to share one cache directory.
+
+        Args:
+            cache_dir: The cache directory. Defaults to ~/.cache/py-cpp-bindings.
+            max_size: The maximum total size of the cache entries in bytes.
+        """
+        if cache_dir is None:
+            cache_dir = default_cache_dir
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_size = max_size
+        self.lock_path = os.path.join(self.cache_dir, '.lock')
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, filepaths: Iterable[str], xml_generator_config: parser.xml_generator_configuration_t,
+            kind: str = 'declarations') -> str:
+        """
+        Compute the cache key of a parse.
+
+        The key covers the content of the headers and of every header they transitively include, the include paths,
+        the XML generator path, name and version, the compiler version, and the remaining compiler settings of the
+        configuration. The system headers the include paths do not resolve are covered by the compiler version.
+
+        Args:
+            filepaths (Iterable[str]): The header file paths to be parsed.
+            xml_generator_config (parser.xml_generator_configuration_t): The XML generator configuration.
+            kind (str): The kind of payload stored under the key.
+
+        Returns:
+            str: The hexadecimal cache key.
+        """
+        return get_parse_key(filepaths, xml_generator_config, kind=kind)
+
+    def entry_path(self, key: str) -> str:
+        """
+        Get the file path of a cache entry.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            str: The path of the entry file.
+        """
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def load(self, key: str) -> Optional[bytes]:
+        """
+        Load the payload stored under a key and mark the entry as recently used.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            Optional[bytes]: The stored payload, or None on a cache miss.
+        """
+        path = self.entry_path(key)
+        try:
+            with open(path, 'rb') as file:
+                data = file.read()
+            os.utime(path)
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return data
+
+    def store(self, key: str, data: bytes):
+        """
+        Store a payload under a key and evict least recently used entries if the cache grew too large.
+
+        Args:
+            key (str): The cache key.
+            data (bytes): The payload to store.
+        """
+        with file_lock(self.lock_path):
+            atomic_write(self.entry_path(key), data)
+            self.evict()
+
+    def evict(self):
+        """
+        Remove the least recently used entries until the total cache size fits in max_size.
+
+        The caller is expected to hold the cache lock. Files at the top level of the cache directory are not
+        entries and are left alone.
+        """
+        entries = []
+        total_size = 0
+        for directory, _, filenames in os.walk(self.cache_dir):
+            if directory == self.cache_dir:
+                continue
+            for filename in filenames:
+                if filename.startswith('.'):
+                    continue
+                path = os.path.join(directory, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total_size += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total_size -= size
+
+    def parse(self, filepaths: List[str], xml_generator_config: parser.xml_generator_configuration_t) -> list:
+        """
+        Parse C++ header files, reusing the cached declarations when the inputs did not change.
+
+        Args:
+            filepaths (List[str]): The header file paths to parse.
+            xml_generator_config (parser.xml_generator_configuration_t): The XML generator configuration.
+
+        Returns:
+            list: The parsed declarations, as returned by pygccxml.parser.parse.
+        """
+        key = self.key(filepaths, xml_generator_config)
+        data = self.load(key)
+        if data is not None:
+            try:
+                return pickle.loads(data)
+            except Exception:
+                # A corrupted or incompatible entry is handled as a miss
+                self.hits -= 1
+                self.misses += 1
+        decls = parser.parse(filepaths, xml_generator_config)
+        self.store(key, pickle.dumps(decls, pickle.HIGHEST_PROTOCOL))
+        return decls
+
+    def report(self) -> str:
+        """
+        Get a human-readable summary of the cache hits and misses.
+
+        Returns:
+            str: The summary line.
+        """
+        return f'Parse cache ({self.cache_dir}): {self.hits} hit{"" if self.hits == 1 else "s"}, ' \
+               f'{self.misses} miss{"" if self.misses == 1 else "es"}'
+
+
+def get_parse_key(filepaths: Iterable[str], xml_generator_config: parser.xml_generator_configuration_t,
+                  kind: str = 'declarations') -> str:
+    """
+    Compute the key of a parse, see ParseCache.key.
+
+    Args:
+        filepaths (Iterable[str]): The header file paths to be parsed.
+        xml_generator_config (parser.xml_generator_configuration_t): The XML generator configuration.
+        kind (str): The kind of payload stored under the key.
+
+    Returns:
+        str: The hexadecimal key.
+    """
+    filepaths = [os.path.abspath(filepath) for filepath in filepaths]
+    include_paths = list(xml_generator_config.include_paths)
+    digest = hashlib.sha256()
+    for item in [kind, cache_format_version, pygccxml.__version__,
+                 xml_generator_config.xml_generator_path, xml_generator_config.xml_generator,
+                 xml_generator_config.compiler_path, xml_generator_config.cflags, xml_generator_config.ccflags,
+                 include_paths, list(xml_generator_config.define_symbols),
+                 list(xml_generator_config.undefine_symbols), filepaths,
+                 get_executable_version(xml_generator_config.xml_generator_path),
+                 get_executable_version(xml_generator_config.compiler_path)]:
+        digest.update(repr(item).encode())
+        digest.update(b'\0')
+    graph = get_includes(filepaths, include_paths)
+    for filepath in sorted(graph):
+        digest.update(filepath.encode())
+        digest.update(b'\0')
+        try:
+            with open(filepath, 'rb') as file:
+                digest.update(hashlib.sha256(file.read()).digest())
+        except OSError:
+            digest.update(b'missing')
+        digest.update(repr(graph[filepath]).encode())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def get_executable_version(path: Optional[str]) -> Optional[str]:
+    """
+    Identify the version of an executable, e.g. of the XML generator or of the compiler whose system headers it reads.
+
+    Args:
+        path (Optional[str]): The executable path, or its name to be looked up in the PATH.
+
+    Returns:
+        Optional[str]: The resolved path, the size and modification time of the executable and the output of its
+         --version option, or None if the executable is not found.
+    """
+    resolved = shutil.which(path) if path else None
+    if resolved is None:
+        return None
+    stat = os.stat(resolved)
+    try:
+        output = subprocess.run([resolved, '--version'], stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                stdin=subprocess.DEVNULL, timeout=30).stdout.decode(errors='replace')
+    except (OSError, subprocess.SubprocessError):
+        output = ''
+    return f'{os.path.realpath(resolved)}:{stat.st_size}:{stat.st_mtime_ns}:{output}'
@@ -77,15 +77,16 @@ def add_prefix_to_lines(input_string: str, prefix: str) -> Optional[str]:
     lines = []
     i = 0
     skip_first = False
+    space = extract_leading_whitespace(prefix)
+    continuation = space + ' ' * (len(prefix) - len(space))
     for line in input_string.split('\n'):
         if line.strip().startswith('#') and i == 0:
-            lines.append(extract_leading_whitespace(prefix) + line)
+            lines.append(space + line)
             skip_first = True
         elif i == 0 or (i == 1 and skip_first):
             lines.append(prefix + line)
         else:
-            space = extract_leading_whitespace(prefix)
-            lines.append(space + ' ' * (len(prefix) - len(space)) + line)
+            lines.append(continuation + line)
         i += 1
     return '\n'.join(lines)
 
@@ -165,6 +166,11 @@ def has_whitespace(input_string: str) -> bool:
     return any(char.isspace() for char in input_string)
 
 
+const_pattern = re.compile(r'\bconst\b\s*')
+declarator_space_pattern = re.compile(r'\s+([*&]\s*)')
+repeated_reference_pattern = re.compile(r'&{2,}')
+
+
 def clean_type(type_str: Optional[str]) -> Optional[str]:
     """
     Clean and normalize a C++ type string by removing unnecessary spaces, const keywords, and redundant symbols.
@@ -179,16 +185,16 @@ def clean_type(type_str: Optional[str]) -> Optional[str]:
         return type_str
 
     # Remove '::' from the beginning of the type string
-    cleaned_type = re.sub(r'^::', '', type_str)
+    cleaned_type = remove_prefix(type_str, '::')
 
     # Remove const keyword if it's a standalone word
-    cleaned_type = re.sub(r'\bconst\b\s*', '', cleaned_type)
+    cleaned_type = const_pattern.sub('', cleaned_type)
 
     # Remove any spaces around '*' and '&'
-    cleaned_type = re.sub(r'\s+([*&]\s*)', r'\1', cleaned_type)
+    cleaned_type = declarator_space_pattern.sub(r'\1', cleaned_type)
 
     # Remove any repeated '&' characters
-    cleaned_type = re.sub(r'&{2,}', ' ', cleaned_type)
+    cleaned_type = repeated_reference_pattern.sub(' ', cleaned_type)
 
     # Remove any leading and trailing white spaces
     cleaned_type = cleaned_type.strip()
@@ -213,26 +219,41 @@ def clean_word(word: str) -> List[str]:
     return cleaned_word
 
 
-def get_words(file_path: str) -> Set[str]:
+word_pattern = re.compile(r'\w+')
+code_word_pattern = re.compile(r'//[^\n]*|/\*.*?(?:\*/|$)|"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\'|(\w+)', re.DOTALL)
+
+
+def get_words(file_path: str, skip_comments: bool = False) -> Set[str]:
     """
     Extracts unique words from a text file, considering valid identifiers.
 
     Args:
         file_path (str): The path to the text file.
+        skip_comments (bool): Whether to disregard words in C/C++ comments and string or character literals.
 
     Returns:
         set: A set containing unique words found in the file.
     """
-    unique_words = set()
-    with open(file_path, 'r') as file:
-        for line in file:
-            words = line.split()
-            for word in words:
-                cleaned_word = clean_word(word)
-                for each_word in cleaned_word:
-                    if each_word and each_word.isidentifier():
-                        unique_words.add(each_word)
-    return unique_words
+    with open(file_path, 'r', errors='replace') as file:
+        return get_identifiers(file.read(), skip_comments=skip_comments)
+
+
+def get_identifiers(text: str, skip_comments: bool = False) -> Set[str]:
+    """
+    Extracts the unique valid identifiers from a text in a single pass.
+
+    Args:
+        text (str): The text to scan.
+        skip_comments (bool): Whether to disregard identifiers in C/C++ comments and string or character literals.
+
+    Returns:
+        set: A set containing the unique identifiers found in the text.
+    """
+    if skip_comments:
+        words = set(match for match in code_word_pattern.findall(text) if match)
+    else:
+        words = set(word_pattern.findall(text))
+    return {word for word in words if word.isidentifier()}
 
 
 def join_iterable(iterable: Iterable, separator: str = ', ', end_separator: str = ' and ') -> str:
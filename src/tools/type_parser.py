@@ -0,0 +1,244 @@
+from typing import Optional, List, Tuple
+import re
+import functools
+import weakref
+
+# Keywords that make up the spelling of a fundamental C++ type
+fundamental_keywords = {'void', 'bool', 'char', 'wchar_t', 'char8_t', 'char16_t', 'char32_t', 'short', 'int', 'long',
+                        'float', 'double', 'signed', 'unsigned', '__int128'}
+cv_keywords = {'const', 'volatile'}
+elaborated_keywords = {'struct', 'class', 'union', 'enum', 'typename'}
+
+token_pattern = re.compile(r'\s*(?:(::)|([A-Za-z_]\w*)|(&&|[*&\[\]<>,])|(\d+)|(\S))')
+
+
+class TypeNode:
+    __slots__ = ('base', 'const', 'volatile', 'pointer_depth', 'reference', 'extents', 'spelling', '__weakref__')
+    # Nodes are only interned while in use, so that long-lived processes do not keep the types of every header
+    interned: "weakref.WeakValueDictionary[tuple, TypeNode]" = weakref.WeakValueDictionary()
+
+    def __new__(cls, base: str, const: bool = False, volatile: bool = False, pointer_depth: int = 0,
+                reference: str = '', extents: Tuple[Optional[int], ...] = ()):
+        """
+        Get the interned, immutable node of a C++ type.
+
+        Equal types are represented by the same node, so nodes can be compared by identity and used as dictionary
+        keys.
+
+        Args:
+            base: The base type name, e.g. 'unsigned long' or 'std::vector<int>'.
+            const: Whether the base type is const-qualified.
+            volatile: Whether the base type is volatile-qualified.
+            pointer_depth: The number of pointers to the base type.
+            reference: The reference kind: '' for none, '&' for an lvalue and '&&' for an rvalue reference.
+            extents: The array extents, None standing for an unknown extent.
+        """
+        key = (base, const, volatile, pointer_depth, reference, tuple(extents))
+        node = cls.interned.get(key)
+        if node is None:
+            node = object.__new__(cls)
+            for slot, value in zip(cls.__slots__, key):
+                object.__setattr__(node, slot, value)
+            object.__setattr__(node, 'spelling', ('const ' if const else '') + ('volatile ' if volatile else '') +
+                               base + '*' * pointer_depth + reference +
+                               ''.join(f'[{"" if extent is None else extent}]' for extent in extents))
+            node = cls.interned.setdefault(key, node)
+        return node
+
+    def __setattr__(self, name, value):
+        raise AttributeError('TypeNode is immutable')
+
+    def __reduce__(self):
+        # Unpickled nodes are interned again
+        return self.__class__, (self.base, self.const, self.volatile, self.pointer_depth, self.reference,
+                                self.extents)
+
+    def __repr__(self):
+        return f'TypeNode({self.spelling!r})'
+
+    def unqualified(self) -> "TypeNode":
+        """
+        Get the node of the same type without cv-qualifiers.
+
+        Returns:
+            TypeNode: The unqualified node.
+        """
+        if not self.const and not self.volatile:
+            return self
+        return TypeNode(self.base, pointer_depth=self.pointer_depth, reference=self.reference, extents=self.extents)
+
+
+def tokenize_type(type_str: str) -> Optional[List[Tuple[str, str, int]]]:
+    """
+    Split the spelling of a C++ type into tokens.
+
+    Args:
+        type_str (str): The C++ type string.
+
+    Returns:
+        Optional[List[Tuple[str, str, int]]]: The kind ('scope', 'word', 'symbol' or 'number'), text and end offset of
+         every token, or None if the spelling contains characters that are not part of a simple type, e.g. the
+         parentheses of a function type.
+    """
+    tokens = []
+    position = 0
+    length = len(type_str.rstrip())
+    while position < length:
+        match = token_pattern.match(type_str, position)
+        if match is None or match.group(5) is not None:
+            return None
+        position = match.end()
+        if match.group(1) is not None:
+            tokens.append(('scope', '::', position))
+        elif match.group(2) is not None:
+            tokens.append(('word', match.group(2), position))
+        elif match.group(3) is not None:
+            tokens.append(('symbol', match.group(3), position))
+        else:
+            tokens.append(('number', match.group(4), position))
+    return tokens
+
+
+def canonical_fundamental(words: List[str]) -> str:
+    """
+    Get the canonical spelling of a fundamental C++ type, independent of the order of its specifiers.
+
+    For instance, 'long unsigned int', 'unsigned long int' and 'unsigned long' are all spelled 'unsigned long'.
+
+    Args:
+        words (List[str]): The type specifier keywords.
+
+    Returns:
+        str: The canonical spelling, or the words joined by spaces if they do not form a valid type.
+    """
+    longs = words.count('long')
+    kinds = [word for word in words if word not in ('signed', 'unsigned', 'short', 'long')]
+    if len(kinds) > 1 or longs > 2 or ('short' in words and longs) or ('signed' in words and 'unsigned' in words):
+        return ' '.join(words)
+    kind = kinds[0] if kinds else 'int'
+    if kind == 'int':
+        if 'short' in words:
+            kind = 'short'
+        elif longs:
+            kind = ' '.join(['long'] * longs)
+    elif kind == 'double' and longs == 1:
+        kind = 'long double'
+    elif longs or 'short' in words:
+        return ' '.join(words)
+    if 'unsigned' in words:
+        if kind in ('float', 'double', 'long double', 'bool', 'void'):
+            return ' '.join(words)
+        return 'unsigned ' + kind
+    if 'signed' in words and kind == 'char':
+        return 'signed char'
+    return kind
+
+
+# Number of type spellings whose parsed node is kept, well above the distinct types of large headers
+parsed_types_max_size = 1 << 16
+
+
+@functools.lru_cache(maxsize=parsed_types_max_size)
+def parse_type(type_str: str) -> TypeNode:
+    """
+    Parse the spelling of a C++ type into its interned node.
+
+    The spelling consists of cv-qualifiers and a base type name, followed by pointers, an optional reference and
+    array extents. The base name may be qualified and have template arguments. Spellings that do not have this form,
+    e.g. function types, are represented by a node whose base is the whole spelling. The nodes of the most recently
+    parsed spellings are cached.
+
+    Args:
+        type_str (str): The C++ type string.
+
+    Returns:
+        TypeNode: The type node.
+    """
+    return _parse_type(type_str)
+
+
+def _parse_type(type_str: str) -> TypeNode:
+    fallback = TypeNode(type_str.strip())
+    tokens = tokenize_type(type_str)
+    if not tokens:
+        return fallback
+
+    const = volatile = False
+    words = []
+    names = []
+    index = 0
+    count = len(tokens)
+    # Base type: cv-qualifiers, fundamental type keywords or a single qualified name
+    while index < count:
+        kind, text, _ = tokens[index]
+        if kind == 'word' and text in cv_keywords:
+            const = const or text == 'const'
+            volatile = volatile or text == 'volatile'
+            index += 1
+        elif kind == 'word' and text in elaborated_keywords and not words and not names:
+            index += 1
+        elif kind == 'word' and text in fundamental_keywords and not names:
+            words.append(text)
+            index += 1
+        elif (kind == 'word' or kind == 'scope') and not words and not names:
+            start = index
+            if kind == 'scope':
+                index += 1
+            while index < count:
+                if tokens[index][0] != 'word':
+                    return fallback
+                index += 1
+                if index < count and tokens[index][:2] == ('symbol', '<'):
+                    depth = 0
+                    while index < count:
+                        if tokens[index][:2] == ('symbol', '<'):
+                            depth += 1
+                        elif tokens[index][:2] == ('symbol', '>'):
+                            depth -= 1
+                        index += 1
+                        if depth == 0:
+                            break
+                    if depth != 0:
+                        return fallback
+                if index < count and tokens[index][0] == 'scope':
+                    index += 1
+                else:
+                    break
+            if tokens[start][0] == 'scope':
+                start += 1
+            # The spelling of the name, including its template arguments, is kept as it is
+            names = [type_str[tokens[start - 1][2] if start > 0 else 0:tokens[index - 1][2]].strip()]
+        else:
+            break
+    if words:
+        base = canonical_fundamental(words)
+    elif names:
+        base = names[0]
+    else:
+        return fallback
+
+    # Declarator: pointers with their cv-qualifiers, then a reference, then array extents
+    pointer_depth = 0
+    while index < count and tokens[index][:2] == ('symbol', '*'):
+        pointer_depth += 1
+        index += 1
+        while index < count and tokens[index][0] == 'word' and tokens[index][1] in cv_keywords:
+            index += 1
+    reference = ''
+    if index < count and tokens[index][:2] in (('symbol', '&'), ('symbol', '&&')):
+        reference = tokens[index][1]
+        index += 1
+    extents = []
+    while index < count and tokens[index][:2] == ('symbol', '['):
+        if index + 1 < count and tokens[index + 1][0] == 'number':
+            extents.append(int(tokens[index + 1][1]))
+            index += 1
+        else:
+            extents.append(None)
+        if index + 1 >= count or tokens[index + 1][:2] != ('symbol', ']'):
+            return fallback
+        index += 2
+    if index != count:
+        return fallback
+    return TypeNode(base, const=const, volatile=volatile, pointer_depth=pointer_depth, reference=reference,
+                    extents=tuple(extents))